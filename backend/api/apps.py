@@ -1,6 +1,64 @@
+import os
+import sys
+
 from django.apps import AppConfig
+from django.conf import settings
+
+# manage.py / django-admin commands that serve requests; every other command
+# (migrate, test, shell, loadtest, ...) exits without needing warm models.
+SERVING_COMMANDS = ('runserver',)
+# WSGI/ASGI servers that import the project to serve it
+SERVERS = ('gunicorn', 'uvicorn', 'daphne', 'hypercorn', 'waitress-serve')
+
+
+def serving_process(argv=None, environ=None):
+    """Whether this process serves requests: runserver's serving child, a
+    known WSGI/ASGI server, or any process started with SERVING_PROCESS=1.
+
+    Anything else (pytest, scripts calling django.setup(), workers) is not,
+    and SERVING_PROCESS=0 opts a server out.
+    """
+    argv = sys.argv if argv is None else argv
+    environ = os.environ if environ is None else environ
+    flag = environ.get('SERVING_PROCESS', '').lower()
+    if flag:
+        return flag in ('1', 'true', 'yes', 'on')
+    program = argv[0] if argv else ''
+    name = os.path.basename(program)
+    if name == '__main__.py':
+        # python -m gunicorn / python -m django
+        name = os.path.basename(os.path.dirname(program))
+    if name in SERVERS:
+        return True
+    if name not in ('manage.py', 'django-admin', 'django-admin.py', 'django'):
+        return False
+    if len(argv) < 2 or argv[1] not in SERVING_COMMANDS:
+        return False
+    # Only once, in the autoreloader's serving child (where RUN_MAIN is set)
+    return environ.get('RUN_MAIN') == 'true' or '--noreload' in argv
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        # Only probe and warm models for processes that serve requests
+        if not serving_process():
+            return
+
+        from .health import ensure_monitor
+        from src.models.keepalive import start_keep_alive
+
+        # Have provider health cached before the first request
+        ensure_monitor()
+        if not settings.OLLAMA_WARMUP:
+            return
+        start_keep_alive(
+            settings.OLLAMA_BASE_URL,
+            settings.OLLAMA_WARMUP_MODELS,
+            settings.OLLAMA_WARMUP_EMBED_MODELS,
+            keep_alive=settings.OLLAMA_KEEP_ALIVE,
+            refresh_interval=settings.OLLAMA_KEEP_ALIVE_REFRESH,
+            idle_timeout=settings.OLLAMA_IDLE_UNLOAD,
+        )
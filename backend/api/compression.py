@@ -0,0 +1,62 @@
+"""Response compression: brotli when the client accepts it, gzip otherwise.
+
+A full analysis with timings and alternatives runs to tens of kilobytes of
+text, which both encodings shrink several times over. Brotli is used only
+when the optional brotli package is installed; bodies smaller than
+RESPONSE_COMPRESSION_MIN_BYTES, streamed responses and bodies that don't
+shrink are sent as they are.
+"""
+
+import re
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+_ACCEPTS_BR = re.compile(r'\bbr\b')
+_ACCEPTS_GZIP = re.compile(r'\bgzip\b')
+
+
+def choose_encoding(accept_encoding: str):
+    """'br', 'gzip' or None for an Accept-Encoding header"""
+    if brotli is not None and _ACCEPTS_BR.search(accept_encoding):
+        return 'br'
+    if _ACCEPTS_GZIP.search(accept_encoding):
+        return 'gzip'
+    return None
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """Compress large responses, like django's GZipMiddleware plus brotli"""
+
+    def process_response(self, request, response):
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        if len(response.content) < settings.RESPONSE_COMPRESSION_MIN_BYTES:
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        if encoding == 'br':
+            compressed = brotli.compress(response.content, quality=settings.RESPONSE_BROTLI_QUALITY)
+        else:
+            compressed = compress_string(response.content)
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        # The body differs from the identity encoding, so a strong ETag no longer holds
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
@@ -0,0 +1,37 @@
+"""Provider health for the API, backed by the cached probes in src/models/health.py."""
+
+import threading
+
+from django.conf import settings
+
+from src.models import OllamaEmbedding, OllamaInference
+from src.models.health import monitor
+
+# Providers the job-analysis endpoint cannot work without
+REQUIRED_PROVIDERS = ('ollama-inference', 'ollama-embedding')
+
+_lock = threading.Lock()
+
+
+def ensure_monitor():
+    """Register the default providers and start background probing (once)"""
+    with _lock:
+        if not monitor.names:
+            monitor.refresh_interval = settings.HEALTH_PROBE_INTERVAL
+            monitor.max_age = settings.HEALTH_MAX_AGE
+            monitor.register('ollama-inference', OllamaInference(base_url=settings.OLLAMA_BASE_URL).probe)
+            monitor.register('ollama-embedding', OllamaEmbedding(base_url=settings.OLLAMA_BASE_URL).probe)
+            monitor.start()
+    return monitor
+
+
+def required_providers():
+    """REQUIRED_PROVIDERS, minus the embedder when the local one can stand in for it"""
+    if settings.EMBEDDING_BACKEND == 'local' or settings.EMBEDDING_FALLBACK_TIMEOUT:
+        return tuple(name for name in REQUIRED_PROVIDERS if name != 'ollama-embedding')
+    return REQUIRED_PROVIDERS
+
+
+def unavailable_providers():
+    """Required providers that a fresh probe reports as down; never calls upstream"""
+    return [name for name in required_providers() if not monitor.is_healthy(name)]
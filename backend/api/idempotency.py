@@ -0,0 +1,107 @@
+"""Idempotency-Key handling for job-analysis submissions.
+
+A retried POST (a client retry, a double click, a flaky network) carries
+the same Idempotency-Key as the original. While the original is running
+the duplicate waits for it and gets the same response; once it has
+finished, the stored response is returned for IDEMPOTENCY_TTL seconds. No
+duplicate ever starts new model calls. Reusing a key with a different body
+is an error (422). Failed requests (5xx) are not kept, so a retry after one
+runs again.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Tuple
+
+from src.monitoring import record_cache_hit
+
+logger = logging.getLogger(__name__)
+
+HEADER = 'Idempotency-Key'
+REPLAY_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+
+
+class KeyReused(Exception):
+    """The key was already used for a different request body"""
+
+
+class _Entry:
+    def __init__(self, fingerprint: str):
+        self.fingerprint = fingerprint
+        self.done = threading.Event()
+        self.status = None
+        self.data: Any = None
+        self.headers: Dict[str, str] = {}
+        self.expires = float('inf')
+
+
+def fingerprint(data: Any, query: str = '') -> str:
+    """Hash of a request body and query string, independent of key order"""
+    payload = json.dumps(data, sort_keys=True, default=str) + '?' + query
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class IdempotencyStore:
+    """In-flight and recent responses by Idempotency-Key (thread-safe, in-process)"""
+
+    def __init__(self, ttl: float = 3600, max_entries: int = 256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[str, _Entry]' = OrderedDict()
+
+    def _evict(self, now: float) -> None:
+        for key in [key for key, entry in self._entries.items() if entry.expires <= now]:
+            del self._entries[key]
+        # Oldest finished entries go first; running ones are never dropped
+        finished = [key for key, entry in self._entries.items() if entry.done.is_set()]
+        for key in finished[:max(0, len(self._entries) - self.max_entries)]:
+            del self._entries[key]
+
+    def run(self, key: str, request_fingerprint: str,
+            fn: Callable[[], Tuple[int, Any, Dict[str, str]]]) -> Tuple[int, Any, Dict[str, str], bool]:
+        """(status, data, headers, replayed): fn's response, or the one for
+        an earlier request with the same key.
+
+        fn returns (status, data, headers). Raises KeyReused when key was
+        used for a different request.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._evict(now)
+            entry = self._entries.get(key)
+            leader = entry is None
+            if leader:
+                entry = _Entry(request_fingerprint)
+                self._entries[key] = entry
+        if entry.fingerprint != request_fingerprint:
+            raise KeyReused(key)
+
+        if not leader:
+            logger.info(f"Idempotency-Key {key}: {'replaying' if entry.done.is_set() else 'joining'} earlier request")
+            record_cache_hit('idempotency')
+            entry.done.wait()
+            return entry.status, entry.data, entry.headers, True
+
+        try:
+            entry.status, entry.data, entry.headers = fn()
+        except BaseException:
+            entry.status, entry.data, entry.headers = 500, {'error': 'Request failed'}, {}
+            raise
+        finally:
+            with self._lock:
+                if entry.status >= 500:
+                    del self._entries[key]
+                else:
+                    entry.expires = time.monotonic() + self.ttl
+            entry.done.set()
+        return entry.status, entry.data, entry.headers, False
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,214 @@
+"""Open-loop HTTP load generator for the API.
+
+Sends requests at a target arrival rate regardless of how fast the server
+answers, so queueing shows up as latency instead of being hidden by a
+closed loop. Run the server the way you deploy it, then e.g.:
+
+    python manage.py loadtest --rate 2 --duration 60
+    python manage.py loadtest --endpoint default-settings:3 --endpoint job-analysis:1 --rate 50
+    python manage.py loadtest --label asgi --json results/asgi.json
+
+Compare WSGI and ASGI by running the same command against
+``gunicorn backend.wsgi`` and ``uvicorn backend.asgi:application``.
+"""
+
+import json
+import math
+import random
+import statistics
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# name -> (method, path relative to --url, sends a job post)
+ENDPOINTS = {
+    'job-analysis': ('POST', 'job-analysis/', True),
+    'default-settings': ('GET', 'model-settings/default_settings/', False),
+    'model-settings': ('GET', 'model-settings/', False),
+}
+
+JOB_POST_PATH = Path(settings.BASE_DIR).parent / 'utils' / 'job_post.md'
+
+
+def build_variants(job_post: str, count: int, seed: int = 0) -> List[str]:
+    """Derive distinct job posts so server-side caching doesn't flatter results"""
+    rng = random.Random(seed)
+    paragraphs = [p for p in job_post.split('\n\n') if p.strip()]
+    variants = [job_post]
+    while len(variants) < count:
+        shuffled = paragraphs[:1] + rng.sample(paragraphs[1:], len(paragraphs) - 1)
+        kept = [p for p in shuffled if rng.random() > 0.15] or shuffled
+        variants.append('\n\n'.join(kept) + f'\n\nReference: load-test variant {len(variants)}')
+    return variants[:count]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = 'Drive the API at a target arrival rate and report throughput, latency percentiles and errors'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000/api/', help='API base URL')
+        parser.add_argument('--endpoint', action='append', metavar='NAME[:WEIGHT]',
+                            help=f"Endpoint mix, from {', '.join(ENDPOINTS)} (default: job-analysis)")
+        parser.add_argument('--rate', type=float, default=1.0, help='Target arrivals per second')
+        parser.add_argument('--duration', type=float, default=30.0, help='Seconds to generate load for')
+        parser.add_argument('--arrivals', choices=['poisson', 'constant'], default='poisson')
+        parser.add_argument('--max-concurrency', type=int, default=64,
+                            help='Client-side cap on in-flight requests')
+        parser.add_argument('--timeout', type=float, default=300.0, help='Per-request timeout in seconds')
+        parser.add_argument('--job-post', type=Path, default=JOB_POST_PATH)
+        parser.add_argument('--variants', type=int, default=5, help='Number of job post variants to rotate')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--label', default='', help='Name recorded with the results, e.g. wsgi or asgi')
+        parser.add_argument('--json', type=Path, help='Also write the summary to this file')
+
+    def _parse_mix(self, specs: List[str]) -> Tuple[List[str], List[float]]:
+        names, weights = [], []
+        for spec in specs or ['job-analysis']:
+            name, _, weight = spec.partition(':')
+            if name not in ENDPOINTS:
+                raise CommandError(f"Unknown endpoint '{name}', choose from {', '.join(ENDPOINTS)}")
+            names.append(name)
+            weights.append(float(weight or 1))
+        return names, weights
+
+    def handle(self, *args, **options):
+        names, weights = self._parse_mix(options['endpoint'])
+        job_posts = build_variants(options['job_post'].read_text(encoding='utf-8'),
+                                   options['variants'], options['seed'])
+        base_url = options['url'].rstrip('/') + '/'
+        rng = random.Random(options['seed'])
+        local = threading.local()
+        lock = threading.Lock()
+        in_flight = 0
+        peak_in_flight = 0
+        saturated = 0
+        samples = []  # (endpoint, status, latency, schedule lag)
+
+        def send(name: str, scheduled: float, job_post: str):
+            nonlocal in_flight
+            session = getattr(local, 'session', None)
+            if session is None:
+                session = local.session = requests.Session()
+            method, path, sends_post = ENDPOINTS[name]
+            lag = time.perf_counter() - scheduled
+            start = time.perf_counter()
+            try:
+                response = session.request(
+                    method, base_url + path,
+                    # Measure full analyses rather than incremental reuse
+                    json={'job_post': job_post, 'reuse': False} if sends_post else None,
+                    timeout=options['timeout'],
+                )
+                status = str(response.status_code)
+            except requests.exceptions.Timeout:
+                status = 'timeout'
+            except requests.exceptions.RequestException:
+                status = 'connection-error'
+            latency = time.perf_counter() - start
+            with lock:
+                in_flight -= 1
+                samples.append((name, status, latency, lag))
+
+        self.stdout.write(
+            f"Driving {base_url} at {options['rate']}/s for {options['duration']}s "
+            f"({options['arrivals']} arrivals, mix: {', '.join(names)})"
+        )
+        start = time.perf_counter()
+        next_arrival = start
+        sent = 0
+        with ThreadPoolExecutor(max_workers=options['max_concurrency']) as pool:
+            while next_arrival - start < options['duration']:
+                time.sleep(max(0.0, next_arrival - time.perf_counter()))
+                with lock:
+                    if in_flight >= options['max_concurrency']:
+                        saturated += 1
+                    in_flight += 1
+                    peak_in_flight = max(peak_in_flight, in_flight)
+                name = rng.choices(names, weights)[0]
+                pool.submit(send, name, next_arrival, job_posts[sent % len(job_posts)])
+                sent += 1
+                if options['arrivals'] == 'poisson':
+                    next_arrival += rng.expovariate(options['rate'])
+                else:
+                    next_arrival += 1 / options['rate']
+        elapsed = time.perf_counter() - start
+
+        summary = self._summarize(samples, elapsed, options)
+        summary.update(peak_in_flight=peak_in_flight, saturated_arrivals=saturated, sent=sent)
+        self._report(summary)
+        if options['json']:
+            options['json'].parent.mkdir(parents=True, exist_ok=True)
+            options['json'].write_text(json.dumps(summary, indent=2), encoding='utf-8')
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['json']}"))
+
+    def _summarize(self, samples, elapsed: float, options) -> Dict:
+        ok = [s for s in samples if s[1].startswith('2')]
+        latencies = [s[2] for s in ok]
+        by_endpoint = {}
+        for name in sorted({s[0] for s in samples}):
+            endpoint_ok = [s[2] for s in ok if s[0] == name]
+            by_endpoint[name] = {
+                'requests': sum(1 for s in samples if s[0] == name),
+                'ok': len(endpoint_ok),
+                'p50_ms': percentile(endpoint_ok, 50) * 1000,
+                'p95_ms': percentile(endpoint_ok, 95) * 1000,
+                'p99_ms': percentile(endpoint_ok, 99) * 1000,
+            }
+        mean_latency = statistics.mean(s[2] for s in samples) if samples else 0.0
+        throughput = len(ok) / elapsed if elapsed else 0.0
+        return {
+            'label': options['label'],
+            'url': options['url'],
+            'target_rate': options['rate'],
+            'duration_s': elapsed,
+            'completed': len(samples),
+            'throughput_rps': throughput,
+            'error_rate': (len(samples) - len(ok)) / len(samples) if samples else 0.0,
+            'statuses': dict(Counter(s[1] for s in samples)),
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p95_ms': percentile(latencies, 95) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000,
+            'max_ms': max(latencies, default=0.0) * 1000,
+            # Little's law: average number of requests the server was working on
+            'busy_workers': (len(samples) / elapsed) * mean_latency if elapsed else 0.0,
+            'schedule_lag_p95_ms': percentile([s[3] for s in samples], 95) * 1000,
+            'endpoints': by_endpoint,
+        }
+
+    def _report(self, summary: Dict):
+        label = f" [{summary['label']}]" if summary['label'] else ''
+        self.stdout.write(f"\nResults{label}")
+        self.stdout.write(f"  sent / completed     {summary['sent']} / {summary['completed']}")
+        self.stdout.write(f"  throughput           {summary['throughput_rps']:.2f} req/s "
+                          f"(target {summary['target_rate']:.2f})")
+        self.stdout.write(f"  latency p50/p95/p99  {summary['p50_ms']:.0f} / {summary['p95_ms']:.0f} / "
+                          f"{summary['p99_ms']:.0f} ms (max {summary['max_ms']:.0f})")
+        self.stdout.write(f"  error rate           {summary['error_rate']:.1%} {summary['statuses']}")
+        self.stdout.write(f"  busy workers         {summary['busy_workers']:.1f} avg, "
+                          f"{summary['peak_in_flight']} peak in flight")
+        self.stdout.write(f"  client saturation    {summary['saturated_arrivals']} arrivals over "
+                          f"--max-concurrency, schedule lag p95 {summary['schedule_lag_p95_ms']:.0f} ms")
+        for name, stats in summary['endpoints'].items():
+            self.stdout.write(f"  {name:<18} {stats['ok']}/{stats['requests']} ok, "
+                              f"p50 {stats['p50_ms']:.0f} ms, p95 {stats['p95_ms']:.0f} ms, "
+                              f"p99 {stats['p99_ms']:.0f} ms")
+        if summary['error_rate'] > 0.05 or summary['saturated_arrivals']:
+            self.stdout.write(self.style.WARNING('Target rate not sustained'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Target rate sustained'))
@@ -0,0 +1,123 @@
+"""Opt-in per-request profiling for API views.
+
+A request is profiled when it carries the PROFILING_HEADER header (and
+PROFILING_ALLOW_HEADER is on) or when it is picked by PROFILING_SAMPLE_RATE.
+Profiles are written to PROFILING_DIR, one file per request:
+
+- 'sampling' mode samples the request thread's stack every
+  PROFILING_INTERVAL seconds and writes folded stacks (``.folded``), which
+  flamegraph.pl, speedscope and inferno read directly.
+- 'deterministic' mode runs cProfile and writes a ``.prof`` stats file
+  (view with snakeviz, or convert with flameprof).
+
+When a request isn't selected the only cost is a header lookup and one
+random draw.
+"""
+
+import cProfile
+import functools
+import logging
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class StackSampler:
+    """Sample one thread's Python stack on a background thread"""
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    @staticmethod
+    def _frame_name(frame) -> str:
+        code = frame.f_code
+        module = frame.f_globals.get('__name__', Path(code.co_filename).stem)
+        return f"{module}:{code.co_name}:{code.co_firstlineno}".replace(';', ',')
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                names.append(self._frame_name(frame))
+                frame = frame.f_back
+            if names:
+                self.stacks[';'.join(reversed(names))] += 1
+
+    def start(self) -> 'StackSampler':
+        self._thread.start()
+        return self
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def write_folded(self, path: Path) -> None:
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def should_profile(request) -> bool:
+    """Decide whether this request is profiled"""
+    header = getattr(settings, 'PROFILING_HEADER', 'X-Profile')
+    if getattr(settings, 'PROFILING_ALLOW_HEADER', False) and request.headers.get(header):
+        return True
+    rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0.0)
+    return rate > 0 and random.random() < rate
+
+
+def run_profiled(name: str, fn, *args, **kwargs):
+    """Call fn under the configured profiler and write the profile to disk.
+
+    Returns (result, profile path).
+    """
+    directory = Path(getattr(settings, 'PROFILING_DIR', 'profiles'))
+    directory.mkdir(parents=True, exist_ok=True)
+    profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{name}-{uuid.uuid4().hex[:8]}"
+    mode = getattr(settings, 'PROFILING_MODE', 'sampling')
+
+    start = time.perf_counter()
+    if mode == 'deterministic':
+        profiler = cProfile.Profile()
+        try:
+            result = profiler.runcall(fn, *args, **kwargs)
+        finally:
+            path = directory / f"{profile_id}.prof"
+            profiler.dump_stats(path)
+    else:
+        sampler = StackSampler(threading.get_ident(), getattr(settings, 'PROFILING_INTERVAL', 0.005)).start()
+        try:
+            result = fn(*args, **kwargs)
+        finally:
+            sampler.stop()
+            path = directory / f"{profile_id}.folded"
+            sampler.write_folded(path)
+    logger.info(f"Profiled {name} in {time.perf_counter() - start:.2f}s, wrote {path}")
+    return result, path
+
+
+def profiled(view_method):
+    """Profile a viewset action when the request opts in or is sampled"""
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        if not should_profile(request):
+            return view_method(self, request, *args, **kwargs)
+        name = f"{type(self).__name__}.{view_method.__name__}"
+        response, path = run_profiled(name, view_method, self, request, *args, **kwargs)
+        response['X-Profile-Id'] = path.name
+        return response
+    return wrapper
@@ -0,0 +1,25 @@
+"""JSON rendering with orjson for the API."""
+
+import orjson
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+_fallback = JSONEncoder()
+
+
+class ORJSONRenderer(BaseRenderer):
+    """Compact JSON via orjson, several times faster than the stdlib encoder.
+
+    numpy arrays and scalars serialize directly; anything orjson doesn't
+    know (Decimal, lazy translation strings, querysets) goes through DRF's
+    encoder, so the output matches rest_framework.renderers.JSONRenderer.
+    """
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+    options = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return orjson.dumps(data, default=_fallback.default, option=self.options)
@@ -1,3 +1,306 @@
-from django.test import TestCase
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import call_command
+from django.test import LiveServerTestCase, SimpleTestCase, override_settings
+
+from .management.commands.loadtest import build_variants, percentile
+
+
+class LoadTestHelpersTests(SimpleTestCase):
+    def test_percentile(self):
+        values = [float(v) for v in range(1, 101)]
+        self.assertEqual(percentile(values, 50), 50.0)
+        self.assertEqual(percentile(values, 99), 99.0)
+        self.assertEqual(percentile([], 95), 0.0)
+
+    def test_variants_are_distinct(self):
+        job_post = '\n\n'.join(f'Paragraph {i} about the project.' for i in range(8))
+        variants = build_variants(job_post, 4)
+        self.assertEqual(variants[0], job_post)
+        self.assertEqual(len(set(variants)), 4)
+
+
+class LoadTestCommandTests(LiveServerTestCase):
+    def test_drives_endpoint_and_reports(self):
+        out = StringIO()
+        with tempfile.TemporaryDirectory() as tmp:
+            result_path = Path(tmp) / 'result.json'
+            call_command(
+                'loadtest', '--url', f'{self.live_server_url}/api/',
+                '--endpoint', 'default-settings', '--rate', '20', '--duration', '1',
+                '--arrivals', 'constant', '--label', 'test', '--json', str(result_path),
+                stdout=out,
+            )
+            summary = json.loads(result_path.read_text())
+        self.assertEqual(summary['label'], 'test')
+        self.assertEqual(summary['statuses'], {'200': summary['completed']})
+        self.assertGreater(summary['throughput_rps'], 0)
+        self.assertIn('Target rate sustained', out.getvalue())
+
+
+class MetricsEndpointTests(SimpleTestCase):
+    def test_prometheus_text(self):
+        from src.monitoring import registry
+        registry.inc('freelance_retries_total', section='proposal')
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertIn('freelance_retries_total{section="proposal"}', response.content.decode())
+
+
+def _slow_analysis(job_post, **options):
+    import time
+    time.sleep(0.05)
+    return {'proposal': 'Hello'}
+
+
+@mock.patch('api.views.OllamaEmbedding', mock.Mock())
+@mock.patch('api.views.OllamaInference', mock.Mock())
+@mock.patch('api.views.JobAnalyzer')
+class ProfilingTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def _post(self, analyzer, **headers):
+        analyzer.return_value.analyze_job_post.side_effect = _slow_analysis
+        return self.client.post('/api/job-analysis/', {'job_post': 'Build a chatbot'},
+                                content_type='application/json', headers=headers)
+
+    def test_disabled_by_default(self, analyzer):
+        with override_settings(PROFILING_DIR=self.tmp.name, PROFILING_SAMPLE_RATE=0,
+                               PROFILING_ALLOW_HEADER=False):
+            response = self._post(analyzer, x_profile='1')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertEqual(list(Path(self.tmp.name).iterdir()), [])
+
+    def test_header_writes_folded_stacks(self, analyzer):
+        with override_settings(PROFILING_DIR=self.tmp.name, PROFILING_ALLOW_HEADER=True,
+                               PROFILING_MODE='sampling', PROFILING_INTERVAL=0.001):
+            response = self._post(analyzer, x_profile='1')
+        path = Path(self.tmp.name) / response['X-Profile-Id']
+        self.assertTrue(path.name.endswith('.folded'))
+        lines = path.read_text().splitlines()
+        self.assertTrue(lines)
+        self.assertTrue(any('_slow_analysis' in line for line in lines))
+
+    def test_sampling_rate_with_cprofile(self, analyzer):
+        with override_settings(PROFILING_DIR=self.tmp.name, PROFILING_SAMPLE_RATE=1.0,
+                               PROFILING_MODE='deterministic'):
+            response = self._post(analyzer)
+        self.assertTrue(response['X-Profile-Id'].endswith('.prof'))
+        self.assertTrue((Path(self.tmp.name) / response['X-Profile-Id']).exists())
+
+
+@mock.patch('api.views.OllamaEmbedding', mock.Mock())
+@mock.patch('api.views.OllamaInference', mock.Mock())
+@mock.patch('api.views.JobAnalyzer')
+class HealthTests(SimpleTestCase):
+    def setUp(self):
+        from benchmarks.provider_server import ProviderServer
+        from src.models.health import monitor
+        self.monitor = monitor
+        self.server = ProviderServer().start()
+        self.addCleanup(self.server.stop)
+        self.addCleanup(monitor.reset)
+
+    def test_reports_cached_probes(self, analyzer):
+        with override_settings(OLLAMA_BASE_URL=self.server.url):
+            response = self.client.get('/health?refresh=1')
+            self.assertEqual(response.status_code, 200)
+            body = response.json()
+            self.assertEqual(body['status'], 'ok')
+            self.assertTrue(body['providers']['ollama-inference']['healthy'])
+
+            tags_requests = self.server.requests['/api/tags']
+            self.client.get('/health')
+            self.assertEqual(self.server.requests['/api/tags'], tags_requests)
+
+    def test_down_provider_fails_fast(self, analyzer):
+        with override_settings(OLLAMA_BASE_URL='http://127.0.0.1:9'):
+            response = self.client.get('/health?refresh=1')
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response.json()['status'], 'down')
+
+            response = self.client.post('/api/job-analysis/', {'job_post': 'Build a chatbot'},
+                                        content_type='application/json')
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Retry-After', response)
+        analyzer.return_value.analyze_job_post.assert_not_called()
+
+    def test_embedding_not_required_with_local_fallback(self, analyzer):
+        from api.health import required_providers
+        self.assertNotIn('ollama-embedding', required_providers())
+        with override_settings(EMBEDDING_FALLBACK_TIMEOUT=0):
+            self.assertIn('ollama-embedding', required_providers())
+        with override_settings(EMBEDDING_BACKEND='local', EMBEDDING_FALLBACK_TIMEOUT=0):
+            self.assertNotIn('ollama-embedding', required_providers())
+
+
+class WarmUpTests(SimpleTestCase):
+    def test_serving_processes(self):
+        from api.apps import serving_process
+        self.assertTrue(serving_process(['/venv/bin/gunicorn', 'backend.wsgi'], {}))
+        self.assertTrue(serving_process(['/venv/bin/uvicorn', 'backend.asgi:application'], {}))
+        self.assertTrue(serving_process(['manage.py', 'runserver'], {'RUN_MAIN': 'true'}))
+        self.assertTrue(serving_process(['manage.py', 'runserver', '--noreload'], {}))
+        self.assertTrue(serving_process(['/venv/lib/gunicorn/__main__.py', 'backend.wsgi'], {}))
+        self.assertTrue(serving_process(['serve.py'], {'SERVING_PROCESS': '1'}))
+        self.assertFalse(serving_process(['/venv/bin/gunicorn', 'backend.wsgi'], {'SERVING_PROCESS': '0'}))
+
+    def test_management_commands_are_skipped(self):
+        from api.apps import serving_process
+        self.assertFalse(serving_process(['manage.py', 'runserver'], {}))
+        self.assertFalse(serving_process(['manage.py', 'migrate'], {}))
+        self.assertFalse(serving_process(['manage.py', 'test', 'api'], {'RUN_MAIN': 'true'}))
+        self.assertFalse(serving_process(['/venv/bin/django-admin', 'shell'], {}))
+        self.assertFalse(serving_process(['/venv/lib/django/__main__.py', 'migrate'], {}))
+
+    def test_other_processes_are_skipped(self):
+        from api.apps import serving_process
+        self.assertFalse(serving_process(['/venv/bin/pytest', 'tests'], {}))
+        self.assertFalse(serving_process(['/venv/bin/celery', '-A', 'backend', 'worker'], {}))
+        self.assertFalse(serving_process(['script.py'], {}))
+
+    def test_django_setup_starts_no_threads(self):
+        script = ('import threading, django; django.setup(); '
+                  'print(",".join(thread.name for thread in threading.enumerate()))')
+        environment = {**os.environ, 'DJANGO_SETTINGS_MODULE': 'backend.settings'}
+        environment.pop('SERVING_PROCESS', None)
+        output = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True,
+                                cwd=Path(__file__).resolve().parent.parent, env=environment).stdout
+        self.assertEqual(output.strip(), 'MainThread')
+
+    @mock.patch('api.apps.serving_process', mock.Mock(return_value=True))
+    @mock.patch('api.health.ensure_monitor')
+    @mock.patch('src.models.keepalive.start_keep_alive')
+    def test_warm_up_setting(self, start_keep_alive, ensure_monitor):
+        from django.apps import apps
+        config = apps.get_app_config('api')
+        config.ready()
+        start_keep_alive.assert_called_once()
+        start_keep_alive.reset_mock()
+        with override_settings(OLLAMA_WARMUP=False):
+            config.ready()
+        start_keep_alive.assert_not_called()
+        self.assertEqual(ensure_monitor.call_count, 2)
+
+
+@mock.patch('api.views.OllamaEmbedding', mock.Mock())
+@mock.patch('api.views.OllamaInference', mock.Mock())
+@mock.patch('api.views.JobAnalyzer')
+class ProposalCandidatesTests(SimpleTestCase):
+    def _post(self, analyzer, **body):
+        analyzer.return_value.analyze_job_post.return_value = {'proposal': 'Hello'}
+        return self.client.post('/api/job-analysis/', {'job_post': 'Build a chatbot', **body},
+                                content_type='application/json')
+
+    def test_candidates_are_clamped(self, analyzer):
+        with override_settings(PROPOSAL_MAX_CANDIDATES=4):
+            self.assertEqual(self._post(analyzer, proposal_candidates=9).status_code, 200)
+        self.assertEqual(analyzer.call_args.kwargs['proposal_candidates'], 4)
+        self._post(analyzer)
+        self.assertEqual(analyzer.call_args.kwargs['proposal_candidates'], 1)
+
+    def test_invalid_candidates(self, analyzer):
+        response = self._post(analyzer, proposal_candidates='many')
+        self.assertEqual(response.status_code, 400)
+        analyzer.assert_not_called()
+
+
+@mock.patch('api.views.OllamaEmbedding', mock.Mock())
+@mock.patch('api.views.OllamaInference', mock.Mock())
+@mock.patch('api.views.JobAnalyzer')
+class ResponseFormatTests(SimpleTestCase):
+    RESULTS = {'jobAnalysis': 'Needs a Django API. ' * 200, 'proposal': 'Hello', 'fields': {'budget': None}}
+
+    def _post(self, analyzer, path='/api/job-analysis/', headers=None, **body):
+        analyzer.return_value.analyze_job_post.return_value = dict(self.RESULTS)
+        return self.client.post(path, {'job_post': 'Build a chatbot', **body},
+                                content_type='application/json', headers=headers or {})
+
+    def test_fields_selects_keys(self, analyzer):
+        response = self._post(analyzer, fields='proposal')
+        self.assertEqual(response.json(), {'proposal': 'Hello'})
+        self.assertFalse(analyzer.return_value.analyze_job_post.call_args.kwargs['include_prompt'])
+
+        response = self._post(analyzer, path='/api/job-analysis/?fields=proposal,prompt')
+        self.assertEqual(list(response.json()), ['proposal'])
+        self.assertTrue(analyzer.return_value.analyze_job_post.call_args.kwargs['include_prompt'])
+
+    def test_unknown_field(self, analyzer):
+        response = self._post(analyzer, fields=['proposal', 'secret'])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('secret', response.json()['error'])
+
+    def test_invalid_fields_type(self, analyzer):
+        for fields in (5, {'proposal': True}, ['proposal', 3]):
+            response = self._post(analyzer, fields=fields)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('fields must be', response.json()['error'])
+
+    def test_large_responses_are_compressed(self, analyzer):
+        import gzip
+        response = self._post(analyzer, headers={'accept-encoding': 'gzip, deflate'})
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(json.loads(gzip.decompress(response.content))['proposal'], 'Hello')
+
+        response = self._post(analyzer, fields='proposal', headers={'accept-encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', response)
+
+    def test_orjson_renderer(self, analyzer):
+        import numpy as np
+        from api.renderers import ORJSONRenderer
+        rendered = ORJSONRenderer().render({'score': np.float32(0.5), 'vector': np.arange(2), 1: 'a'})
+        self.assertEqual(json.loads(rendered), {'score': 0.5, 'vector': [0, 1], '1': 'a'})
+
+
+@mock.patch('api.views.OllamaEmbedding', mock.Mock())
+@mock.patch('api.views.OllamaInference', mock.Mock())
+@mock.patch('api.views.JobAnalyzer')
+class IdempotencyTests(SimpleTestCase):
+    def setUp(self):
+        from api.views import idempotency_store
+        self.addCleanup(idempotency_store.clear)
+
+    def _post(self, key, job_post='Build a chatbot'):
+        return self.client.post('/api/job-analysis/', {'job_post': job_post},
+                                content_type='application/json', headers={'idempotency-key': key})
+
+    def test_duplicate_returns_stored_result(self, analyzer):
+        analyzer.return_value.analyze_job_post.return_value = {'proposal': 'Hello'}
+        first, second = self._post('abc'), self._post('abc')
+        self.assertEqual(first.json(), second.json())
+        self.assertNotIn('Idempotent-Replayed', first)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(analyzer.return_value.analyze_job_post.call_count, 1)
+
+        self._post('other')
+        self.assertEqual(analyzer.return_value.analyze_job_post.call_count, 2)
+
+    def test_concurrent_duplicate_joins_running_analysis(self, analyzer):
+        from concurrent.futures import ThreadPoolExecutor
+        analyzer.return_value.analyze_job_post.side_effect = _slow_analysis
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            responses = list(executor.map(lambda _: self._post('same'), range(3)))
+        self.assertEqual([response.json() for response in responses], [{'proposal': 'Hello'}] * 3)
+        self.assertEqual(analyzer.return_value.analyze_job_post.call_count, 1)
+
+    def test_key_reused_for_other_body(self, analyzer):
+        analyzer.return_value.analyze_job_post.return_value = {'proposal': 'Hello'}
+        self._post('abc')
+        self.assertEqual(self._post('abc', job_post='Design a logo').status_code, 422)
+
+    def test_failures_are_not_stored(self, analyzer):
+        analyzer.return_value.analyze_job_post.side_effect = [RuntimeError('boom'), {'proposal': 'Hello'}]
+        self.assertEqual(self._post('abc').status_code, 500)
+        self.assertEqual(self._post('abc').json(), {'proposal': 'Hello'})
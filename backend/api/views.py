@@ -2,11 +2,71 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.conf import settings
+from django.http import HttpResponse, JsonResponse
 
 from .models import ModelSettings, APIKey
 from .serializers import ModelSettingsSerializer, APIKeySerializer
-from src.models import OllamaEmbedding, OllamaInference
-from src.analysis import JobAnalyzer
+from .health import ensure_monitor, required_providers, unavailable_providers
+from .idempotency import HEADER, MAX_KEY_LENGTH, REPLAY_HEADER, IdempotencyStore, KeyReused, fingerprint
+from .profiling import profiled
+from src.models import FallbackEmbedding, LocalEmbedding, OllamaEmbedding, OllamaInference
+from src.analysis import AnalysisCache, ChunkedEmbedding, JobAnalyzer
+from src.analysis.job_analyzer import ANALYSIS_PROMPTS
+from src.monitoring import render_prometheus
+
+TRUTHY = ('1', 'true', 'yes', 'on')
+
+# Keys a job analysis can return, for ?fields=
+RESULT_FIELDS = (*ANALYSIS_PROMPTS, 'proposalAlternatives', 'fields', 'recomputed', 'reused', 'timings', 'prompt')
+
+# In-process embedder, shared by every request
+local_embedding = LocalEmbedding(path=settings.LOCAL_EMBEDDING_PATH or None)
+
+
+def embedding_model():
+    """Embedding model for one analysis, per settings.EMBEDDING_BACKEND"""
+    if settings.EMBEDDING_BACKEND == 'local':
+        return local_embedding
+    model = ChunkedEmbedding(OllamaEmbedding())
+    if settings.EMBEDDING_FALLBACK_TIMEOUT:
+        model = FallbackEmbedding(model, local_embedding, timeout=settings.EMBEDDING_FALLBACK_TIMEOUT)
+    return model
+
+
+# Shared across requests so an edited post only reruns the affected sections
+analysis_cache = AnalysisCache(
+    max_entries=settings.ANALYSIS_CACHE_SIZE,
+    default_threshold=settings.ANALYSIS_REUSE_THRESHOLD
+)
+
+# Responses by Idempotency-Key, so a retried submission never reruns the analysis
+idempotency_store = IdempotencyStore(
+    ttl=settings.IDEMPOTENCY_TTL,
+    max_entries=settings.IDEMPOTENCY_MAX_ENTRIES
+)
+
+def metrics(request):
+    """Expose collected spans, token counts, retries and cache hits for Prometheus"""
+    return HttpResponse(render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+def health(request):
+    """Report cached provider probe results; ?refresh=1 probes now"""
+    monitor = ensure_monitor()
+    if request.GET.get('refresh', '').lower() in TRUTHY:
+        monitor.check_all()
+    providers = monitor.status()
+    names = required_providers()
+    required = [providers[name]['healthy'] for name in names if not providers[name]['stale']]
+    if False in required:
+        overall = 'down'
+    elif len(required) < len(names):
+        overall = 'unknown'
+    else:
+        overall = 'ok'
+    return JsonResponse(
+        {'status': overall, 'providers': providers},
+        status=503 if overall == 'down' else 200
+    )
 
 class ModelSettingsViewSet(viewsets.ModelViewSet):
     """
@@ -33,8 +93,38 @@ class ModelSettingsViewSet(viewsets.ModelViewSet):
 class JobAnalysisViewSet(viewsets.ViewSet):
     """ViewSet for job post analysis using default models"""
 
+    @profiled
     def create(self, request):
-        """Analyze a job post"""
+        """Analyze a job post; requests repeating an Idempotency-Key share one analysis"""
+        key = request.headers.get(HEADER)
+        if not key:
+            return self._analyze(request)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {'error': f'{HEADER} must be at most {MAX_KEY_LENGTH} characters'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        def analyze():
+            response = self._analyze(request)
+            headers = {name: value for name, value in response.items() if name != 'Content-Type'}
+            return response.status_code, response.data, headers
+
+        try:
+            code, data, headers, replayed = idempotency_store.run(
+                key, fingerprint(request.data, request.META.get('QUERY_STRING', '')), analyze)
+        except KeyReused:
+            return Response(
+                {'error': f'{HEADER} was already used for a different request'},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY
+            )
+        response = Response(data, status=code, headers=headers)
+        if replayed:
+            response[REPLAY_HEADER] = 'true'
+        return response
+
+    def _analyze(self, request):
+        """Run one analysis for the request"""
         job_post = request.data.get('job_post')
         if not job_post:
             return Response(
@@ -42,15 +132,65 @@ class JobAnalysisViewSet(viewsets.ViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        # Fail fast instead of waiting on timeouts when a fresh probe says Ollama is down
+        down = unavailable_providers()
+        if down:
+            response = Response(
+                {'error': f"Model providers unavailable: {', '.join(down)}"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+            response['Retry-After'] = str(int(settings.HEALTH_PROBE_INTERVAL))
+            return response
+
         try:
             # Initialize analyzer with default models
+            # Send "reuse": false to regenerate every section
+            reuse = str(request.data.get('reuse', 'true')).lower() in TRUTHY
+            # Send "proposal_candidates": N to sample N proposals and get the runners-up too
+            try:
+                candidates = int(request.data.get('proposal_candidates', settings.PROPOSAL_CANDIDATES))
+            except (TypeError, ValueError):
+                return Response(
+                    {'error': 'proposal_candidates must be an integer'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            candidates = max(1, min(candidates, settings.PROPOSAL_MAX_CANDIDATES))
+            # Send "fields": "proposal" (or ?fields=a,b) to get only those keys back
+            fields = request.data.get('fields', request.query_params.get('fields'))
+            if isinstance(fields, str):
+                fields = [name.strip() for name in fields.split(',') if name.strip()]
+            elif fields is not None and not (isinstance(fields, list)
+                                             and all(isinstance(name, str) for name in fields)):
+                return Response(
+                    {'error': 'fields must be a comma-separated string or a list of field names'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            unknown = sorted(set(fields or ()) - set(RESULT_FIELDS))
+            if unknown:
+                return Response(
+                    {'error': f"Unknown fields: {', '.join(unknown)}"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
             analyzer = JobAnalyzer(
-                embedding_model=OllamaEmbedding(),
-                inference_model=OllamaInference()
+                embedding_model=embedding_model(),
+                inference_model=OllamaInference(),
+                analysis_cache=analysis_cache if reuse else None,
+                max_input_tokens=settings.ANALYSIS_MAX_INPUT_TOKENS or None,
+                proposal_candidates=candidates
             )
 
-            # Analyze job post
-            results = analyzer.analyze_job_post(job_post)
+            # Analyze job post, optionally with a timing breakdown
+            include_timings = str(
+                request.data.get('include_timings', request.query_params.get('timings', ''))
+            ).lower() in TRUTHY or 'timings' in (fields or ())
+            # The section prompts are only echoed on request
+            include_prompt = str(
+                request.data.get('include_prompt', request.query_params.get('include_prompt', ''))
+            ).lower() in TRUTHY or 'prompt' in (fields or ())
+            results = analyzer.analyze_job_post(job_post, include_timings=include_timings, include_fields=True,
+                                                include_prompt=include_prompt)
+            if fields:
+                results = {key: results[key] for key in fields if key in results}
             return Response(results)
 
         except Exception as e:
@@ -49,6 +49,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'api.compression.CompressionMiddleware',  # Before anything that reads the body
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',  # Must be before CommonMiddleware
     'django.middleware.common.CommonMiddleware',
@@ -82,6 +83,8 @@ CORS_ALLOW_HEADERS = [
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
+    'x-profile',
+    'idempotency-key',
 ]
 
 ROOT_URLCONF = 'backend.urls'
@@ -157,4 +160,71 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [],  # Allow unrestricted access
     'DEFAULT_AUTHENTICATION_CLASSES': [],  # No authentication required
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
 }
+
+# Responses at least this large are compressed (see api/compression.py),
+# with brotli when the client accepts it and the package is installed.
+RESPONSE_COMPRESSION_MIN_BYTES = int(os.getenv('RESPONSE_COMPRESSION_MIN_BYTES', '1024'))
+RESPONSE_BROTLI_QUALITY = int(os.getenv('RESPONSE_BROTLI_QUALITY', '5'))
+
+# Opt-in request profiling (see api/profiling.py). Requests are profiled when
+# they send the X-Profile header (if allowed) or are picked by the sample rate.
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', '0'))
+PROFILING_ALLOW_HEADER = DEBUG
+PROFILING_HEADER = 'X-Profile'
+PROFILING_MODE = os.getenv('PROFILING_MODE', 'sampling')  # 'sampling' or 'deterministic'
+PROFILING_INTERVAL = 0.005  # seconds between stack samples
+PROFILING_DIR = Path(os.getenv('PROFILING_DIR', BASE_DIR / 'profiles'))
+
+# Ollama warm-up and keep-alive (see src/models/keepalive.py). When a serving
+# process starts (runserver, gunicorn, uvicorn or SERVING_PROCESS=1; not
+# management commands, scripts or workers), the analysis models are preloaded,
+# their keep_alive is refreshed while requests arrive, and they are unloaded
+# after an idle hour.
+OLLAMA_WARMUP = os.getenv('OLLAMA_WARMUP', '1').lower() in ('1', 'true', 'yes', 'on')
+OLLAMA_BASE_URL = os.getenv('OLLAMA_BASE_URL', 'http://127.0.0.1:11434')
+OLLAMA_KEEP_ALIVE = os.getenv('OLLAMA_KEEP_ALIVE', '30m')
+OLLAMA_KEEP_ALIVE_REFRESH = float(os.getenv('OLLAMA_KEEP_ALIVE_REFRESH', '300'))  # seconds
+OLLAMA_IDLE_UNLOAD = float(os.getenv('OLLAMA_IDLE_UNLOAD', '3600'))  # seconds without traffic
+OLLAMA_WARMUP_MODELS = ['deepseek-coder-v2:latest']
+OLLAMA_WARMUP_EMBED_MODELS = ['nomic-embed-text:latest']
+
+# Provider health (see api/health.py). Probes only hit metadata endpoints, so
+# they can run often; results older than HEALTH_MAX_AGE are not trusted.
+HEALTH_PROBE_INTERVAL = float(os.getenv('HEALTH_PROBE_INTERVAL', '30'))  # seconds
+HEALTH_MAX_AGE = 3 * HEALTH_PROBE_INTERVAL
+
+# Incremental re-analysis (see src/analysis/incremental.py): re-running an
+# edited post reuses sections when at most this fraction of words changed.
+ANALYSIS_CACHE_SIZE = int(os.getenv('ANALYSIS_CACHE_SIZE', '128'))
+ANALYSIS_REUSE_THRESHOLD = float(os.getenv('ANALYSIS_REUSE_THRESHOLD', '0.05'))
+
+# Posts longer than this (estimated tokens) are cut down per section to the
+# most relevant sentences (see src/analysis/compress.py); 0 disables it.
+ANALYSIS_MAX_INPUT_TOKENS = int(os.getenv('ANALYSIS_MAX_INPUT_TOKENS', '1500'))
+
+# 'ollama' embeds with nomic-embed-text, falling back to the in-process
+# hashing embedder (src/models/local_embedding.py) when a call takes longer
+# than EMBEDDING_FALLBACK_TIMEOUT seconds (0 disables the fallback);
+# 'local' always uses the in-process embedder.
+EMBEDDING_BACKEND = os.getenv('EMBEDDING_BACKEND', 'ollama')
+EMBEDDING_FALLBACK_TIMEOUT = float(os.getenv('EMBEDDING_FALLBACK_TIMEOUT', '2'))
+# Document frequencies for the in-process embedder, loaded at startup when
+# the file exists (write one with `python -m src.analysis.bulk ... --fit-local`);
+# without them it weights words by term frequency only.
+LOCAL_EMBEDDING_PATH = os.getenv('LOCAL_EMBEDDING_PATH', '')
+
+# Proposals sampled per analysis (the best is returned, the rest as
+# proposalAlternatives); requests may ask for up to PROPOSAL_MAX_CANDIDATES.
+PROPOSAL_CANDIDATES = int(os.getenv('PROPOSAL_CANDIDATES', '1'))
+PROPOSAL_MAX_CANDIDATES = int(os.getenv('PROPOSAL_MAX_CANDIDATES', '5'))
+
+# A job-analysis POST with an Idempotency-Key header joins the running request
+# with that key or gets its stored response for IDEMPOTENCY_TTL seconds
+# (see api/idempotency.py) instead of starting a new analysis.
+IDEMPOTENCY_TTL = float(os.getenv('IDEMPOTENCY_TTL', '3600'))  # seconds
+IDEMPOTENCY_MAX_ENTRIES = int(os.getenv('IDEMPOTENCY_MAX_ENTRIES', '256'))
@@ -0,0 +1,196 @@
+"""Offline benchmark of the JobAnalyzer pipeline against fake models.
+
+Runs analyze_job_post end-to-end with deterministic in-process models and
+reports wall time, per-section time, orchestration overhead (wall time not
+covered by any model call) and peak Python memory. Results can be stored
+as baselines and later runs fail when overhead or memory regress.
+
+Usage:
+    python -m benchmarks.bench_analyzer
+    python -m benchmarks.bench_analyzer --scenario typical --iterations 5
+    python -m benchmarks.bench_analyzer --update-baseline
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from src.analysis import JobAnalyzer
+from .fakes import FakeEmbedding, FakeInference
+
+BASELINE_PATH = Path(__file__).parent / "baselines.json"
+JOB_POST_PATH = Path(__file__).parent.parent / "utils" / "job_post.md"
+
+# Each scenario configures the fake models; latencies are in seconds
+SCENARIOS: Dict[str, Dict[str, Any]] = {
+    "overhead": {"latency": 0.0, "embed_latency": 0.0, "output_words": None},
+    "typical": {"latency": "lognormal:-3.0,0.5", "embed_latency": "const:0.01", "output_words": None},
+    "long-output": {"latency": 0.0, "embed_latency": 0.0, "output_words": 1200},
+}
+
+# Metrics compared against the baseline, with absolute slack for timer noise
+REGRESSION_METRICS = {
+    "overhead_ms_p50": 2.0,
+    "peak_memory_kb": 64.0,
+}
+
+
+def _union_length(intervals: List[Tuple[float, float]]) -> float:
+    """Total time covered by at least one interval"""
+    total = 0.0
+    current_start, current_end = None, None
+    for start, end in sorted(intervals):
+        if current_end is None or start > current_end:
+            if current_end is not None:
+                total += current_end - current_start
+            current_start, current_end = start, end
+        else:
+            current_end = max(current_end, end)
+    if current_end is not None:
+        total += current_end - current_start
+    return total
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_scenario(job_post: str, iterations: int = 3, seed: int = 0, **config) -> Dict[str, Any]:
+    """Benchmark one scenario and return its aggregated metrics"""
+    embedding = FakeEmbedding(latency=config.get("embed_latency", 0.0), seed=seed)
+    inference = FakeInference(
+        latency=config.get("latency", 0.0),
+        output_words=config.get("output_words"),
+        seed=seed,
+    )
+    analyzer = JobAnalyzer(embedding_model=embedding, inference_model=inference)
+
+    wall, model, overhead = [], [], []
+    sections: Dict[str, List[float]] = {}
+    for _ in range(iterations):
+        embedding.calls.clear()
+        inference.calls.clear()
+        start = time.perf_counter()
+        analyzer.analyze_job_post(job_post)
+        elapsed = time.perf_counter() - start
+
+        intervals = [(s, e) for s, e, _ in embedding.calls]
+        intervals += [(s, e) for _, s, e, _ in inference.calls]
+        model_time = _union_length(intervals)
+        wall.append(elapsed * 1000)
+        model.append(model_time * 1000)
+        overhead.append((elapsed - model_time) * 1000)
+        for section, s, e, _ in inference.calls:
+            sections.setdefault(section, []).append((e - s) * 1000)
+
+    # Memory is measured in a separate pass so tracing doesn't skew timings
+    tracemalloc.start()
+    analyzer.analyze_job_post(job_post)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "iterations": iterations,
+        "wall_ms_p50": statistics.median(wall),
+        "wall_ms_p95": _percentile(wall, 95),
+        "model_ms_p50": statistics.median(model),
+        "overhead_ms_p50": statistics.median(overhead),
+        "overhead_ms_max": max(overhead),
+        "peak_memory_kb": peak / 1024,
+        "sections_ms": {key: statistics.mean(values) for key, values in sections.items()},
+    }
+
+
+def compare(results: Dict[str, Dict[str, Any]], baselines: Dict[str, Dict[str, Any]], tolerance: float) -> List[str]:
+    """Return a description of every metric that regressed past the baseline"""
+    regressions = []
+    for scenario, metrics in results.items():
+        baseline = baselines.get(scenario)
+        if not baseline:
+            continue
+        for metric, slack in REGRESSION_METRICS.items():
+            if metric not in baseline:
+                continue
+            limit = baseline[metric] * (1 + tolerance) + slack
+            if metrics[metric] > limit:
+                regressions.append(
+                    f"{scenario}.{metric}: {metrics[metric]:.2f} > {limit:.2f} "
+                    f"(baseline {baseline[metric]:.2f})"
+                )
+    return regressions
+
+
+def load_baselines(path: Path = BASELINE_PATH) -> Dict[str, Dict[str, Any]]:
+    if not path.exists():
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baselines(results: Dict[str, Dict[str, Any]], path: Path = BASELINE_PATH) -> None:
+    baselines = load_baselines(path)
+    for scenario, metrics in results.items():
+        baselines[scenario] = {metric: round(metrics[metric], 3) for metric in REGRESSION_METRICS}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(baselines, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def _print_report(scenario: str, metrics: Dict[str, Any]) -> None:
+    print(f"\n== {scenario} ({metrics['iterations']} iterations)")
+    print(f"wall        p50 {metrics['wall_ms_p50']:9.2f} ms   p95 {metrics['wall_ms_p95']:9.2f} ms")
+    print(f"model       p50 {metrics['model_ms_p50']:9.2f} ms")
+    print(f"overhead    p50 {metrics['overhead_ms_p50']:9.2f} ms   max {metrics['overhead_ms_max']:9.2f} ms")
+    print(f"peak memory     {metrics['peak_memory_kb']:9.1f} KB")
+    for section, ms in metrics["sections_ms"].items():
+        print(f"  {section:<22} {ms:9.2f} ms")
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="Scenario to run (repeatable, default: all)")
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--job-post", type=Path, default=JOB_POST_PATH)
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="Allowed relative increase over the baseline")
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args(argv)
+
+    job_post = args.job_post.read_text(encoding="utf-8")
+    results = {}
+    for scenario in args.scenario or SCENARIOS:
+        results[scenario] = run_scenario(job_post, args.iterations, args.seed, **SCENARIOS[scenario])
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for scenario, metrics in results.items():
+            _print_report(scenario, metrics)
+
+    if args.update_baseline:
+        save_baselines(results, args.baseline)
+        print(f"\nBaselines written to {args.baseline}")
+        return 0
+
+    regressions = compare(results, load_baselines(args.baseline), args.tolerance)
+    if regressions:
+        print("\nRegressions:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+"""Deterministic in-process stand-ins for the embedding and inference models."""
+
+import math
+import random
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from src.models.base import BaseModel
+from src.analysis.job_analyzer import ANALYSIS_PROMPTS
+
+# A short post for tests that don't care about its content
+JOB_POST = "Build a Django REST API for shipment tracking with PostgreSQL."
+
+_VOCABULARY = (
+    "project client python django react api data model pipeline deploy test "
+    "design review deliver scope timeline budget experience solution approach "
+    "integrate optimize support chatbot platform backend frontend database team"
+).split()
+
+
+class LatencyModel:
+    """Latency distribution parsed from a spec such as 'lognormal:-3,0.5'.
+
+    Supported specs (all values in seconds):
+    - const:S
+    - uniform:LOW,HIGH
+    - normal:MEAN,STD (clipped at zero)
+    - lognormal:MU,SIGMA (of the underlying normal)
+    """
+
+    KINDS = ("const", "uniform", "normal", "lognormal")
+
+    def __init__(self, spec: Union[str, float] = 0.0):
+        if isinstance(spec, (int, float)):
+            spec = f"const:{spec}"
+        kind, _, args = spec.partition(":")
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown latency distribution: {kind}")
+        self.spec = spec
+        self.kind = kind
+        self.args = [float(a) for a in args.split(",") if a]
+
+    def sample(self, rng: random.Random) -> float:
+        """Draw one latency in seconds"""
+        if self.kind == "const":
+            return self.args[0] if self.args else 0.0
+        if self.kind == "uniform":
+            return rng.uniform(*self.args)
+        if self.kind == "normal":
+            return max(0.0, rng.gauss(*self.args))
+        return rng.lognormvariate(*self.args)
+
+    def mean(self) -> float:
+        """Expected latency in seconds"""
+        if self.kind == "const":
+            return self.args[0] if self.args else 0.0
+        if self.kind == "uniform":
+            return sum(self.args) / 2
+        if self.kind == "normal":
+            return max(0.0, self.args[0])
+        mu, sigma = self.args
+        return math.exp(mu + sigma ** 2 / 2)
+
+    def __repr__(self) -> str:
+        return f"LatencyModel({self.spec!r})"
+
+
+def section_for(messages: List[Dict[str, Any]]) -> str:
+    """Name of the analysis section a completion request belongs to"""
+    content = "\n".join(str(msg.get("content", "")) for msg in messages)
+    for key, prompt in ANALYSIS_PROMPTS.items():
+        if prompt in content:
+            return key
+    return "other"
+
+
+class FakeEmbedding(BaseModel):
+    """Embedding model returning seeded pseudo-random vectors"""
+
+    def __init__(self, latency: Union[str, float] = 0.0, dimensions: int = 768, seed: int = 0):
+        self.latency = LatencyModel(latency)
+        self.dimensions = dimensions
+        self.rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls: List[Tuple[float, float, float]] = []
+
+    def test_connection(self) -> bool:
+        return True
+
+    def embed(self, texts: List[str], **kwargs) -> List[List[float]]:
+        """Sleep for a sampled latency, then return one vector per text"""
+        start = time.perf_counter()
+        with self._lock:
+            delay = self.latency.sample(self.rng)
+        time.sleep(delay)
+        vectors = []
+        for text in texts:
+            text_rng = random.Random(zlib.crc32(text.encode("utf-8")))
+            vectors.append([text_rng.uniform(-1, 1) for _ in range(self.dimensions)])
+        with self._lock:
+            self.calls.append((start, time.perf_counter(), delay))
+        return vectors
+
+
+def numbered(text: str, words_per_item: int = 10) -> str:
+    """Lay filler text out as a numbered list, for prompts that ask for one"""
+    words = text.split()
+    return "\n".join(f"{index + 1}. " + " ".join(words[start:start + words_per_item])
+                     for index, start in enumerate(range(0, len(words), words_per_item)))
+
+
+class FakeInference(BaseModel):
+    """Inference model returning seeded filler text after a sampled delay.
+
+    output_words is either one size for every section or a per-section
+    mapping (missing sections fall back to 'default'). Every call is
+    recorded as (section, start, end, model_time) so benchmarks can
+    separate model time from orchestration overhead.
+    """
+
+    DEFAULT_OUTPUT_WORDS = {"default": 250, "proposal": 140}
+
+    def __init__(
+        self,
+        latency: Union[str, float] = 0.0,
+        output_words: Union[int, Dict[str, int], None] = None,
+        seed: int = 0,
+    ):
+        self.model = "fake-inference"
+        self.latency = LatencyModel(latency)
+        if isinstance(output_words, int):
+            output_words = {"default": output_words}
+        self.output_words = dict(output_words or self.DEFAULT_OUTPUT_WORDS)
+        self.rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls: List[Tuple[str, float, float, float]] = []
+
+    def test_connection(self) -> bool:
+        return True
+
+    def _words_for(self, section: str) -> int:
+        return self.output_words.get(section, self.output_words.get("default", 250))
+
+    def complete(self, messages: List[Dict[str, Any]], **kwargs) -> Dict[str, Any]:
+        """Sleep for a sampled latency, then return Ollama-shaped output"""
+        section = section_for(messages)
+        words = self._words_for(section)
+        max_tokens: Optional[int] = kwargs.get("max_tokens")
+        if max_tokens is not None:
+            # Roughly 0.75 words per token, like the real models
+            words = min(words, int(max_tokens * 0.75))
+        start = time.perf_counter()
+        with self._lock:
+            delay = self.latency.sample(self.rng)
+            content = " ".join(self.rng.choice(_VOCABULARY) for _ in range(words))
+        if "numbered list" in messages[-1]["content"]:
+            content = numbered(content)
+        time.sleep(delay)
+        with self._lock:
+            self.calls.append((section, start, time.perf_counter(), delay))
+        return {
+            "message": {
+                "role": "assistant",
+                "content": content
+            }
+        }
+
+
+class ScriptedInference(FakeInference):
+    """FakeInference that records every request as (section, user message)
+    and returns scripted replies for a section, in order, before falling back
+    to filler. A scripted exception is raised instead of returned.
+    """
+
+    def __init__(self, replies: Dict[str, List[Union[str, Exception]]] = None,
+                 latency: Union[str, float] = 0.0, **kwargs):
+        super().__init__(latency, **kwargs)
+        self.replies = {section: list(texts) for section, texts in (replies or {}).items()}
+        self.requests: List[Tuple[str, str]] = []
+
+    @property
+    def prompts(self) -> List[str]:
+        """The user message of every request, in order"""
+        return [content for _, content in self.requests]
+
+    def complete(self, messages: List[Dict[str, Any]], **kwargs) -> Dict[str, Any]:
+        section = section_for(messages)
+        with self._lock:
+            self.requests.append((section, messages[-1]["content"]))
+            reply = self.replies[section].pop(0) if self.replies.get(section) else None
+        if isinstance(reply, Exception):
+            raise reply
+        if reply is not None:
+            return {"message": {"role": "assistant", "content": reply}}
+        return super().complete(messages, **kwargs)
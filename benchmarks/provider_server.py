@@ -0,0 +1,457 @@
+"""Local stand-in for the Ollama and OpenRouter HTTP APIs.
+
+Implements the subset of endpoints used by ``src/models``:
+- Ollama: POST /api/chat, POST /api/generate, POST /api/embed, GET /api/tags, GET /api/ps
+- OpenRouter: POST /chat/completions, GET /models, GET /auth/key (also under /api/v1)
+
+Latency, token throughput, 429/Retry-After injection and mid-stream stalls
+are scriptable from the command line, from Python, or at runtime through
+POST /_control, so every provider code path can be exercised offline.
+
+Usage:
+    python -m benchmarks.provider_server --port 11434 --latency lognormal:-2,0.5 --tokens-per-second 40
+    OLLAMA_BASE_URL=http://127.0.0.1:11434 OPENROUTER_BASE_URL=http://127.0.0.1:11434/api/v1 ...
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import threading
+import time
+import zlib
+from collections import Counter, deque
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional
+
+from .fakes import LatencyModel, _VOCABULARY
+
+logger = logging.getLogger(__name__)
+
+# Context size Ollama loads a model with when a request sets no num_ctx
+DEFAULT_NUM_CTX = 2048
+
+
+class ProviderBehavior:
+    """Scriptable behavior shared by every request the server handles.
+
+    latency is a LatencyModel spec for time to first token and
+    tokens_per_second paces generation (0 means instant). rate_limit_rate
+    and stall_rate are probabilities per request. Entries pushed with
+    script() are consumed first, one per request, e.g.
+    {"status": 429, "retry_after": 2} or {"stall": 5}.
+    """
+
+    FIELDS = (
+        "latency", "tokens_per_second", "output_tokens", "embedding_dimensions",
+        "rate_limit_rate", "retry_after", "stall_rate", "stall_seconds",
+    )
+
+    def __init__(
+        self,
+        latency: Any = 0.0,
+        tokens_per_second: float = 0.0,
+        output_tokens: int = 200,
+        embedding_dimensions: int = 768,
+        rate_limit_rate: float = 0.0,
+        retry_after: float = 1.0,
+        stall_rate: float = 0.0,
+        stall_seconds: float = 30.0,
+        seed: int = 0,
+    ):
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+        self._script = deque()
+        self.latency = LatencyModel(latency)
+        self.tokens_per_second = tokens_per_second
+        self.output_tokens = output_tokens
+        self.embedding_dimensions = embedding_dimensions
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.stall_rate = stall_rate
+        self.stall_seconds = stall_seconds
+
+    def update(self, **changes) -> None:
+        """Change behavior while the server is running"""
+        with self._lock:
+            for name, value in changes.items():
+                if name not in self.FIELDS:
+                    raise ValueError(f"Unknown behavior field: {name}")
+                if name == "latency":
+                    value = LatencyModel(value)
+                setattr(self, name, value)
+
+    def script(self, *actions: Dict[str, Any]) -> None:
+        """Queue one-shot actions applied to the next requests in order"""
+        with self._lock:
+            self._script.extend(actions)
+
+    def plan(self) -> Dict[str, Any]:
+        """Decide how the next request is served"""
+        with self._lock:
+            if self._script:
+                action = dict(self._script.popleft())
+            else:
+                action = {}
+                if self._rng.random() < self.rate_limit_rate:
+                    action["status"] = 429
+                elif self._rng.random() < self.stall_rate:
+                    action["stall"] = self.stall_seconds
+            action.setdefault("retry_after", self.retry_after)
+            action.setdefault("delay", self.latency.sample(self._rng))
+            action.setdefault("tokens", self.output_tokens)
+            return action
+
+    def state(self) -> Dict[str, Any]:
+        with self._lock:
+            state = {name: getattr(self, name) for name in self.FIELDS}
+            state["latency"] = self.latency.spec
+            state["scripted"] = len(self._script)
+            return state
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, round(len(text.split()) * 4 / 3))
+
+
+def _tokens(seed_text: str, count: int) -> List[str]:
+    rng = random.Random(zlib.crc32(seed_text.encode("utf-8")))
+    tokens = [rng.choice(_VOCABULARY) + " " for _ in range(count)]
+    if "numbered list" in seed_text:
+        # Start an item every ten tokens, as a model following the prompt would
+        for index in range(0, count, 10):
+            tokens[index] = f"\n{index // 10 + 1}. {tokens[index]}"
+    return tokens
+
+
+def _embedding(text: str, dimensions: int) -> List[float]:
+    rng = random.Random(zlib.crc32(text.encode("utf-8")))
+    return [rng.uniform(-1, 1) for _ in range(dimensions)]
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "ProviderStandIn/1.0"
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def behavior(self) -> ProviderBehavior:
+        return self.server.behavior
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def _read_json(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        return json.loads(body or b"{}")
+
+    def _send_json(self, status: int, payload: Any, headers: Optional[Dict[str, str]] = None) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _start_stream(self, content_type: str) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def _write_chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _end_stream(self) -> None:
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _rate_limited(self, action: Dict[str, Any]) -> bool:
+        if action.get("status") != 429:
+            return False
+        retry_after = action["retry_after"]
+        self._send_json(429, {"error": "rate limited"}, {"Retry-After": f"{retry_after:g}"})
+        return True
+
+    def _generate(self, action: Dict[str, Any], seed_text: str) -> Iterator[str]:
+        """Yield tokens paced by latency, throughput and any scripted stall"""
+        time.sleep(action["delay"])
+        tokens = _tokens(seed_text, action["tokens"])
+        stall_at = len(tokens) // 2 if action.get("stall") else -1
+        interval = 1 / self.behavior.tokens_per_second if self.behavior.tokens_per_second else 0
+        for index, token in enumerate(tokens):
+            if index == stall_at:
+                time.sleep(action["stall"])
+            if interval:
+                time.sleep(interval)
+            yield token
+
+    def do_GET(self):
+        self.server.requests[self.path] += 1
+        if self.path == "/api/tags":
+            models = [{"name": name, "model": name, "modified_at": _now(), "size": 0}
+                      for name in self.server.models]
+            self._send_json(200, {"models": models})
+        elif self.path == "/api/ps":
+            models = [{"name": name, "model": name, "expires_at": _now(), "size_vram": 0}
+                      for name, loaded in self.server.loaded.items() if loaded]
+            self._send_json(200, {"models": models})
+        elif self.path.endswith("/auth/key"):
+            self._send_json(200, {"data": {"label": "stand-in", "usage": 0, "limit": None, "is_free_tier": True}})
+        elif self.path.endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": name, "object": "model"}
+                                                             for name in self.server.models]})
+        elif self.path == "/_control":
+            self._send_json(200, {"behavior": self.behavior.state(), "requests": dict(self.server.requests)})
+        else:
+            self._send_json(404, {"error": f"unknown path {self.path}"})
+
+    def do_POST(self):
+        self.server.requests[self.path] += 1
+        try:
+            payload = self._read_json()
+        except json.JSONDecodeError:
+            self._send_json(400, {"error": "invalid JSON"})
+            return
+        if self.path == "/_control":
+            try:
+                self.behavior.update(**payload.get("update", {}))
+            except ValueError as e:
+                self._send_json(400, {"error": str(e)})
+                return
+            self.behavior.script(*payload.get("script", []))
+            self._send_json(200, {"behavior": self.behavior.state()})
+        else:
+            try:
+                self._dispatch_post(payload)
+            except (BrokenPipeError, ConnectionResetError):
+                # The client hung up mid-response, e.g. a cancelled stream
+                self.server.cancelled[self.path] += 1
+                self.close_connection = True
+
+    def _dispatch_post(self, payload: Dict[str, Any]) -> None:
+        if self.path == "/api/generate":
+            self._ollama_generate(payload)
+        elif self.path == "/api/chat":
+            self._ollama_generate(payload, chat=True)
+        elif self.path == "/api/embed":
+            self._ollama_embed(payload)
+        elif self.path.split("?")[0].endswith("/chat/completions"):
+            self._openrouter_chat(payload)
+        else:
+            self._send_json(404, {"error": f"unknown path {self.path}"})
+
+    def _ollama_generate(self, payload: Dict[str, Any], chat: bool = False) -> None:
+        """/api/generate, or /api/chat with chat set (same body apart from
+        messages in place of prompt, and message in place of response)"""
+        action = self.behavior.plan()
+        if self._rate_limited(action):
+            return
+        model = payload.get("model", "")
+        if chat:
+            prompt = "\n".join(str(msg.get("content", "")) for msg in payload.get("messages", []))
+        else:
+            prompt = payload.get("prompt", "")
+
+        def reply(text: str) -> Dict[str, Any]:
+            return {"message": {"role": "assistant", "content": text}} if chat else {"response": text}
+
+        if not prompt:
+            # Ollama treats a prompt-less request as a load (or, with keep_alive 0, unload)
+            self.server.loaded[model] = payload.get("keep_alive") not in (0, "0")
+            self.server.num_ctx[model] = (payload.get("options") or {}).get("num_ctx", DEFAULT_NUM_CTX)
+            self.server.prompts.pop(model, None)
+            reason = "load" if self.server.loaded[model] else "unload"
+            self._send_json(200, {"model": model, "created_at": _now(), **reply(""),
+                                  "done": True, "done_reason": reason})
+            return
+        options = payload.get("options") or {}
+        num_ctx = options.get("num_ctx", DEFAULT_NUM_CTX)
+        if self.server.loaded.get(model) and self.server.num_ctx.get(model, DEFAULT_NUM_CTX) != num_ctx:
+            self.server.reloads[model] += 1
+            self.server.prompts.pop(model, None)
+        self.server.loaded[model] = True
+        self.server.num_ctx[model] = num_ctx
+        # Like Ollama, only the part after the prefix shared with the previous
+        # prompt is evaluated; the rest comes from the cache
+        cached = os.path.commonprefix([self.server.prompts.get(model, ""), prompt])
+        self.server.prompts[model] = prompt
+        evaluated = max(1, _estimate_tokens(prompt) - _estimate_tokens(cached))
+        # Ollama keeps only the end of a prompt that doesn't fit the context
+        prompt_tokens = min(evaluated, num_ctx)
+        # A sampling seed changes the output, like it does in Ollama
+        seed_text = f"{prompt}#{options['seed']}" if "seed" in options else prompt
+        num_predict = options.get("num_predict")
+        if num_predict is not None and num_predict >= 0:
+            action["tokens"] = min(action["tokens"], num_predict)
+        start = time.perf_counter()
+        final = {
+            "model": model, "created_at": _now(), "done": True, "done_reason": "stop",
+            "prompt_eval_count": prompt_tokens, "eval_count": action["tokens"],
+        }
+        if payload.get("stream", True):
+            self._start_stream("application/x-ndjson")
+            for token in self._generate(action, seed_text):
+                chunk = {"model": model, "created_at": _now(), **reply(token), "done": False}
+                self._write_chunk(json.dumps(chunk).encode("utf-8") + b"\n")
+            final.update(reply(""), total_duration=int((time.perf_counter() - start) * 1e9))
+            self._write_chunk(json.dumps(final).encode("utf-8") + b"\n")
+            self._end_stream()
+        else:
+            text = "".join(self._generate(action, seed_text)).strip()
+            final.update(reply(text), total_duration=int((time.perf_counter() - start) * 1e9))
+            self._send_json(200, final)
+
+    def _ollama_embed(self, payload: Dict[str, Any]) -> None:
+        action = self.behavior.plan()
+        if self._rate_limited(action):
+            return
+        texts = payload.get("input", [])
+        if isinstance(texts, str):
+            texts = [texts]
+        self.server.loaded[payload.get("model", "")] = payload.get("keep_alive") not in (0, "0")
+        time.sleep(action["delay"])
+        dimensions = self.behavior.embedding_dimensions
+        self._send_json(200, {
+            "model": payload.get("model", ""),
+            "embeddings": [_embedding(text, dimensions) for text in texts],
+            "prompt_eval_count": sum(_estimate_tokens(text) for text in texts),
+        })
+
+    def _openrouter_chat(self, payload: Dict[str, Any]) -> None:
+        action = self.behavior.plan()
+        if self._rate_limited(action):
+            return
+        model = payload.get("model", "")
+        prompt = "\n".join(str(msg.get("content", "")) for msg in payload.get("messages", []))
+        max_tokens = payload.get("max_tokens")
+        if max_tokens is not None:
+            action["tokens"] = min(action["tokens"], max_tokens)
+        completion_id = f"gen-{zlib.crc32(prompt.encode('utf-8')):08x}"
+        choices = max(1, int(payload.get("n") or 1))
+        usage = {
+            "prompt_tokens": _estimate_tokens(prompt),
+            "completion_tokens": action["tokens"] * choices,
+            "total_tokens": _estimate_tokens(prompt) + action["tokens"] * choices,
+        }
+        if payload.get("stream"):
+            self._start_stream("text/event-stream")
+            for token in self._generate(action, prompt):
+                chunk = {"id": completion_id, "model": model,
+                         "choices": [{"index": 0, "delta": {"role": "assistant", "content": token}}]}
+                self._write_chunk(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            final = {"id": completion_id, "model": model, "usage": usage,
+                     "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+            self._write_chunk(f"data: {json.dumps(final)}\n\n".encode("utf-8"))
+            self._write_chunk(b"data: [DONE]\n\n")
+            self._end_stream()
+        else:
+            texts = ["".join(self._generate(action, f"{prompt}#{index}" if index else prompt)).strip()
+                     for index in range(choices)]
+            self._send_json(200, {
+                "id": completion_id, "model": model, "object": "chat.completion",
+                "choices": [{"index": index, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": text}}
+                            for index, text in enumerate(texts)],
+                "usage": usage,
+            })
+
+
+class ProviderServer(ThreadingHTTPServer):
+    """Threaded HTTP server emulating Ollama and OpenRouter.
+
+    Use as a context manager to run it on a background thread:
+
+        with ProviderServer(port=0) as server:
+            model = OllamaInference(base_url=server.url)
+    """
+
+    daemon_threads = True
+    DEFAULT_MODELS = ("deepseek-coder-v2:latest", "nomic-embed-text:latest")
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, behavior: ProviderBehavior = None,
+                 models: List[str] = None):
+        super().__init__((host, port), _Handler)
+        self.behavior = behavior or ProviderBehavior()
+        self.models = list(models or self.DEFAULT_MODELS)
+        self.requests: Counter = Counter()
+        self.cancelled: Counter = Counter()
+        self.loaded: Dict[str, bool] = {}
+        # num_ctx each model is loaded with; a different one reloads it, like Ollama
+        self.num_ctx: Dict[str, int] = {}
+        self.reloads: Counter = Counter()
+        # Last prompt evaluated per model, for prefix caching; dropped on reload
+        self.prompts: Dict[str, str] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "ProviderServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        logger.info(f"Provider stand-in listening on {self.url}")
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self) -> "ProviderServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--latency", default="0", help="Time to first token, e.g. 0.2 or lognormal:-2,0.5")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="0 generates instantly")
+    parser.add_argument("--output-tokens", type=int, default=200)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--stall-rate", type=float, default=0.0, help="Fraction of requests that stall mid-generation")
+    parser.add_argument("--stall-seconds", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    latency = float(args.latency) if args.latency.replace(".", "", 1).isdigit() else args.latency
+    behavior = ProviderBehavior(
+        latency=latency,
+        tokens_per_second=args.tokens_per_second,
+        output_tokens=args.output_tokens,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+        stall_rate=args.stall_rate,
+        stall_seconds=args.stall_seconds,
+        seed=args.seed,
+    )
+    logging.basicConfig(level=logging.INFO)
+    server = ProviderServer(args.host, args.port, behavior)
+    logger.info(f"Provider stand-in listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
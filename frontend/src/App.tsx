@@ -8,7 +8,7 @@ interface AnalysisResults {
   solutionAnalysis: string;
   questionsAnalysis: string;
   proposal: string;
-  prompt: string;
+  prompt?: string;
 }
 
 const App: React.FC = () => {
@@ -15,17 +15,27 @@ interface JobPostAnalysisResponse {
   solutionAnalysis: string;
   questionsAnalysis: string;
   proposal: string;
-  prompt: string;
+  prompt?: string;
 }
 
 export const analyzeJobPost = async (request: JobPostAnalysisRequest): Promise<JobPostAnalysisResponse> => {
+  // One key per submission: a retry joins or replays the first attempt instead of rerunning it
+  const idempotencyKey = crypto.randomUUID();
+  const submit = () => axios.post<JobPostAnalysisResponse>(`${API_BASE_URL}/job-analysis/`, {
+    job_post: request.jobPost,
+    embedding_model: request.embeddingModel,
+    inference_model: request.inferenceModel
+  }, {
+    headers: { 'Idempotency-Key': idempotencyKey }
+  });
   try {
-    const response = await axios.post<JobPostAnalysisResponse>(`${API_BASE_URL}/job-analysis/`, {
-      job_post: request.jobPost,
-      embedding_model: request.embeddingModel,
-      inference_model: request.inferenceModel
-    });
-    return response.data;
+    try {
+      return (await submit()).data;
+    } catch (error) {
+      // Retry once when the request never got a response (dropped connection)
+      if ((error as any)?.response) throw error;
+      return (await submit()).data;
+    }
   } catch (error) {
     const err = error as any;
     throw new Error(err?.response?.data?.error || 'Failed to analyze job post');
@@ -1,3 +1,6 @@
-﻿from .job_analyzer import JobAnalyzer
+﻿from .chunking import ChunkedEmbedding
+from .incremental import AnalysisCache
+from .job_analyzer import JobAnalyzer
+from .token_budget import TokenBudget
 
-__all__ = ['JobAnalyzer']
+__all__ = ['AnalysisCache', 'ChunkedEmbedding', 'JobAnalyzer', 'TokenBudget']
@@ -0,0 +1,306 @@
+"""Analyze feeds of job posts in bulk, with checkpoint/resume.
+
+Posts are streamed from JSONL files (one object per line, or a directory of
+.jsonl, .md and .txt files) and analyzed with bounded concurrency, spread
+over one or more inference providers. Every result is appended to a JSONL
+output file and flushed as soon as it is ready, and the output file doubles
+as the checkpoint: a rerun with the same output skips the posts that already
+succeeded, so a crash or a rate-limit stall never redoes finished work.
+Failed posts are written too, with the failed sections, and retried on the
+next run. After max_failures failed posts in a row the run stops early
+instead of burning through the rest of the feed.
+
+Usage:
+    python -m src.analysis.bulk posts.jsonl -o results.jsonl
+    python -m src.analysis.bulk exports/ -o results.jsonl --provider ollama --provider openrouter
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Set
+
+from ..models import FallbackEmbedding, LocalEmbedding, OllamaEmbedding, OllamaInference, OpenRouterModel
+from ..models.base import BaseModel
+from ..monitoring import registry
+from .chunking import ChunkedEmbedding
+from .job_analyzer import JobAnalyzer
+
+logger = logging.getLogger(__name__)
+
+# Record keys tried in order for the post text and for a stable id
+TEXT_FIELDS = ("job_post", "description", "text", "content")
+ID_FIELDS = ("id", "ciphertext", "uid", "url")
+POST_SUFFIXES = (".md", ".txt")
+
+
+def post_id(record: Dict[str, Any], text: str) -> str:
+    """The record's own id, or a hash of the post text"""
+    for field in ID_FIELDS:
+        if record.get(field):
+            return str(record[field])
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+def _read_jsonl(path: Path) -> Iterator[Dict[str, Any]]:
+    with path.open(encoding="utf-8") as handle:
+        for number, line in enumerate(handle, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                logger.warning(f"Skipping {path}:{number}: {e}")
+                continue
+            text = next((record[field] for field in TEXT_FIELDS
+                         if isinstance(record, dict) and isinstance(record.get(field), str)), None)
+            if not text or not text.strip():
+                logger.warning(f"Skipping {path}:{number}: no job post text")
+                continue
+            yield {"id": post_id(record, text), "job_post": text, "source": f"{path}:{number}"}
+
+
+def iter_posts(path: Path) -> Iterator[Dict[str, Any]]:
+    """Yield {"id", "job_post", "source"} for each post in a JSONL file or directory.
+
+    A directory is walked in sorted order; .jsonl files hold one post per
+    line and .md/.txt files are one post each, identified by their path.
+    """
+    path = Path(path)
+    if path.is_file():
+        yield from _read_jsonl(path)
+        return
+    for child in sorted(path.rglob("*")):
+        if child.suffix == ".jsonl":
+            yield from _read_jsonl(child)
+        elif child.suffix in POST_SUFFIXES:
+            text = child.read_text(encoding="utf-8")
+            if text.strip():
+                yield {"id": str(child.relative_to(path)), "job_post": text, "source": str(child)}
+
+
+class ResultsFile:
+    """Append-only JSONL results that double as the checkpoint.
+
+    Opening an existing file reads back the ids of the posts that succeeded
+    and drops a partial last line left by a crash mid-write.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.done: Set[str] = set()
+        self._lock = threading.Lock()
+        if self.path.exists():
+            self._load()
+        self._file = self.path.open("a", encoding="utf-8")
+
+    def _load(self) -> None:
+        with self.path.open("rb") as handle:
+            data = handle.read()
+        complete = data[:data.rfind(b"\n") + 1]
+        if len(complete) < len(data):
+            logger.warning(f"Dropping a partial last line from {self.path}")
+            with self.path.open("r+b") as handle:
+                handle.truncate(len(complete))
+        for line in complete.decode("utf-8").splitlines():
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if not record.get("failed"):
+                self.done.add(record["id"])
+
+    def write(self, record: Dict[str, Any]) -> None:
+        """Append one record and push it to disk before returning"""
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            if not record.get("failed"):
+                self.done.add(record["id"])
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "ResultsFile":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class BulkAnalyzer:
+    """Run JobAnalyzer over many posts, concurrency-bounded per provider.
+
+    providers maps a name to an inference model; each gets per_provider
+    slots and a post goes to whichever provider frees a slot first, so a
+    slow or throttled provider simply takes fewer posts.
+    """
+
+    def __init__(self, providers: Dict[str, BaseModel], embedding_model: BaseModel = None,
+                 per_provider: int = 2, max_failures: int = 5, include_timings: bool = False,
+                 **analyzer_options):
+        if not providers:
+            raise ValueError("At least one inference provider is required")
+        self.providers = providers
+        self.embedding_model = embedding_model
+        self.per_provider = per_provider
+        self.max_failures = max_failures
+        self.include_timings = include_timings
+        self.analyzer_options = analyzer_options
+
+    def analyze(self, post: Dict[str, Any], provider: str) -> Dict[str, Any]:
+        """Analyze one post; the record lists failed sections, if any.
+
+        Only missing sections and errors fail a post (and get it redone on
+        resume); complete but badly formatted sections are listed under
+        "problems" instead.
+        """
+        start = time.perf_counter()
+        record = {"id": post["id"], "source": post["source"], "provider": provider}
+        try:
+            analyzer = JobAnalyzer(embedding_model=self.embedding_model, inference_model=self.providers[provider],
+                                   **self.analyzer_options)
+            results = analyzer.analyze_job_post(post["job_post"], include_timings=self.include_timings,
+                                                include_fields=True)
+        except Exception as e:
+            record["failed"] = ["all"]
+            record["error"] = str(e)
+        else:
+            problems = analyzer.section_problems(results)
+            failed = [key for key, found in problems.items() if {"missing", "error"} & set(found)]
+            record["result"] = results
+            if failed:
+                record["failed"] = failed
+            problems = {key: found for key, found in problems.items() if key not in failed}
+            if problems:
+                record["problems"] = problems
+        record["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        return record
+
+    def run(self, posts: Iterable[Dict[str, Any]], results: ResultsFile) -> Dict[str, int]:
+        """Analyze every post not already in results; returns counts by outcome.
+
+        Posts are pulled from the iterable only as slots free up, so a feed
+        of any size is never held in memory.
+        """
+        slots: "queue.Queue[str]" = queue.Queue()
+        for name in self.providers:
+            for _ in range(self.per_provider):
+                slots.put(name)
+        counts = {"succeeded": 0, "failed": 0, "skipped": 0}
+        consecutive = 0
+        stop = threading.Event()
+        lock = threading.Lock()
+        seen: Set[str] = set()
+
+        def finish(post: Dict[str, Any], provider: str) -> None:
+            nonlocal consecutive
+            try:
+                record = self.analyze(post, provider)
+                results.write(record)
+                outcome = "failed" if record.get("failed") else "succeeded"
+                registry.inc("freelance_bulk_posts_total", outcome=outcome, provider=provider)
+                logger.info(f"{post['id']}: {outcome} via {provider} in {record['elapsed_ms'] / 1000:.1f}s")
+                with lock:
+                    counts[outcome] += 1
+                    consecutive = consecutive + 1 if record.get("failed") else 0
+                    if self.max_failures and consecutive >= self.max_failures:
+                        stop.set()
+            except Exception:
+                logger.exception(f"Could not record {post['id']}")
+                stop.set()
+            finally:
+                # Released last, so the next post sees a stop this one caused
+                slots.put(provider)
+
+        with ThreadPoolExecutor(max_workers=slots.qsize()) as executor:
+            for post in posts:
+                if post["id"] in results.done or post["id"] in seen:
+                    counts["skipped"] += 1
+                    registry.inc("freelance_bulk_posts_total", outcome="skipped")
+                    continue
+                provider = slots.get()
+                if stop.is_set():
+                    logger.warning(f"Stopping after {self.max_failures} failed posts in a row; rerun to resume")
+                    break
+                seen.add(post["id"])
+                executor.submit(finish, post, provider)
+        counts["stopped"] = int(stop.is_set())
+        return counts
+
+
+def build_provider(name: str) -> BaseModel:
+    """Inference model for a --provider name"""
+    if name == "ollama":
+        return OllamaInference()
+    api_key = os.getenv("OPENROUTER_API_KEY")
+    if not api_key:
+        raise SystemExit("OPENROUTER_API_KEY is required for --provider openrouter")
+    return OpenRouterModel(api_key=api_key)
+
+
+def build_embedding(name: str, local: LocalEmbedding = None) -> BaseModel:
+    """Embedding model for --embedding, with the local fallback the API uses"""
+    local = local or LocalEmbedding()
+    if name == "local":
+        return local
+    return FallbackEmbedding(ChunkedEmbedding(OllamaEmbedding()), local)
+
+
+def fit_local_embedding(posts: Iterable[Dict[str, Any]], path: Path) -> LocalEmbedding:
+    """A LocalEmbedding fitted on the posts, saved to path for the API to load
+    (LOCAL_EMBEDDING_PATH)"""
+    local = LocalEmbedding()
+    batch = []
+    for post in posts:
+        batch.append(post["job_post"])
+        if len(batch) == 1000:
+            local.fit(batch)
+            batch = []
+    local.fit(batch)
+    local.save(str(path))
+    logger.info(f"Fitted the local embedding on {local.documents} posts, saved to {path}")
+    return local
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input", type=Path, help="JSONL file or directory of posts")
+    parser.add_argument("-o", "--output", type=Path, required=True,
+                        help="Results JSONL; rerunning with the same file resumes")
+    parser.add_argument("--provider", action="append", choices=("ollama", "openrouter"),
+                        help="Inference provider (repeatable, default: ollama)")
+    parser.add_argument("--per-provider", type=int, default=2, help="Posts in flight per provider")
+    parser.add_argument("--embedding", choices=("ollama", "local"), default="ollama")
+    parser.add_argument("--fit-local", type=Path, metavar="PATH",
+                        help="Fit the local embedding's document frequencies on the input first and save them to PATH")
+    parser.add_argument("--max-failures", type=int, default=5,
+                        help="Stop after this many failed posts in a row (0 never stops)")
+    parser.add_argument("--proposal-candidates", type=int, default=1)
+    parser.add_argument("--timings", action="store_true", help="Include the timing breakdown")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    providers = {name: build_provider(name) for name in dict.fromkeys(args.provider or ["ollama"])}
+    local = fit_local_embedding(iter_posts(args.input), args.fit_local) if args.fit_local else None
+    bulk = BulkAnalyzer(providers, build_embedding(args.embedding, local), per_provider=args.per_provider,
+                        max_failures=args.max_failures, include_timings=args.timings,
+                        proposal_candidates=args.proposal_candidates)
+    with ResultsFile(args.output) as results:
+        counts = bulk.run(iter_posts(args.input), results)
+    print(json.dumps(counts))
+    return 1 if counts["failed"] or counts["stopped"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+"""Embed long posts in overlapping chunks instead of one truncated string.
+
+Embedding models only read their context window (nomic-embed-text under
+Ollama's default num_ctx reads 2048 tokens), so embedding a long post as one
+string silently drops the rest. ChunkedEmbedding splits each text into
+overlapping token windows, sends the chunks of all texts in batches (several
+batches at once), and pools each text's chunk vectors into one document
+vector weighted by chunk length.
+"""
+
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from ..models.base import BaseModel
+from ..monitoring import span, with_context
+from .tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_TOKENS = 512
+DEFAULT_CHUNK_OVERLAP = 64
+DEFAULT_BATCH_SIZE = 16
+DEFAULT_MAX_WORKERS = 4
+
+_WORD = re.compile(r"\S+")
+
+
+def chunk_text(text: str, chunk_tokens: int = DEFAULT_CHUNK_TOKENS, overlap: int = DEFAULT_CHUNK_OVERLAP,
+               model: str = None) -> List[Dict[str, Any]]:
+    """Split text into windows of about chunk_tokens tokens, each repeating
+    the last overlap tokens of the one before.
+
+    Returns [{"text", "start", "end", "tokens"}] with character offsets.
+    """
+    if overlap >= chunk_tokens:
+        raise ValueError("overlap must be smaller than chunk_tokens")
+    words = [(match.start(), match.end(), estimate_tokens(match.group(0), model) or 1)
+             for match in _WORD.finditer(text)]
+    if not words:
+        return []
+
+    chunks = []
+    first = 0
+    while True:
+        last, tokens = first, 0
+        while last < len(words) and (tokens + words[last][2] <= chunk_tokens or last == first):
+            tokens += words[last][2]
+            last += 1
+        start, end = words[first][0], words[last - 1][1]
+        chunks.append({"text": text[start:end], "start": start, "end": end, "tokens": tokens})
+        if last == len(words):
+            return chunks
+        # Step back over about overlap tokens, but always move forward
+        back, carried = last, 0
+        while back - 1 > first and carried + words[back - 1][2] <= overlap:
+            back -= 1
+            carried += words[back][2]
+        first = back
+
+
+class ChunkedEmbedding(BaseModel):
+    """Wrap an embedding model so long texts are embedded chunk by chunk"""
+
+    def __init__(self, embedding_model: BaseModel, chunk_tokens: int = DEFAULT_CHUNK_TOKENS,
+                 overlap: int = DEFAULT_CHUNK_OVERLAP, batch_size: int = DEFAULT_BATCH_SIZE,
+                 max_workers: int = DEFAULT_MAX_WORKERS):
+        self.embedding_model = embedding_model
+        self.model = getattr(embedding_model, "model", None)
+        self.chunk_tokens = chunk_tokens
+        self.overlap = overlap
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+
+    def test_connection(self) -> bool:
+        return self.embedding_model.test_connection()
+
+    def probe(self) -> Dict[str, Any]:
+        return self.embedding_model.probe()
+
+    def _embed_chunks(self, texts: List[str]) -> np.ndarray:
+        """Embed chunk texts in batches, several batches in flight at once"""
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        if len(batches) == 1 or self.max_workers <= 1:
+            results = [self.embedding_model.embed(batch) for batch in batches]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as executor:
+                results = list(executor.map(with_context(self.embedding_model.embed), batches))
+        return np.asarray([vector for batch in results for vector in batch], dtype=np.float32)
+
+    def embed_documents(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """Embed each text as chunks.
+
+        Returns one {"chunks": float32 (n_chunks, dim) matrix, "vector":
+        float32 pooled vector, "spans": [(start, end)]} per text.
+        """
+        pieces: List[List[Dict[str, Any]]] = []
+        flat: List[str] = []
+        for text in texts:
+            chunks = chunk_text(text, self.chunk_tokens, self.overlap, self.model)
+            # Empty texts are still embedded once so every text gets a vector
+            chunks = chunks or [{"text": text, "start": 0, "end": len(text), "tokens": 1}]
+            pieces.append(chunks)
+            flat.extend(chunk["text"] for chunk in chunks)
+
+        with span("embedding.chunks", model=self.model) as record:
+            record.update(texts=len(texts), chunks=len(flat))
+            matrix = self._embed_chunks(flat)
+
+        documents = []
+        offset = 0
+        for chunks in pieces:
+            rows = matrix[offset:offset + len(chunks)]
+            offset += len(chunks)
+            weights = np.asarray([chunk["tokens"] for chunk in chunks], dtype=np.float32)
+            documents.append({
+                "chunks": rows,
+                "vector": (weights @ rows) / weights.sum(),
+                "spans": [(chunk["start"], chunk["end"]) for chunk in chunks],
+            })
+        return documents
+
+    def embed_matrix(self, texts: List[str]) -> np.ndarray:
+        """Pooled document vectors as one float32 (len(texts), dim) matrix"""
+        return np.stack([document["vector"] for document in self.embed_documents(texts)])
+
+    def embed(self, texts: List[str], **kwargs) -> List[List[float]]:
+        """One pooled vector per text, in the wrapped model's list format"""
+        return self.embed_matrix(texts).tolist() if texts else []
+
+
+def cosine_similarity(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Cosine similarity between the rows of a and the rows of b"""
+    a = np.atleast_2d(np.asarray(a, dtype=np.float32))
+    b = np.atleast_2d(np.asarray(b, dtype=np.float32))
+    a = a / np.maximum(np.linalg.norm(a, axis=1, keepdims=True), 1e-12)
+    b = b / np.maximum(np.linalg.norm(b, axis=1, keepdims=True), 1e-12)
+    return a @ b.T
@@ -0,0 +1,165 @@
+"""Extractive compression of long job posts, per section.
+
+Long posts (pasted specs, attachments) make prefill dominate latency and
+can overflow the context of smaller models. SectionCompressor splits the
+post into sentences once, builds TF-IDF vectors for them, and keeps the
+sentences most relevant to a prompt (and to the post as a whole) until the
+token budget is spent. Kept sentences stay in their original order; the
+title and the extracted Budget/Duration/Skills lines are always kept.
+
+split() serves a whole analysis: one excerpt shared by every section, so
+their prompts keep a common prefix the provider can cache, plus the few
+sentences each section adds on its own.
+"""
+
+import math
+import re
+from collections import Counter
+from typing import Dict, List
+
+from .tokens import estimate_tokens
+
+DEFAULT_MAX_INPUT_TOKENS = 1500
+
+# Share of the budget spent on the excerpt every section shares in split()
+SHARED_SHARE = 0.75
+
+# Weight of similarity to the section prompt vs. to the whole post
+PROMPT_WEIGHT = 0.6
+
+GAP_MARKER = "\n[...]\n"
+
+_SENTENCE = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'(])")
+_TERM = re.compile(r"[a-z][a-z0-9+#.-]*[a-z0-9+#]|[a-z]")
+_PINNED = re.compile(r"^(budget|duration|skills):", re.IGNORECASE)
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or our the this to we with will you your "
+    "they their be been can should would could must any all more most other such than that these those".split()
+)
+
+
+def _terms(text: str) -> List[str]:
+    return [term for term in _TERM.findall(text.lower()) if term not in _STOPWORDS]
+
+
+class SectionCompressor:
+    """Select a bounded, section-specific excerpt of one job post"""
+
+    def __init__(self, text: str, model: str = None):
+        self.text = text
+        self.model = model
+        # Units are sentences, grouped by the line they came from
+        self.units: List[Dict] = []
+        for line_index, line in enumerate(text.split("\n")):
+            for sentence in _SENTENCE.split(line.strip()) if line.strip() else []:
+                self.units.append({
+                    "line": line_index,
+                    "text": sentence,
+                    "tokens": estimate_tokens(sentence, model) + 1,
+                    "pinned": not self.units or bool(_PINNED.match(sentence)),
+                    "terms": Counter(_terms(sentence)),
+                })
+        document_frequency = Counter(term for unit in self.units for term in unit["terms"])
+        count = len(self.units) or 1
+        self.idf = {term: math.log((1 + count) / (1 + df)) + 1 for term, df in document_frequency.items()}
+        for unit in self.units:
+            unit["vector"] = self._normalize({term: tf * self.idf[term] for term, tf in unit["terms"].items()})
+        centroid: Counter = Counter()
+        for unit in self.units:
+            centroid.update(unit["vector"])
+        self.centroid = self._normalize(centroid)
+        self.total_tokens = sum(unit["tokens"] for unit in self.units)
+
+    @staticmethod
+    def _normalize(vector: Dict[str, float]) -> Dict[str, float]:
+        norm = math.sqrt(sum(value * value for value in vector.values()))
+        return {term: value / norm for term, value in vector.items()} if norm else {}
+
+    @staticmethod
+    def _cosine(a: Dict[str, float], b: Dict[str, float]) -> float:
+        if len(a) > len(b):
+            a, b = b, a
+        return sum(value * b.get(term, 0.0) for term, value in a.items())
+
+    def _query_vector(self, query: str) -> Dict[str, float]:
+        # Terms the post never uses can't help rank its sentences
+        return self._normalize({term: tf * self.idf[term] for term, tf in Counter(_terms(query)).items()
+                                if term in self.idf})
+
+    def select(self, query: str, budget: int) -> Dict:
+        """Keep the sentences most relevant to query within budget tokens.
+
+        Returns {"text", "tokens", "kept", "total"}.
+        """
+        if self.total_tokens <= budget:
+            return {"text": self.text, "tokens": self.total_tokens, "kept": len(self.units), "total": len(self.units)}
+        return self._excerpt(self._choose(query, budget, self._pinned()))
+
+    def split(self, queries: Dict[str, str], budget: int) -> Dict:
+        """One excerpt shared by every query plus, per query, the sentences it
+        adds; each query's shared and own text fit budget tokens together.
+
+        Returns {"shared": {...}, "sections": {key: {...}}}, each excerpt like
+        select's; a section's text is empty when it adds nothing.
+        """
+        none = {"text": "", "tokens": 0, "kept": 0, "total": len(self.units)}
+        if self.total_tokens <= budget:
+            return {"shared": self.select("", budget), "sections": {key: dict(none) for key in queries}}
+        shared = self._choose(" ".join(queries.values()), int(budget * SHARED_SHARE), self._pinned())
+        excerpt = self._excerpt(shared)
+        sections = {}
+        for key, query in queries.items():
+            own = self._choose(query, budget - excerpt["tokens"], [], exclude=set(shared), weight=1.0)
+            sections[key] = self._excerpt(own) if own else dict(none)
+        return {"shared": excerpt, "sections": sections}
+
+    def _pinned(self) -> List[int]:
+        return [index for index, unit in enumerate(self.units) if unit["pinned"]]
+
+    def _excerpt(self, indexes: List[int]) -> Dict:
+        text = self._render(indexes)
+        return {"text": text, "tokens": estimate_tokens(text, self.model), "kept": len(indexes),
+                "total": len(self.units)}
+
+    def _choose(self, query: str, budget: int, chosen: List[int], exclude=(),
+                weight: float = PROMPT_WEIGHT) -> List[int]:
+        """chosen plus the best-ranked other sentences that fit budget, in order.
+
+        With weight 1.0 only sentences that share terms with query qualify.
+        """
+        query_vector = self._query_vector(query)
+        # Any kept sentence may open a gap, so each is charged for a marker too
+        marker = estimate_tokens(GAP_MARKER, self.model)
+        chosen = list(chosen)
+        spent = sum(self.units[index]["tokens"] + marker for index in chosen)
+        scores = {
+            index: weight * self._cosine(self.units[index]["vector"], query_vector)
+            + (1 - weight) * self._cosine(self.units[index]["vector"], self.centroid)
+            for index in range(len(self.units)) if index not in chosen and index not in exclude
+        }
+        ranked = sorted((index for index, score in scores.items() if score > 0 or weight < 1.0),
+                        key=lambda index: (-scores[index], index))
+        for index in ranked:
+            cost = self.units[index]["tokens"] + marker
+            if spent + cost <= budget:
+                chosen.append(index)
+                spent += cost
+        return sorted(chosen)
+
+    def _render(self, indexes) -> str:
+        """Join kept sentences, keeping line breaks and marking gaps"""
+        parts: List[str] = []
+        previous = None
+        for index in indexes:
+            unit = self.units[index]
+            if previous is None:
+                pass
+            elif index != previous + 1:
+                parts.append(GAP_MARKER)
+            elif unit["line"] != self.units[previous]["line"]:
+                parts.append("\n")
+            else:
+                parts.append(" ")
+            parts.append(unit["text"])
+            previous = index
+        return "".join(parts)
@@ -0,0 +1,154 @@
+"""Reuse section results when a job post is re-run after a small edit.
+
+AnalysisCache keeps recent analyses keyed by a normalized post fingerprint.
+On a new run it finds the most similar cached post for the same model and
+reuses every section whose prompt is unchanged and whose own source text
+differs from the new post by no more than that section's threshold (as a
+fraction of words changed). Each reused section remembers the text it was
+computed from, so a series of small edits can't drift past the threshold.
+"""
+
+import difflib
+import hashlib
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+# Fraction of words that may change before a section is recomputed. The
+# proposal quotes specifics (budget, timeline, names), so any edit reruns it.
+DEFAULT_REUSE_THRESHOLD = 0.05
+SECTION_REUSE_THRESHOLDS = {
+    'proposal': 0.0,
+}
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_post(job_post: str) -> str:
+    """Normalize unicode, case and whitespace so cosmetic edits don't count"""
+    text = unicodedata.normalize('NFKC', job_post).lower()
+    return _WHITESPACE.sub(' ', text).strip()
+
+
+def post_fingerprint(job_post: str) -> str:
+    return _fingerprint_and_words(job_post)[0]
+
+
+def _fingerprint_and_words(job_post: str) -> Tuple[str, Tuple[str, ...]]:
+    normalized = normalize_post(job_post)
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest(), tuple(normalized.split())
+
+
+def _prompt_hash(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:16]
+
+
+def _difference(old: Tuple[str, ...], new: Tuple[str, ...]) -> float:
+    """Fraction of words changed between two posts (0.0 = identical)"""
+    if old == new:
+        return 0.0
+    return 1.0 - difflib.SequenceMatcher(None, old, new, autojunk=False).ratio()
+
+
+class AnalysisCache:
+    """LRU of recent analyses, with per-section reuse on small edits"""
+
+    def __init__(self, max_entries: int = 128, thresholds: Dict[str, float] = None,
+                 default_threshold: float = DEFAULT_REUSE_THRESHOLD):
+        self.max_entries = max_entries
+        self.thresholds = {**SECTION_REUSE_THRESHOLDS, **(thresholds or {})}
+        self.default_threshold = default_threshold
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+
+    def threshold(self, section: str) -> float:
+        return self.thresholds.get(section, self.default_threshold)
+
+    def _closest(self, model: str, words: Tuple[str, ...]) -> Optional[Dict[str, Any]]:
+        """Most similar cached post for model, if any is within reuse range"""
+        limit = max([self.default_threshold, *self.thresholds.values()])
+        best, best_difference = None, None
+        for (entry_model, _), entry in reversed(self._entries.items()):
+            if entry_model != model:
+                continue
+            matcher = difflib.SequenceMatcher(None, entry['words'], words, autojunk=False)
+            # Cheap upper bounds on similarity first
+            if 1.0 - matcher.real_quick_ratio() > limit or 1.0 - matcher.quick_ratio() > limit:
+                continue
+            difference = 1.0 - matcher.ratio()
+            if difference <= limit and (best_difference is None or difference < best_difference):
+                best, best_difference = entry, difference
+        return best
+
+    def lookup(self, job_post: str, model: str, prompts: Dict[str, str]) -> Dict[str, Any]:
+        """Find reusable results for job_post.
+
+        Returns {"sections": {key: {"result", "difference", "words",
+        "alternatives"}}, "embedding": list or None, "embedding_model": name
+        or None}; sections not listed must be recomputed. alternatives is
+        None unless the section was stored with some.
+        """
+        fingerprint, words = _fingerprint_and_words(job_post)
+        with self._lock:
+            entry = self._entries.get((model, fingerprint))
+            if entry is not None:
+                self._entries.move_to_end((model, fingerprint))
+            else:
+                entry = self._closest(model, words)
+            if entry is None:
+                return {"sections": {}, "embedding": None, "embedding_model": None}
+            sections = dict(entry['sections'])
+            exact = entry['fingerprint'] == fingerprint
+
+        reused = {}
+        differences: Dict[Tuple[str, ...], float] = {}
+        for key, prompt in prompts.items():
+            cached = sections.get(key)
+            if cached is None or cached['prompt'] != _prompt_hash(prompt):
+                continue
+            source = cached['words']
+            if source not in differences:
+                differences[source] = _difference(source, words)
+            if differences[source] <= self.threshold(key):
+                reused[key] = {"result": cached['result'], "difference": round(differences[source], 4),
+                               "words": source, "alternatives": cached.get('alternatives')}
+        return {"sections": reused, "embedding": entry['embedding'] if exact else None,
+                "embedding_model": entry.get('embedding_model') if exact else None}
+
+    def store(self, job_post: str, model: str, prompts: Dict[str, str], results: Dict[str, str],
+              embedding: List[float] = None, reused: Dict[str, Dict[str, Any]] = None,
+              embedding_model: str = None, alternatives: Dict[str, List[str]] = None) -> None:
+        """Remember the sections of one analysis.
+
+        Reused sections keep the words they were originally computed from;
+        embedding_model names the model that made the embedding and
+        alternatives holds a section's runner-up results (the proposal's).
+        """
+        alternatives = alternatives or {}
+        fingerprint, words = _fingerprint_and_words(job_post)
+        reused = reused or {}
+        sections = {}
+        for key, prompt in prompts.items():
+            if key not in results:
+                continue
+            source = reused[key]['words'] if key in reused else words
+            sections[key] = {"result": results[key], "prompt": _prompt_hash(prompt), "words": source,
+                             "alternatives": alternatives.get(key)}
+        with self._lock:
+            self._entries[(model, fingerprint)] = {
+                "fingerprint": fingerprint, "words": words, "sections": sections, "embedding": embedding,
+                "embedding_model": embedding_model,
+            }
+            self._entries.move_to_end((model, fingerprint))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
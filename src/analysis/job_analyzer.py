@@ -1,75 +1,512 @@
-﻿from typing import Dict
+﻿from typing import Any, Dict, List
+import re
 import time
 from ..models.base import BaseModel
-from ..models import OllamaEmbedding, OllamaInference
+from ..models import OllamaEmbedding, OllamaInference, embed_with_model
+from ..monitoring import collect_spans, record_cache_hit, record_retry, registry, span
+from .chunking import ChunkedEmbedding
+from .compress import DEFAULT_MAX_INPUT_TOKENS, SectionCompressor
+from .incremental import AnalysisCache
+from .preprocess import prepare_job_post
+from .ranking import rank_candidates
+from .skills import extract_skills, skills_context
+from .token_budget import TokenBudget, default_budget
+from .tokens import estimate_tokens
+from .validation import REPAIR_HINTS, failure_message, is_error, validate_section
+
+SYSTEM_PROMPT = "You are a professional freelancer analyzing job posts and writing proposals."
+
+# Section prompts, in the order the sections are generated
+ANALYSIS_PROMPTS = {
+    'jobAnalysis': '''Analyze the key requirements, responsibilities, and scope of this job post. 
+                  Focus on technical requirements, experience needed, and project scope.
+                  Format the response in clear sections with bullet points.''',
+    'clientCharacteristics': '''Analyze the client preferences, company culture, and project characteristics from this job post. 
+                           Focus on work environment, values, and expectations.
+                           Format the response with clear headings and bullet points.''',
+    'approachAnalysis': '''Suggest a detailed approach and methodology for this project based on the job post. 
+                       Include specific steps, best practices, and timeline estimates.
+                       Format as a numbered list with sub-points.''',
+    'solutionAnalysis': '''Recommend specific technical solutions, tools, and technologies for this project.
+                       Include justification for each recommendation.
+                       Format with clear categories and bullet points.''',
+    'questionsAnalysis': '''What are the key questions to ask and points to address in the proposal?
+                        Format as a numbered list of questions with brief explanations.''',
+    'proposal': '''Write a concise, professional proposal (max 150 words) for this job post.
+               Start with an attention-grabbing first sentence.
+               First paragraph about client and problem.
+               Second paragraph about solution and approach.
+               Include trust-building elements and competitive advantages.
+               Make a recommendation for extra value.
+               End with a call to action.
+               Format with clear paragraphs and professional tone.''',
+}
+
+# Sections with a hard word limit; they are streamed and cut off at the limit
+WORD_LIMITS = {
+    'proposal': 150,
+}
+
+# Extra guidance for sections once the post's technologies are known
+SKILL_HINTS = {
+    'solutionAnalysis': "Build on this stack rather than re-deriving it; only recommend additions for what it leaves open.",
+}
+
+_WORD = re.compile(r'\S+')
+_SENTENCE_END = re.compile(r'[.!?]["\')\]]*(?=\s|$)')
+
+
+def trim_to_word_limit(text: str, limit: int) -> str:
+    """Cut text to at most limit words, ending on a sentence boundary when
+    that keeps at least half of the text"""
+    words = list(_WORD.finditer(text))
+    if len(words) <= limit:
+        return text.strip()
+    cut = text[:words[limit - 1].end()]
+    ends = [match.end() for match in _SENTENCE_END.finditer(cut)]
+    if ends and ends[-1] >= len(cut) // 2:
+        cut = cut[:ends[-1]]
+    return cut.strip()
 
 class JobAnalyzer:
-    def __init__(self, embedding_model: BaseModel = None, inference_model: BaseModel = None):
-        """Initialize with OllamaEmbedding and OllamaInference as default models"""
-        self.embedding_model = embedding_model or OllamaEmbedding()
+    analysis_prompts = ANALYSIS_PROMPTS
+
+    def __init__(self, embedding_model: BaseModel = None, inference_model: BaseModel = None,
+                 token_budget: TokenBudget = None, analysis_cache: AnalysisCache = None, preprocess: bool = True,
+                 max_input_tokens: int = DEFAULT_MAX_INPUT_TOKENS, skills: bool = True, proposal_candidates: int = 1,
+                 validate: bool = True):
+        """Initialize with chunked OllamaEmbedding and OllamaInference as default models.
+
+        With an analysis_cache, re-running an edited post only recomputes
+        the sections the edit affects. With preprocess, formatting and page
+        boilerplate are stripped from the post before it is sent. Posts longer
+        than max_input_tokens are cut down to the sentences most relevant to
+        each section (None disables this). With skills, technologies found in
+        the post are listed in every section prompt. With proposal_candidates
+        above 1, that many proposals are sampled in one call and ranked. With
+        validate, sections that fail their checks are repaired one by one.
+        """
+        self.embedding_model = embedding_model or ChunkedEmbedding(OllamaEmbedding())
         self.inference_model = inference_model or OllamaInference()
+        self.token_budget = token_budget or default_budget
+        self.analysis_cache = analysis_cache
+        self.preprocess = preprocess
+        self.max_input_tokens = max_input_tokens
+        self.skills = skills
+        self.proposal_candidates = proposal_candidates
+        self.validate = validate
 
-    def _analyze_with_retry(self, prompt: str, job_post: str, max_retries: int = 3, delay: float = 1.0) -> str:
-        """Analyze with retry logic for failed attempts"""
-        for attempt in range(max_retries):
+    @property
+    def model_name(self) -> str:
+        """Name the token budget tracks the inference model under"""
+        model = getattr(self.inference_model, "model", None)
+        return model if isinstance(model, str) else type(self.inference_model).__name__
+
+    @staticmethod
+    def _response_content(response: Dict[str, Any]) -> str:
+        """Extract text from Ollama-style or OpenAI-style (OpenRouter) responses;
+        a provider's failure response (one with an "error") raises"""
+        if response.get("error"):
+            raise RuntimeError(response["error"])
+        if "message" in response:
+            return response["message"]["content"]
+        return response["choices"][0]["message"]["content"]
+
+    def _stream_with_limit(self, messages: List[Dict[str, Any]], limit: int, max_tokens: int,
+                           usage: Dict[str, Any]) -> str:
+        """Stream a completion and cancel it once it runs past limit words"""
+        stream = self.inference_model.stream(messages=messages, temperature=0.7, top_p=0.9, max_tokens=max_tokens,
+                                             usage=usage)
+        text = ""
+        try:
+            for piece in stream:
+                text += piece
+                # limit + 1 words means the limit-th word is complete
+                if len(text.split()) > limit:
+                    break
+        finally:
+            stream.close()
+        return trim_to_word_limit(text, limit)
+
+    def _analyze_with_retry(self, prompt: str, job_post: str, max_retries: int = 3, delay: float = 1.0,
+                            section: str = None, context: str = None, prefetched: Dict[str, Any] = None) -> str:
+        """Analyze with retry logic for failed attempts; context goes after the prompt"""
+        return self._sample_with_retry(prompt, job_post, 1, max_retries, delay, section, context, prefetched)[0]
+
+    def _sample_candidates(self, messages: List[Dict[str, Any]], n: int, max_tokens: int,
+                           record: Dict[str, Any]) -> List[str]:
+        """n untrimmed completions from one complete_many call where the model has it"""
+        options = {"temperature": 0.7, "top_p": 0.9, "max_tokens": max_tokens}
+        if hasattr(self.inference_model, "complete_many"):
+            responses = self.inference_model.complete_many(messages=messages, n=n, **options)
+        else:
+            responses = [self.inference_model.complete(messages=messages, **options) for _ in range(n)]
+        # Failed drafts are dropped; the attempt fails only if every draft did
+        errors = [response["error"] for response in responses if response.get("error")]
+        responses = [response for response in responses if not response.get("error")]
+        if not responses:
+            raise RuntimeError(errors[0])
+        usages = [response.get("usage") or {} for response in responses]
+        completion_tokens = [usage.get("completion_tokens") for usage in usages]
+        record["candidates"] = len(responses)
+        record["prompt_tokens"] = usages[0].get("prompt_tokens")
+        record["completion_tokens"] = sum(filter(None, completion_tokens)) if any(completion_tokens) else None
+        for tokens in completion_tokens:
+            self.token_budget.observe(self.model_name, record["section"], tokens, max_tokens)
+        return [self._response_content(response) for response in responses]
+
+    @staticmethod
+    def _messages(prompt: str, job_post: str, context: str = None) -> List[Dict[str, Any]]:
+        """Messages for one section. The job post comes before the instruction
+        so every section of an analysis shares the same prompt prefix, which
+        the provider can evaluate once."""
+        if context:
+            prompt = f"{prompt}\n\n{context}"
+        return [{
+            "role": "system",
+            "content": SYSTEM_PROMPT
+        }, {
+            "role": "user",
+            "content": f"Job Post:\n{job_post}\n\n{prompt}"
+        }]
+
+    def _prefetch(self, inputs: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """First-attempt responses for the sections that make one plain call,
+        from a single batch call (each with its own token cap), when the
+        inference model has one."""
+        if not hasattr(self.inference_model, "batch"):
+            return {}
+        keys = [key for key in inputs
+                if not (key == 'proposal' and self.proposal_candidates > 1)
+                and not (WORD_LIMITS.get(key) and hasattr(self.inference_model, "stream"))]
+        if len(keys) < 2:
+            return {}
+        caps = [self.token_budget.max_tokens(self.model_name, key) for key in keys]
+        with span("analysis.batch") as record:
+            record["sections"] = len(keys)
             try:
-                response = self.inference_model.complete(
-                    messages=[{
-                        "role": "system",
-                        "content": "You are a professional freelancer analyzing job posts and writing proposals."
-                    }, {
-                        "role": "user",
-                        "content": f"{prompt}\n\nJob Post:\n{job_post}"
-                    }],
+                responses = self.inference_model.batch(
+                    [self._messages(inputs[key]["prompt"], inputs[key]["post"], inputs[key]["context"])
+                     for key in keys],
                     temperature=0.7,
                     top_p=0.9,
-                    max_tokens=1000
+                    max_tokens=caps
                 )
-                return response["message"]["content"]
+            except Exception as e:
+                # Each section makes its own call instead
+                record["error"] = str(e)
+                return {}
+        return {key: {"response": response, "max_tokens": cap} for key, response, cap in zip(keys, responses, caps)}
+
+    def _sample_with_retry(self, prompt: str, job_post: str, n: int = 1, max_retries: int = 3, delay: float = 1.0,
+                           section: str = None, context: str = None, prefetched: Dict[str, Any] = None) -> List[str]:
+        """Like _analyze_with_retry, but with n > 1 returns n untrimmed candidates.
+
+        A final failure is returned as a single error message. A prefetched
+        response (see _prefetch) stands in for the first attempt's call.
+        """
+        messages = self._messages(prompt, job_post, context)
+        limit = WORD_LIMITS.get(section)
+        for attempt in range(max_retries):
+            try:
+                with span("analysis.attempt", section=section, attempt=attempt + 1) as record:
+                    max_tokens = self.token_budget.max_tokens(self.model_name, section)
+                    record["max_tokens"] = max_tokens
+                    if n > 1:
+                        return self._sample_candidates(messages, n, max_tokens, record)
+                    if prefetched is not None:
+                        response, max_tokens = prefetched["response"], prefetched["max_tokens"]
+                        record["max_tokens"], prefetched = max_tokens, None
+                        usage = response.get("usage") or {}
+                        content = self._response_content(response)
+                        if limit:
+                            content = trim_to_word_limit(content, limit)
+                    elif limit and hasattr(self.inference_model, "stream"):
+                        usage = {}
+                        content = self._stream_with_limit(messages, limit, max_tokens, usage)
+                    else:
+                        response = self.inference_model.complete(
+                            messages=messages,
+                            temperature=0.7,
+                            top_p=0.9,
+                            max_tokens=max_tokens
+                        )
+                        usage = response.get("usage") or {}
+                        content = self._response_content(response)
+                        if limit:
+                            content = trim_to_word_limit(content, limit)
+                    record["prompt_tokens"] = usage.get("prompt_tokens")
+                    record["completion_tokens"] = usage.get("completion_tokens")
+                    self.token_budget.observe(self.model_name, section, record["completion_tokens"], max_tokens)
+                    return [content]
             except Exception as e:
                 if attempt == max_retries - 1:  # Last attempt
-                    return f"Analysis failed after {max_retries} attempts: {str(e)}"
+                    return [failure_message(max_retries, str(e))]
+                record_retry(section=section)
                 time.sleep(delay * (attempt + 1))  # Exponential backoff
 
-    def analyze_job_post(self, job_post: str) -> Dict[str, str]:
-        """Analyze a job post using specified models and return structured analysis"""
+    @staticmethod
+    def _failed(result: str) -> bool:
+        """Whether a section result is an error message rather than analysis"""
+        return is_error(result)
+
+    def _problems(self, key: str, result: str) -> List[str]:
+        """What is wrong with a section result (see validation.validate_section)"""
+        return validate_section(result, numbered='numbered list' in self.analysis_prompts[key].lower(),
+                                max_words=WORD_LIMITS.get(key))
+
+    def section_problems(self, results: Dict[str, Any]) -> Dict[str, List[str]]:
+        """Problems of each section missing from results ("missing") or failing
+        the checks that decide repairs; just errors when validate is off"""
+        problems = {}
+        for key in self.analysis_prompts:
+            if key not in results:
+                problems[key] = ["missing"]
+            elif self.validate:
+                problems[key] = self._problems(key, results[key])
+            elif self._failed(results[key]):
+                problems[key] = ["error"]
+        return {key: found for key, found in problems.items() if found}
+
+    def failed_sections(self, results: Dict[str, Any]) -> List[str]:
+        """Sections of results with any problem (see section_problems)"""
+        return list(self.section_problems(results))
+
+    def _repair(self, key: str, result: str, problems: List[str], inputs: Dict[str, Any],
+                alternatives: List[str] = None):
+        """Fix one failing section, returning (result, alternatives).
+
+        A passing runner-up proposal is promoted and an over-long section is
+        cut, both without a model call; anything else is regenerated once,
+        with format reminders, and kept if it has fewer problems.
+        """
+        if key == 'proposal' and alternatives:
+            for index, alternative in enumerate(alternatives):
+                if not self._problems(key, alternative):
+                    return alternative, alternatives[:index] + alternatives[index + 1:]
+        if problems == ["too_long"]:
+            return trim_to_word_limit(result, WORD_LIMITS[key]), alternatives
+        hints = [REPAIR_HINTS[problem] for problem in problems if problem in REPAIR_HINTS]
+        context = " ".join(filter(None, [inputs["context"], *hints])) or None
+        repaired = self._analyze_with_retry(inputs["prompt"], inputs["post"], max_retries=1, section=key,
+                                            context=context)
+        if len(self._problems(key, repaired)) < len(problems):
+            return repaired, alternatives
+        return result, alternatives
+
+    def _rank_proposals(self, candidates: List[str], post_embedding: List[float], requirements: str,
+                        post_model: str = None) -> List[str]:
+        """Trimmed proposals, best first: word-limit compliance plus similarity
+        to the post and to the requirements, all embedded in one call.
+
+        The post embedding is only used when post_model also made the
+        drafts' vectors; a fallback embedder may have answered one and not
+        the other.
+        """
+        limit = WORD_LIMITS['proposal']
+        drafts = [candidate for candidate in candidates if not self._failed(candidate)]
+        if len(drafts) < 2:
+            return [candidate if self._failed(candidate) else trim_to_word_limit(candidate, limit)
+                    for candidate in (drafts or candidates)]
+        with span("analysis.rank", section='proposal') as record:
+            record["candidates"] = len(drafts)
+            model, vectors = embed_with_model(self.embedding_model, drafts + ([requirements] if requirements else []))
+            record["embedding_model"] = model
+            targets = []
+            if post_embedding is not None and post_model == model:
+                targets.append(post_embedding)
+            if requirements:
+                targets.append(vectors.pop())
+            if not targets:
+                return [trim_to_word_limit(draft, limit) for draft in drafts]
+            ranked = rank_candidates(drafts, vectors, targets, limit)
+            record["scores"] = [item["score"] for item in ranked]
+        return [trim_to_word_limit(item["text"], limit) for item in ranked]
+
+    @staticmethod
+    def _timing_breakdown(spans: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Summarize collected spans into per-stage milliseconds and tokens"""
+        breakdown = {"total_ms": 0.0, "embedding_ms": 0.0, "sections": {}, "cache_hits": 0}
+        for record in spans:
+            name = record["span"]
+            if name == "analysis.total":
+                breakdown["total_ms"] = record["duration"] * 1000
+            elif name == "analysis.preprocess":
+                breakdown["preprocess_ms"] = record["duration"] * 1000
+                breakdown["preprocessing"] = {key: record.get(key) for key in (
+                    "tokens_before", "tokens_after", "saved_tokens", "removed_lines")}
+            elif name == "analysis.skills":
+                breakdown["skills_ms"] = record["duration"] * 1000
+            elif name == "analysis.rank":
+                breakdown["sections"].setdefault(record["section"], {})["rank_ms"] = record["duration"] * 1000
+            elif name == "analysis.repair":
+                breakdown["sections"].setdefault(record["section"], {}).update(
+                    repaired=record["problems"], repair_ms=record["duration"] * 1000)
+            elif name == "analysis.embedding":
+                breakdown["embedding_ms"] = record["duration"] * 1000
+            elif name == "analysis.batch":
+                breakdown["batch_ms"] = record["duration"] * 1000
+            elif name == "cache.hit":
+                breakdown["cache_hits"] += 1
+            elif name in ("analysis.section", "analysis.attempt"):
+                section = breakdown["sections"].setdefault(record["section"], {
+                    "ms": 0.0, "attempts": 0, "prompt_tokens": 0, "completion_tokens": 0, "max_tokens": None,
+                })
+                if name == "analysis.section":
+                    section["ms"] = record["duration"] * 1000
+                    section["input_tokens"] = record.get("input_tokens")
+                    section["compressed"] = record.get("compressed", False)
+                else:
+                    section["attempts"] += 1
+                    section["max_tokens"] = record.get("max_tokens")
+                    if "candidates" in record:
+                        section["candidates"] = record["candidates"]
+                    section["prompt_tokens"] += record.get("prompt_tokens") or 0
+                    section["completion_tokens"] += record.get("completion_tokens") or 0
+        return breakdown
+
+    def analyze_job_post(self, job_post: str, include_timings: bool = False,
+                         include_fields: bool = False, include_prompt: bool = False) -> Dict[str, Any]:
+        """Analyze a job post using specified models and return structured analysis.
+
+        With include_timings the result also carries a 'timings' breakdown of
+        preprocessing, embedding and per-section latency, attempts and token
+        counts; with include_fields, the budget, duration and skills extracted
+        from the post and the 'technologies' matched against the skill
+        taxonomy. With an analysis_cache it also carries 'recomputed'
+        (sections generated in this run) and 'reused' (sections taken from an
+        earlier, similar post, with the fraction of words that differ). With
+        proposal_candidates above 1, 'proposalAlternatives' lists the
+        runner-up proposals, best first. With include_prompt, 'prompt' echoes
+        the section prompts.
+        """
         if not job_post.strip():
             raise ValueError("Job post cannot be empty")
 
-        # Get embeddings using Ollama's format
-        embeddings = self.embedding_model.embed([job_post])
-
-        # Prepare analysis prompts with improved context
-        analysis_prompts = {
-            'jobAnalysis': '''Analyze the key requirements, responsibilities, and scope of this job post. 
-                          Focus on technical requirements, experience needed, and project scope.
-                          Format the response in clear sections with bullet points.''',
-            'clientCharacteristics': '''Analyze the client preferences, company culture, and project characteristics from this job post. 
-                                   Focus on work environment, values, and expectations.
-                                   Format the response with clear headings and bullet points.''',
-            'approachAnalysis': '''Suggest a detailed approach and methodology for this project based on the job post. 
-                               Include specific steps, best practices, and timeline estimates.
-                               Format as a numbered list with sub-points.''',
-            'solutionAnalysis': '''Recommend specific technical solutions, tools, and technologies for this project.
-                               Include justification for each recommendation.
-                               Format with clear categories and bullet points.''',
-            'questionsAnalysis': '''What are the key questions to ask and points to address in the proposal?
-                                Format as a numbered list of questions with brief explanations.''',
-            'proposal': '''Write a concise, professional proposal (max 150 words) for this job post.
-                       Start with an attention-grabbing first sentence.
-                       First paragraph about client and problem.
-                       Second paragraph about solution and approach.
-                       Include trust-building elements and competitive advantages.
-                       Make a recommendation for extra value.
-                       End with a call to action.
-                       Format with clear paragraphs and professional tone.''',
-        }
-
-        results = {}
-        for key, prompt in analysis_prompts.items():
-            # Use retry for all sections since we're using Ollama
-            results[key] = self._analyze_with_retry(prompt, job_post)
-
-        # Add the prompt used for reference
-        results['prompt'] = str(analysis_prompts)
+        with collect_spans() as spans:
+            with span("analysis.total"):
+                prepared = None
+                if self.preprocess:
+                    with span("analysis.preprocess") as record:
+                        prepared = prepare_job_post(job_post, self.model_name)
+                        record.update({key: value for key, value in prepared.items()
+                                       if key not in ("text", "fields")})
+                    # Fall back to the raw post if cleaning removed everything
+                    job_post = prepared["text"] or job_post
+
+                technologies = []
+                if self.skills:
+                    with span("analysis.skills") as record:
+                        technologies = extract_skills(job_post)
+                        record["found"] = len(technologies)
+
+                cached = {"sections": {}, "embedding": None, "embedding_model": None}
+                if self.analysis_cache is not None:
+                    cached = self.analysis_cache.lookup(job_post, self.model_name, self.analysis_prompts)
+                    proposal = cached["sections"].get('proposal')
+                    if proposal and self.proposal_candidates > 1 and proposal["alternatives"] is None:
+                        # Cached from a single-draft run; sample again to have alternatives
+                        del cached["sections"]['proposal']
+
+                # Get embeddings using Ollama's format
+                embeddings, embedding_model = cached["embedding"], cached["embedding_model"]
+                if embeddings is None:
+                    with span("analysis.embedding"):
+                        embedding_model, embeddings = embed_with_model(self.embedding_model, [job_post])
+
+                if prepared and prepared["text"] == job_post:
+                    input_tokens = prepared["tokens_after"]
+                else:
+                    input_tokens = estimate_tokens(job_post, self.model_name)
+                compressor = None
+                if self.max_input_tokens and input_tokens > self.max_input_tokens:
+                    compressor = SectionCompressor(job_post, self.model_name)
+
+                inputs = {}
+                for key, prompt in self.analysis_prompts.items():
+                    if key in cached["sections"]:
+                        continue
+                    inputs[key] = {"prompt": prompt, "post": job_post, "context": None, "tokens": input_tokens}
+                    if technologies:
+                        inputs[key]["context"] = " ".join(filter(None, [skills_context(technologies),
+                                                                        SKILL_HINTS.get(key)]))
+                if compressor is not None:
+                    # One excerpt heads every section's prompt, so they still
+                    # share a prefix; what a section adds follows it
+                    excerpts = compressor.split({key: inputs[key]["prompt"] for key in inputs}, self.max_input_tokens)
+                    shared = excerpts["shared"]
+                    for key, own in excerpts["sections"].items():
+                        inputs[key].update(post=shared["text"], tokens=shared["tokens"] + own["tokens"])
+                        if own["text"]:
+                            inputs[key]["prompt"] = f"More from the job post:\n{own['text']}\n\n{inputs[key]['prompt']}"
+                prefetched = self._prefetch(inputs)
+
+                results, recomputed, alternatives = {}, [], None
+                for key in self.analysis_prompts:
+                    if key in cached["sections"]:
+                        results[key] = cached["sections"][key]["result"]
+                        if key == 'proposal' and self.proposal_candidates > 1:
+                            alternatives = list(cached["sections"][key]["alternatives"])
+                        record_cache_hit("analysis")
+                        continue
+                    # Use retry for all sections since we're using Ollama
+                    with span("analysis.section", section=key) as record:
+                        prompt, section_post, context = (inputs[key]["prompt"], inputs[key]["post"],
+                                                         inputs[key]["context"])
+                        record["input_tokens"] = inputs[key]["tokens"]
+                        if compressor is not None:
+                            record["compressed"] = True
+                        if key == 'proposal' and self.proposal_candidates > 1:
+                            candidates = self._sample_with_retry(prompt, section_post, self.proposal_candidates,
+                                                                 section=key, context=context)
+                            requirements = "\n".join(filter(None, [
+                                skills_context(technologies) if technologies else None,
+                                None if 'jobAnalysis' not in results or self._failed(results['jobAnalysis'])
+                                else results['jobAnalysis'],
+                            ]))
+                            ranked = self._rank_proposals(candidates, embeddings[0] if embeddings else None,
+                                                          requirements, embedding_model)
+                            results[key], alternatives = ranked[0], ranked[1:]
+                        else:
+                            results[key] = self._analyze_with_retry(prompt, section_post, section=key,
+                                                                    context=context, prefetched=prefetched.get(key))
+                    recomputed.append(key)
+
+                # Repair only the sections that fail their checks; the rest are kept
+                unresolved = set()
+                if self.validate:
+                    for key in recomputed:
+                        problems = self._problems(key, results[key])
+                        if not problems:
+                            continue
+                        with span("analysis.repair", section=key) as record:
+                            record["problems"] = problems
+                            for problem in problems:
+                                registry.inc("freelance_section_repairs_total", section=key, problem=problem)
+                            results[key], alternatives = self._repair(key, results[key], problems, inputs[key],
+                                                                      alternatives)
+                        if self._problems(key, results[key]):
+                            unresolved.add(key)
+
+        if prepared and prepared["saved_tokens"] > 0:
+            # The post is sent once per recomputed section
+            registry.inc("freelance_preprocess_tokens_saved_total", prepared["saved_tokens"] * len(recomputed))
+        if self.analysis_cache is not None:
+            succeeded = {key: value for key, value in results.items()
+                         if not self._failed(value) and key not in unresolved}
+            self.analysis_cache.store(job_post, self.model_name, self.analysis_prompts, succeeded,
+                                      embedding=embeddings, reused=cached["sections"],
+                                      embedding_model=embedding_model,
+                                      alternatives={'proposal': alternatives} if alternatives is not None else None)
+            results['recomputed'] = recomputed
+            results['reused'] = {key: entry["difference"] for key, entry in cached["sections"].items()}
+        if alternatives is not None:
+            results['proposalAlternatives'] = alternatives
+        if include_fields and (prepared or self.skills):
+            results['fields'] = {**(prepared["fields"] if prepared else {}), 'technologies': technologies}
+
+        if include_prompt:
+            results['prompt'] = str(self.analysis_prompts)
+        if include_timings:
+            results['timings'] = self._timing_breakdown(spans)
         return results
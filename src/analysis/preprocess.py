@@ -0,0 +1,272 @@
+"""Clean up pasted job posts before they are sent to the model.
+
+The post is sent once per section, so every token of markdown noise or
+Upwork page chrome ("About the client", "Payment method verified", skill
+badges one per line, ...) is paid for six times. prepare_job_post() strips
+formatting, drops known boilerplate and repeated lines, collapses
+whitespace, and pulls out the budget, duration and skills so they can be
+shown or reused without asking the model.
+"""
+
+import html
+import re
+import unicodedata
+from typing import Any, Dict, List, Optional, Tuple
+
+from .tokens import estimate_tokens
+
+# Whole lines copied from the Upwork job page that carry no information about the work
+BOILERPLATE_LINES = [re.compile(pattern, re.IGNORECASE) for pattern in (
+    r"about the client",
+    r"payment method (not )?verified",
+    r"phone number (not )?verified",
+    r"rating is [\d.]+ out of 5\.?.*",
+    r"[\d.]+ of \d+ reviews?",
+    r"\$?[\d.,]+[km]?\+? total spent",
+    r"\d+ jobs? posted",
+    r"\d+% hire rate.*",
+    r"\d+ open jobs?",
+    r"\d+ hires?(, \d+ active)?",
+    r"member since .*",
+    r"(proposals|interviewing|invites sent|unanswered invites)\s*:.*",
+    r"last viewed by client\s*:?.*",
+    r"activity on this job",
+    r"send a proposal for\s*:?.*",
+    r"available connects\s*:?.*",
+    r"(save job|flag as inappropriate|apply now|submit a proposal|view job posting)",
+    r"(posted|renewed|reposted)\s+.*\bago",
+    r"\d+ (minutes?|hours?|days?|weeks?|months?) ago",
+    r"(see|view|show) (more|less)",
+    r"worldwide",
+    r"only freelancers located in .*",
+)]
+# All of the above in one pattern, so each line is matched once
+_BOILERPLATE = re.compile("|".join(f"(?:{pattern.pattern})" for pattern in BOILERPLATE_LINES), re.IGNORECASE)
+# The client's city and local time; only dropped inside the "About the client"
+# block, since the same shape is ordinary content elsewhere ("Daily standup 10:30 am")
+CLIENT_LOCATION = re.compile(r"[A-Za-z .'-]{2,40}\s+\d{1,2}:\d{2}\s*[ap]m", re.IGNORECASE)
+CLIENT_HEADING = re.compile(r"about the client", re.IGNORECASE)
+
+SKILLS_HEADING = re.compile(
+    r"^(skills and expertise|mandatory skills|nice-to-have skills|required skills|skills)\s*(?::\s*(.*))?$",
+    re.IGNORECASE,
+)
+BUDGET_LABEL = re.compile(r"^(budget|hourly|hourly range|hourly rate|fixed[- ]price|price)\s*:\s*(.*)$", re.IGNORECASE)
+DURATION_LABEL = re.compile(
+    r"^(timeline|duration|project length|project duration|deadline|time ?frame)\s*:\s*(.*)$", re.IGNORECASE,
+)
+# Upwork's unlabeled duration badges
+DURATION_BADGE = re.compile(r"^(less than|more than)?\s*\d+( to \d+)? (days?|weeks?|months?)$", re.IGNORECASE)
+_AMOUNT = re.compile(r"(\d[\d,]*(?:\.\d+)?)\s*(k)?\b", re.IGNORECASE)
+_SPAN = re.compile(r"(\d+)(?:\s*(?:-|to)\s*(\d+))?\s*(day|week|month|year)s?", re.IGNORECASE)
+
+# str.translate with a non-ASCII table is slow; a few replace() calls are not
+_DASHES = {"−": "-", "–": "-", "—": "-", "‐": "-", "‑": "-",
+           " ": " ", "​": "", "‌": "", "‍": "", "﻿": ""}
+_MARKDOWN = [
+    (re.compile(r"^\s*(```|~~~).*$"), ""),                # code fences
+    (re.compile(r"^\s*([-*_])(\s*\1){2,}\s*$"), ""),      # horizontal rules
+    (re.compile(r"^\s*#{1,6}\s*"), ""),                   # headings
+    (re.compile(r"^\s*>\s?"), ""),                        # quotes
+    (re.compile(r"^\s*[-*+•·▪●]\s+"), "- "),  # bullets
+    (re.compile(r"!\[[^\]]*\]\([^)]*\)"), ""),             # images
+    (re.compile(r"\[([^\]]+)\]\([^)]*\)"), r"\1"),         # links
+    (re.compile(r"(\*\*|__)(.+?)\1"), r"\2"),              # bold
+    (re.compile(r"(?<![\w*])\*(?!\s)(.+?)(?<!\s)\*(?![\w*])"), r"\1"),  # italics
+    (re.compile(r"`([^`]*)`"), r"\1"),                     # inline code
+    (re.compile(r"<[^>]+>"), ""),                          # html tags
+]
+_MARKUP_CHARS = re.compile(r"[-#>*_`\[<~+•·▪●]")
+_SPACES = re.compile(r"[ \t]+")
+
+
+def _normalize_dashes(text: str) -> str:
+    for char, replacement in _DASHES.items():
+        if char in text:
+            text = text.replace(char, replacement)
+    return text
+
+
+def _strip_markdown(line: str) -> str:
+    if not _MARKUP_CHARS.search(line):
+        return line
+    for pattern, replacement in _MARKDOWN:
+        line = pattern.sub(replacement, line)
+    return line
+
+
+def _is_boilerplate(line: str) -> bool:
+    return _BOILERPLATE.fullmatch(line) is not None
+
+
+def _continuation(lines: List[str], start: int, amounts: bool = False) -> Tuple[str, int]:
+    """Join the lines after a label up to the next blank line.
+
+    With amounts, only lines that continue a wrapped amount (starting with a
+    digit, '$' or '-') are joined after the first one.
+    """
+    parts = []
+    index = start
+    while index < len(lines) and lines[index]:
+        if amounts and parts and not re.match(r"[$\d-]", lines[index]):
+            break
+        parts.append(lines[index])
+        index += 1
+    return " ".join(parts), index
+
+
+def _parse_budget(text: str, label: str = "") -> Dict[str, Any]:
+    amounts = []
+    for number, thousands in _AMOUNT.findall(text.split("(")[0]):
+        value = float(number.replace(",", ""))
+        amounts.append(value * 1000 if thousands else value)
+    lowered = f"{label} {text}".lower()
+    if re.search(r"hour|/\s*hr\b|/\s*h\b|hourly", lowered):
+        kind = "hourly"
+    elif "fixed" in lowered:
+        kind = "fixed"
+    else:
+        kind = None
+    return {"text": text, "min": min(amounts) if amounts else None,
+            "max": max(amounts) if amounts else None, "type": kind}
+
+
+def _format_budget(budget: Dict[str, Any]) -> str:
+    if budget["min"] is None:
+        return budget["text"]
+    amount = f"${budget['min']:g}"
+    if budget["max"] != budget["min"]:
+        amount += f"-${budget['max']:g}"
+    suffix = {"hourly": " per hour", "fixed": " fixed price"}.get(budget["type"], "")
+    note = re.search(r"\(.*\)", budget["text"])
+    return amount + suffix + (f" {note.group(0)}" if note else "")
+
+
+def _parse_duration(text: str) -> Dict[str, Any]:
+    match = _SPAN.search(text)
+    if not match:
+        return {"text": text, "min": None, "max": None, "unit": None}
+    low = int(match.group(1))
+    high = int(match.group(2)) if match.group(2) else low
+    return {"text": text, "min": low, "max": high, "unit": match.group(3).lower() + "s"}
+
+
+def _skill_badge(line: str) -> bool:
+    """Short label lines as pasted from skill badges"""
+    if _is_boilerplate(line) or BUDGET_LABEL.match(line) or DURATION_LABEL.match(line) or line.startswith("- "):
+        return False
+    return 0 < len(line.split()) <= 4 and not line.endswith((".", ":", "?", "!"))
+
+
+def _collect_badges(lines: List[str], start: int) -> Tuple[List[str], int]:
+    """Read skill badges (one per line) after a heading.
+
+    Badges right after the heading are read up to the first other line. A
+    later run after blank lines is only taken when every line of it is a
+    badge, so a section that follows ("Requirements" and its bullets) stays
+    in the post.
+    """
+    badges = []
+    index = start
+    while index < len(lines) and _skill_badge(lines[index]):
+        badges.append(lines[index])
+        index += 1
+    while badges and index < len(lines) and not lines[index]:
+        block = index
+        while block < len(lines) and not lines[block]:
+            block += 1
+        end = block
+        while end < len(lines) and lines[end]:
+            end += 1
+        if block == end or not all(_skill_badge(line) for line in lines[block:end]):
+            break
+        badges.extend(lines[block:end])
+        index = end
+    return badges, index
+
+
+def prepare_job_post(job_post: str, model: str = None) -> Dict[str, Any]:
+    """Clean a pasted job post and extract its structured fields.
+
+    Token counts are estimated for model's family.
+
+    Returns {"text", "fields": {"budget", "duration", "skills"},
+    "tokens_before", "tokens_after", "saved_tokens", "removed_lines"}.
+    """
+    text = _normalize_dashes(unicodedata.normalize("NFKC", html.unescape(job_post)))
+    lines = [_SPACES.sub(" ", _strip_markdown(line)).strip() for line in text.splitlines()]
+
+    budget: Optional[Dict[str, Any]] = None
+    duration: Optional[Dict[str, Any]] = None
+    skills: List[str] = []
+    seen = set()
+    kept: List[str] = []
+    removed = 0
+    index = 0
+    client_block = False
+    while index < len(lines):
+        line = lines[index]
+        index += 1
+        if not line:
+            if kept and kept[-1]:
+                kept.append("")
+            continue
+        if _is_boilerplate(line) or (client_block and CLIENT_LOCATION.fullmatch(line)):
+            client_block = client_block or CLIENT_HEADING.fullmatch(line) is not None
+            removed += 1
+            continue
+        client_block = False
+
+        match = SKILLS_HEADING.match(line)
+        if match:
+            if match.group(2):
+                found = [skill.strip() for skill in re.split(r"[,;|]", match.group(2)) if skill.strip()]
+            else:
+                found, index = _collect_badges(lines, index)
+            known = {skill.lower() for skill in skills}
+            new = [skill for skill in found if skill.lower() not in known]
+            skills.extend(new)
+            if new:
+                kept.append("Skills: " + ", ".join(new))
+                kept.append("")
+            continue
+
+        match = BUDGET_LABEL.match(line)
+        if match and budget is None:
+            value = match.group(2)
+            if not value or value.endswith("-"):
+                # Amounts pasted from the page often wrap across lines
+                rest, index = _continuation(lines, index, amounts=True)
+                value = f"{value} {rest}".strip()
+            budget = _parse_budget(value, match.group(1))
+            kept.append(f"Budget: {_format_budget(budget)}")
+            continue
+
+        match = DURATION_LABEL.match(line)
+        if (match or DURATION_BADGE.match(line)) and duration is None:
+            value = match.group(2) if match else line
+            if match and not value:
+                value, index = _continuation(lines, index)
+            duration = _parse_duration(value)
+            kept.append(f"Duration: {value}")
+            continue
+
+        # Repeated sentences (pasted twice, or page chrome echoed) are sent once
+        key = line.lower()
+        if len(line.split()) >= 5 and key in seen:
+            removed += 1
+            continue
+        seen.add(key)
+        kept.append(line)
+
+    cleaned = "\n".join(kept).strip()
+    tokens_before = estimate_tokens(job_post, model)
+    tokens_after = estimate_tokens(cleaned, model)
+    return {
+        "text": cleaned,
+        "fields": {"budget": budget, "duration": duration, "skills": skills},
+        "tokens_before": tokens_before,
+        "tokens_after": tokens_after,
+        "saved_tokens": tokens_before - tokens_after,
+        "removed_lines": removed,
+    }
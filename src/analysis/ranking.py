@@ -0,0 +1,48 @@
+"""Rank proposal candidates sampled in one call.
+
+Each candidate is scored on how well it keeps to the word limit and on its
+embedding similarity to the job post and to the extracted requirements. The
+similarities of all candidates to all targets come from one matrix product.
+"""
+
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+# Weights of similarity to each target (post, requirements) and of word-limit compliance
+SIMILARITY_WEIGHTS = (0.4, 0.3)
+COMPLIANCE_WEIGHT = 0.3
+
+
+def word_limit_compliance(word_counts: np.ndarray, limit: int) -> np.ndarray:
+    """1.0 for drafts between half the limit and the limit, falling off linearly
+    with the words over the limit (which get cut) or short of half of it"""
+    over = np.maximum(word_counts - limit, 0) / limit
+    under = np.maximum(limit / 2 - word_counts, 0) / limit
+    return np.clip(1.0 - over - under, 0.0, 1.0)
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    return matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+
+
+def rank_candidates(candidates: List[str], candidate_vectors: Sequence[Sequence[float]],
+                    target_vectors: Sequence[Sequence[float]], limit: int,
+                    weights: Sequence[float] = SIMILARITY_WEIGHTS) -> List[Dict[str, Any]]:
+    """Order candidates best first.
+
+    target_vectors are the post and requirement embeddings, matched to
+    weights by position. Returns [{"text", "score", "words", "similarity"}].
+    """
+    vectors = _normalize_rows(np.asarray(candidate_vectors, dtype=np.float32))
+    targets = _normalize_rows(np.asarray(target_vectors, dtype=np.float32))
+    weights = np.asarray(weights[:len(targets)], dtype=np.float32)
+    similarity = vectors @ targets.T  # (candidates, targets)
+    words = np.asarray([len(candidate.split()) for candidate in candidates], dtype=np.float32)
+    scores = similarity @ weights + COMPLIANCE_WEIGHT * word_limit_compliance(words, limit)
+    return [{
+        "text": candidates[index],
+        "score": round(float(scores[index]), 4),
+        "words": int(words[index]),
+        "similarity": [round(float(value), 4) for value in similarity[index]],
+    } for index in np.argsort(-scores, kind="stable")]
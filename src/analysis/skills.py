@@ -0,0 +1,240 @@
+"""Deterministic extraction of technologies and skills from a job post.
+
+Every section used to rediscover the tech stack from the raw post. The
+taxonomy below is matched in one pass with an Aho-Corasick automaton (all
+aliases at once, linear in the post length), so the stack is known before
+the first model call and can be handed to each section prompt and returned
+as a structured field. Matches must start and end on word boundaries, so
+"java" does not match inside "javascript" and "go" needs to stand alone.
+Aliases that are also ordinary words ("rails", "spark") only count when
+written the way the tool is, and need another skill nearby when they open a
+sentence.
+"""
+
+import re
+from collections import deque
+from typing import Dict, List, Tuple
+
+# Canonical name -> (category, aliases). Aliases are matched case-insensitively;
+# the canonical name itself is always an alias, so tools named after common
+# words (Go, Swift, Express) get a canonical name that can't occur in prose.
+SKILL_TAXONOMY: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    # Languages
+    "Python": ("language", ()),
+    "JavaScript": ("language", ("js", "es6")),
+    "TypeScript": ("language", ("ts",)),
+    "Java": ("language", ()),
+    "Kotlin": ("language", ()),
+    "Swift (iOS)": ("language", ("swiftui", "swift ios", "ios swift", "swift 5")),
+    "Golang": ("language", ("go language", "go lang")),
+    "Rust": ("language", ()),
+    "C++": ("language", ("cpp",)),
+    "C#": ("language", ("csharp", "c sharp")),
+    "PHP": ("language", ()),
+    "Ruby": ("language", ()),
+    "SQL": ("language", ()),
+    "Dart": ("language", ()),
+    "Scala": ("language", ()),
+    "Solidity": ("language", ()),
+    # Web and mobile frameworks
+    "Django": ("framework", ("django rest framework", "drf")),
+    "Flask": ("framework", ()),
+    "FastAPI": ("framework", ("fast api",)),
+    "Node.js": ("framework", ("nodejs", "node js")),
+    "Express.js": ("framework", ("expressjs",)),
+    "React": ("framework", ("react.js", "reactjs")),
+    "Next.js": ("framework", ("nextjs",)),
+    "Vue.js": ("framework", ("vue", "vuejs")),
+    "Angular": ("framework", ("angularjs",)),
+    "Svelte": ("framework", ()),
+    "Ruby on Rails": ("framework", ("rails",)),
+    "Laravel": ("framework", ()),
+    "Spring Boot": ("framework", ()),
+    ".NET": ("framework", ("dotnet", "asp.net")),
+    "React Native": ("framework", ()),
+    "Flutter": ("framework", ()),
+    "Tailwind CSS": ("framework", ("tailwind", "tailwindcss")),
+    "WordPress": ("framework", ("wordpress",)),
+    "Shopify": ("framework", ()),
+    # Machine learning and data
+    "TensorFlow": ("ml", ("tensorflow", "tf2")),
+    "PyTorch": ("ml", ()),
+    "Keras": ("ml", ()),
+    "scikit-learn": ("ml", ("sklearn", "scikit learn")),
+    "Hugging Face": ("ml", ("huggingface", "hugging face transformers")),
+    "LangChain": ("ml", ()),
+    "LlamaIndex": ("ml", ()),
+    "OpenAI API": ("ml", ("openai", "gpt-4", "gpt-4o", "chatgpt")),
+    "Pandas": ("ml", ()),
+    "NumPy": ("ml", ()),
+    "Spark": ("ml", ("pyspark", "apache spark")),
+    "OpenCV": ("ml", ()),
+    "XGBoost": ("ml", ()),
+    "Dialogflow": ("ml", ()),
+    "Microsoft LUIS": ("ml", ("luis",)),
+    "Rasa": ("ml", ()),
+    # Methods
+    "Machine Learning": ("method", ("ml",)),
+    "Deep Learning": ("method", ()),
+    "NLP": ("method", ("natural language processing",)),
+    "Computer Vision": ("method", ()),
+    "LLM": ("method", ("llms", "large language model", "large language models")),
+    "RAG": ("method", ("retrieval augmented generation", "retrieval-augmented generation")),
+    "Fine-tuning": ("method", ("fine tuning", "finetuning")),
+    "Chatbot": ("method", ("chatbots", "chat bot")),
+    "Data Analysis": ("method", ("data analytics",)),
+    "Web Scraping": ("method", ("scraping", "web scraper")),
+    "REST API": ("method", ("restful", "restful api", "restful apis", "rest apis")),
+    "GraphQL": ("method", ()),
+    "Microservices": ("method", ()),
+    "CI/CD": ("method", ("ci cd", "continuous integration")),
+    # Databases
+    "PostgreSQL": ("database", ("postgres",)),
+    "MySQL": ("database", ()),
+    "SQLite": ("database", ()),
+    "MongoDB": ("database", ("mongo",)),
+    "Redis": ("database", ()),
+    "Elasticsearch": ("database", ()),
+    "Firebase": ("database", ("firestore",)),
+    "Supabase": ("database", ()),
+    "Pinecone": ("database", ()),
+    # Cloud and tooling
+    "AWS": ("cloud", ("amazon web services", "aws lambda", "s3", "ec2")),
+    "Google Cloud": ("cloud", ("gcp", "google cloud platform")),
+    "Azure": ("cloud", ("microsoft azure",)),
+    "Docker": ("tool", ()),
+    "Kubernetes": ("tool", ("k8s",)),
+    "Terraform": ("tool", ()),
+    "Git": ("tool", ("github", "gitlab")),
+    "Celery": ("tool", ()),
+    "Figma": ("tool", ()),
+    "Stripe": ("tool", ()),
+}
+
+# Aliases that are also English words or names -> the exact spelling that
+# marks the technology ("guard rails", "spark ideas" and "Luis" are prose).
+AMBIGUOUS_ALIASES: Dict[str, str] = {
+    "ts": "TS",
+    "rails": "Rails",
+    "spark": "Spark",
+    "luis": "LUIS",
+    "rust": "Rust",
+    "dart": "Dart",
+    "flask": "Flask",
+    "celery": "Celery",
+    "stripe": "Stripe",
+}
+
+# Characters either side of a sentence-initial ambiguous alias searched for
+# another skill, since capitalization says nothing there
+CONTEXT_WINDOW = 80
+
+_SENTENCE_START = re.compile(r"(?:^|[.!?\n])[\s\-*•#>]*$")
+
+
+class SkillMatcher:
+    """Aho-Corasick automaton over the aliases of a skill taxonomy"""
+
+    def __init__(self, taxonomy: Dict[str, Tuple[str, Tuple[str, ...]]] = None):
+        self.taxonomy = taxonomy or SKILL_TAXONOMY
+        # State 0 is the root; each state has transitions, a failure link and outputs
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[Tuple[int, str]]] = [[]]
+        for name, (_, aliases) in self.taxonomy.items():
+            for alias in {name.lower(), *(alias.lower() for alias in aliases)}:
+                self._add(alias, name)
+        self._link()
+
+    def _add(self, alias: str, name: str) -> None:
+        state = 0
+        for char in alias:
+            if char not in self._goto[state]:
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[state][char] = len(self._goto) - 1
+            state = self._goto[state][char]
+        self._output[state].append((len(alias), name))
+
+    def _link(self) -> None:
+        """Breadth-first pass setting failure links and merging outputs.
+
+        Failure transitions are folded into _next, so matching follows one
+        dict lookup per character instead of walking failure links.
+        """
+        self._next: List[Dict[str, int]] = [dict(self._goto[0])] + [{} for _ in self._goto[1:]]
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            self._next[state] = {**self._next[self._fail[state]], **self._goto[state]}
+            for char, child in self._goto[state].items():
+                queue.append(child)
+                self._fail[child] = self._next[self._fail[state]].get(char, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    @staticmethod
+    def _boundary(text: str, index: int) -> bool:
+        """Whether index sits outside a word (alias punctuation like '+' or '#' counts as inside)"""
+        return index < 0 or index >= len(text) or not (text[index].isalnum() or text[index] in "+#")
+
+    def find(self, text: str) -> List[Tuple[int, int, str]]:
+        """Every (start, end, name) match on word boundaries, longest first at each start"""
+        lowered = text.lower()
+        transitions, outputs = self._next, self._output
+        matches = []
+        state = 0
+        for index, char in enumerate(lowered):
+            state = transitions[state].get(char, 0)
+            if outputs[state]:
+                for length, name in outputs[state]:
+                    start = index - length + 1
+                    if self._boundary(lowered, start - 1) and self._boundary(lowered, index + 1):
+                        matches.append((start, index + 1, name))
+        matches.sort(key=lambda match: (match[0], -(match[1] - match[0])))
+        # Drop matches inside a longer one ("react" inside "react native")
+        kept, covered = [], -1
+        for start, end, name in matches:
+            if start >= covered:
+                kept.append((start, end, name))
+                covered = end
+        return self._disambiguate(text, kept)
+
+    @staticmethod
+    def _disambiguate(text: str, matches: List[Tuple[int, int, str]]) -> List[Tuple[int, int, str]]:
+        """Drop ambiguous aliases used as ordinary words"""
+        ambiguous = [text[start:end].lower() in AMBIGUOUS_ALIASES for start, end, _ in matches]
+        anchors = [start for (start, _, _), vague in zip(matches, ambiguous) if not vague]
+        kept = []
+        for (start, end, name), vague in zip(matches, ambiguous):
+            if vague:
+                if text[start:end] != AMBIGUOUS_ALIASES[text[start:end].lower()]:
+                    continue
+                if _SENTENCE_START.search(text, max(0, start - 40), start) and not any(
+                        abs(anchor - start) <= CONTEXT_WINDOW for anchor in anchors):
+                    continue
+            kept.append((start, end, name))
+        return kept
+
+    def extract(self, text: str) -> List[Dict[str, object]]:
+        """Skills found in text, in order of first mention, with mention counts"""
+        found: Dict[str, Dict[str, object]] = {}
+        for _, _, name in self.find(text):
+            if name not in found:
+                found[name] = {"name": name, "category": self.taxonomy[name][0], "count": 0}
+            found[name]["count"] += 1
+        return list(found.values())
+
+
+# Built at import (a few milliseconds) so requests never pay for it
+default_matcher = SkillMatcher()
+
+
+def extract_skills(text: str) -> List[Dict[str, object]]:
+    """Extract skills with the default taxonomy"""
+    return default_matcher.extract(text)
+
+
+def skills_context(skills: List[Dict[str, object]]) -> str:
+    """One line listing the extracted skills, for the section prompts"""
+    return "Technologies and skills named in the post: " + ", ".join(skill["name"] for skill in skills) + "."
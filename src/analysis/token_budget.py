@@ -0,0 +1,90 @@
+"""Per-section max_tokens learned from observed output lengths.
+
+Every section used to be requested with max_tokens=1000, which makes Ollama
+reserve KV cache for output that never comes and lets runaway generations
+run long. TokenBudget keeps a window of completion token counts per
+(model, section) and caps each request at a high percentile plus a margin,
+falling back to fixed defaults until enough samples exist.
+"""
+
+import math
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_MAX_TOKENS = 1000
+
+# Caps used until a section has min_samples observations
+SECTION_DEFAULT_MAX_TOKENS = {
+    'proposal': 400,  # 150 words is about 200 tokens
+}
+
+
+class TokenBudget:
+    """Track output lengths per (model, section) and derive token caps"""
+
+    def __init__(self, percentile: float = 95.0, margin: float = 0.25, min_samples: int = 10,
+                 window: int = 200, floor: int = 64, ceiling: int = 2000):
+        self.percentile = percentile
+        self.margin = margin
+        self.min_samples = min_samples
+        self.window = window
+        self.floor = floor
+        self.ceiling = ceiling
+        self._lock = threading.Lock()
+        self._samples: Dict[Tuple[str, str], Deque[int]] = {}
+        self._caps: Dict[Tuple[str, str], int] = {}
+
+    @staticmethod
+    def default(section: Optional[str]) -> int:
+        return SECTION_DEFAULT_MAX_TOKENS.get(section, DEFAULT_MAX_TOKENS)
+
+    def max_tokens(self, model: str, section: Optional[str]) -> int:
+        """Token cap for the next request of this section"""
+        with self._lock:
+            return self._caps.get((model, section), self.default(section))
+
+    def observe(self, model: str, section: Optional[str], completion_tokens: Optional[int],
+                max_tokens: Optional[int] = None) -> None:
+        """Record one output length; max_tokens is the cap it was generated under.
+
+        An output that reached its cap was cut short, so its true length is
+        unknown; it is recorded at twice the cap so the cap grows instead of
+        locking in the truncation.
+        """
+        if completion_tokens is None:
+            return
+        if max_tokens and completion_tokens >= max_tokens:
+            completion_tokens = max_tokens * 2
+        key = (model, section)
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=self.window)
+            samples.append(completion_tokens)
+            if len(samples) >= self.min_samples:
+                high = float(np.percentile(np.fromiter(samples, dtype=float), self.percentile))
+                cap = math.ceil(high * (1 + self.margin))
+                self._caps[key] = max(self.floor, min(self.ceiling, cap))
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Current caps and sample counts, keyed by 'model/section'"""
+        with self._lock:
+            return {
+                f"{model}/{section}": {
+                    "samples": len(samples),
+                    "max_tokens": self._caps.get((model, section), self.default(section)),
+                }
+                for (model, section), samples in self._samples.items()
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._samples.clear()
+            self._caps.clear()
+
+
+# Shared by every JobAnalyzer in the process, so requests learn from each other
+default_budget = TokenBudget()
@@ -0,0 +1,53 @@
+"""Checks on generated sections, so a bad section can be repaired on its own.
+
+Each check names a problem the analyzer knows how to fix: an error message
+or empty output is regenerated, an over-long section is cut locally, and a
+section whose prompt asks for a numbered list but got prose is regenerated
+with a reminder of the format.
+"""
+
+import re
+from typing import List
+
+# The message returned in place of a section whose attempts all failed
+_FAILURE = re.compile(r"Analysis failed after \d+ attempts?: ")
+
+# "1.", "2)", "### 3." or "**4.**" at the start of a line
+_NUMBERED_ITEM = re.compile(r'^\s*(?:#+\s*|\*\*)?\d+[.)]', re.MULTILINE)
+
+# Instructions added to the prompt when a section is regenerated
+REPAIR_HINTS = {
+    "not_numbered": "Format the answer as a numbered list (1., 2., 3., ...).",
+}
+
+
+def failure_message(attempts: int, error: str) -> str:
+    """Text returned in place of a section whose attempts all failed"""
+    return f"Analysis failed after {attempts} attempts: {error}"
+
+
+def is_error(text: str) -> bool:
+    """Whether text is the failure message rather than generated content.
+
+    Provider failures never reach a section as text (their responses carry
+    an "error" field), so content that merely starts with "Error:" passes.
+    """
+    return _FAILURE.match(text) is not None
+
+
+def validate_section(text: str, numbered: bool = False, max_words: int = None) -> List[str]:
+    """Problems with one section's output; empty when it passes.
+
+    Problems are 'empty', 'error', 'too_long' (over max_words) and
+    'not_numbered' (fewer than two numbered items when numbered is set).
+    """
+    if not text or not text.strip():
+        return ["empty"]
+    if is_error(text):
+        return ["error"]
+    problems = []
+    if max_words and len(text.split()) > max_words:
+        problems.append("too_long")
+    if numbered and len(_NUMBERED_ITEM.findall(text)) < 2:
+        problems.append("not_numbered")
+    return problems
@@ -3,10 +3,22 @@
 from .base import BaseModel
 from .external_models import OpenRouterModel
 from .ollama_models import OllamaEmbedding, OllamaInference
+from .health import HealthMonitor
+from .local_embedding import FallbackEmbedding, LocalEmbedding, embed_with_model
+from .keepalive import OllamaKeepAlive, start_keep_alive
+from .singleflight import SingleFlight, single_flight
 
 __all__ = [
     'BaseModel',
     'OpenRouterModel',
+    'FallbackEmbedding',
+    'HealthMonitor',
+    'LocalEmbedding',
     'OllamaEmbedding',
     'OllamaInference',
+    'OllamaKeepAlive',
+    'start_keep_alive',
+    'SingleFlight',
+    'single_flight',
+    'embed_with_model',
 ] 
\ No newline at end of file
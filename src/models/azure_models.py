@@ -1,6 +1,11 @@
 from azure.ai.inference import ChatCompletionsClient, EmbeddingsClient
-from azure.ai.inference.models import SystemMessage, UserMessage
+from azure.ai.inference.aio import ChatCompletionsClient as AsyncChatCompletionsClient
+from azure.ai.inference.models import AssistantMessage, SystemMessage, UserMessage
 from azure.core.credentials import AzureKeyCredential
+from azure.core.pipeline.transport import RequestsTransport
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Union
+import asyncio
 import numpy as np
 import time
 import logging
@@ -11,30 +16,159 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 from .base import BaseModel
+from .health import http_probe
+from .transport import create_session
+from ..monitoring import instrument, record_retry, record_usage, registry, span, with_context
+
+# API version for the /info route the inference SDK uses
+INFO_API_VERSION = "2024-05-01-preview"
+
+_AZURE_MESSAGES = {"system": SystemMessage, "user": UserMessage, "assistant": AssistantMessage}
 
 class AzureModelBase(BaseModel):
     """Base class for Azure models"""
-    def __init__(self, token: str, endpoint: str = "https://models.inference.ai.azure.com", timeout: int = 30):
+    def __init__(self, token: str, endpoint: str = "https://models.inference.ai.azure.com", timeout: int = 30,
+                 session=None):
         self.token = token
         self.endpoint = endpoint
         self.timeout = timeout
         self.credential = AzureKeyCredential(token)
+        # Route the SDK through our session so it can be pooled, recorded or replayed
+        self.session = session or create_session()
+        self.transport = RequestsTransport(session=self.session, session_owner=False)
         logger.info(f"Initialized {self.__class__.__name__} with endpoint: {self.endpoint}")
 
-class AzureGPT4(AzureModelBase):
-    """Class for GPT-4o model"""
-    def __init__(self, token: str, endpoint: str = "https://models.inference.ai.azure.com", timeout: int = 30):
-        super().__init__(token, endpoint, timeout)
+    def probe(self) -> dict:
+        """Check the endpoint answers and accepts the token, without a completion"""
+        result = http_probe(self.session, f"{self.endpoint.rstrip('/')}/info?api-version={INFO_API_VERSION}",
+                            headers={"Authorization": f"Bearer {self.token}"}, timeout=self.timeout)
+        if result["status"] == 404:
+            # GitHub Models endpoints don't serve /info; reaching them is enough
+            result.update(healthy=True, detail="ok")
+        return result
+
+class AzureChatModel(AzureModelBase):
+    """Chat completions through the Azure AI Inference client.
+
+    batch sends many conversations (the sections of an analysis, or many
+    posts) concurrently over the shared session; abatch does the same on
+    the SDK's async client, which needs aiohttp. max_tokens is one cap for
+    every conversation or a list with a cap per conversation.
+    """
+    model_name = None
+    # GitHub Models allow two concurrent requests on most models
+    max_concurrency = 2
+
+    def __init__(self, token: str, endpoint: str = "https://models.inference.ai.azure.com", timeout: int = 30,
+                 session=None, max_concurrency: int = None):
+        super().__init__(token, endpoint, timeout, session)
+        if max_concurrency:
+            self.max_concurrency = max_concurrency
         try:
             self.client = ChatCompletionsClient(
                 endpoint=self.endpoint,
-                credential=self.credential
+                credential=self.credential,
+                transport=self.transport
             )
             logger.info("ChatCompletionsClient initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize ChatCompletionsClient: {str(e)}")
             raise
-    
+
+    @staticmethod
+    def _messages(messages: List[Dict[str, Any]]) -> list:
+        return [_AZURE_MESSAGES[msg["role"]](content=msg["content"]) for msg in messages]
+
+    def _response(self, response, record: Dict[str, Any]) -> Dict[str, Any]:
+        usage = response.usage
+        prompt_tokens = usage.prompt_tokens if usage else None
+        completion_tokens = usage.completion_tokens if usage else None
+        record_usage(record, "azure", self.model_name, prompt_tokens, completion_tokens)
+        return {
+            "message": {"role": "assistant", "content": response.choices[0].message.content},
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens}
+        }
+
+    def complete(self, messages: List[Dict[str, Any]], temperature: float = 1.0, top_p: float = 1.0,
+                 max_tokens: int = 1000) -> Dict[str, Any]:
+        """Complete a chat conversation"""
+        try:
+            with span("provider.complete", provider="azure", model=self.model_name) as record:
+                response = self._response(self.client.complete(
+                    messages=self._messages(messages),
+                    temperature=temperature,
+                    top_p=top_p,
+                    max_tokens=max_tokens,
+                    model=self.model_name
+                ), record)
+            registry.inc("freelance_provider_requests_total", provider="azure", kind="complete", outcome="ok")
+            return response
+        except Exception as e:
+            registry.inc("freelance_provider_requests_total", provider="azure", kind="complete", outcome="error")
+            logger.error(f"{self.model_name} completion failed: {str(e)}")
+            raise
+
+    @staticmethod
+    def _error(e: Exception) -> Dict[str, Any]:
+        """Response for a failed conversation in a batch, which doesn't fail the batch"""
+        return {"message": {"role": "assistant", "content": f"Error: {str(e)}"}, "usage": {}, "error": str(e)}
+
+    def batch(self, conversations: List[List[Dict[str, Any]]], temperature: float = 1.0, top_p: float = 1.0,
+              max_tokens: Union[int, List[int]] = 1000) -> List[Dict[str, Any]]:
+        """One response per conversation, in order, max_concurrency at a time"""
+        caps = max_tokens if isinstance(max_tokens, list) else [max_tokens] * len(conversations)
+
+        def complete(conversation, max_tokens):
+            try:
+                return self.complete(conversation, temperature=temperature, top_p=top_p, max_tokens=max_tokens)
+            except Exception as e:
+                return self._error(e)
+
+        with span("provider.batch", provider="azure", model=self.model_name) as record:
+            record["size"] = len(conversations)
+            with ThreadPoolExecutor(max_workers=max(1, min(self.max_concurrency, len(conversations)))) as executor:
+                return list(executor.map(with_context(complete), conversations, caps))
+
+    async def abatch(self, conversations: List[List[Dict[str, Any]]], temperature: float = 1.0, top_p: float = 1.0,
+                     max_tokens: Union[int, List[int]] = 1000) -> List[Dict[str, Any]]:
+        """batch for asyncio callers, on the async client"""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        caps = max_tokens if isinstance(max_tokens, list) else [max_tokens] * len(conversations)
+
+        async def complete(client, conversation, max_tokens):
+            async with semaphore:
+                try:
+                    with span("provider.complete", provider="azure", model=self.model_name) as record:
+                        response = self._response(await client.complete(
+                            messages=self._messages(conversation),
+                            temperature=temperature,
+                            top_p=top_p,
+                            max_tokens=max_tokens,
+                            model=self.model_name
+                        ), record)
+                    registry.inc("freelance_provider_requests_total", provider="azure", kind="complete", outcome="ok")
+                    return response
+                except Exception as e:
+                    registry.inc("freelance_provider_requests_total", provider="azure", kind="complete",
+                                 outcome="error")
+                    logger.error(f"{self.model_name} completion failed: {str(e)}")
+                    return self._error(e)
+
+        with span("provider.batch", provider="azure", model=self.model_name) as record:
+            record["size"] = len(conversations)
+            async with AsyncChatCompletionsClient(endpoint=self.endpoint, credential=self.credential) as client:
+                return list(await asyncio.gather(*(complete(client, conversation, cap)
+                                                   for conversation, cap in zip(conversations, caps))))
+
+    def complete_many(self, messages: List[Dict[str, Any]], n: int, **kwargs) -> List[Dict[str, Any]]:
+        """n completions of the same messages, as one batch"""
+        return self.batch([messages] * n, **kwargs)
+
+class AzureGPT4(AzureChatModel):
+    """Class for GPT-4o model"""
+    model_name = "gpt-4o"
+
+    @instrument("provider.test_connection")
     def test_connection(self) -> bool:
         try:
             logger.info("Testing connection to GPT-4o model...")
@@ -57,18 +191,35 @@ class AzureGPT4(AzureModelBase):
 
 class AzureEmbedding(AzureModelBase):
     """Class for Text Embedding 3 model"""
-    def __init__(self, token: str, endpoint: str = "https://models.inference.ai.azure.com", timeout: int = 30):
-        super().__init__(token, endpoint, timeout)
+    def __init__(self, token: str, endpoint: str = "https://models.inference.ai.azure.com", timeout: int = 30,
+                 session=None):
+        super().__init__(token, endpoint, timeout, session)
         try:
             self.client = EmbeddingsClient(
                 endpoint=self.endpoint,
-                credential=self.credential
+                credential=self.credential,
+                transport=self.transport
             )
             logger.info("EmbeddingsClient initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize EmbeddingsClient: {str(e)}")
             raise
     
+    def embed(self, texts: List[str], **kwargs) -> List[List[float]]:
+        """Get embeddings for a list of texts in one request"""
+        try:
+            with span("provider.embed", provider="azure", model="text-embedding-3-large") as record:
+                record["texts"] = len(texts)
+                response = self.client.embed(input=texts, model="text-embedding-3-large")
+                embeddings = [item.embedding for item in response.data]
+            registry.inc("freelance_provider_requests_total", provider="azure", kind="embed", outcome="ok")
+            return embeddings
+        except Exception as e:
+            registry.inc("freelance_provider_requests_total", provider="azure", kind="embed", outcome="error")
+            logger.error(f"Azure embedding failed: {str(e)}")
+            raise
+
+    @instrument("provider.test_connection")
     def test_connection(self) -> bool:
         max_retries = 3
         retry_delay = 1  # seconds
@@ -86,26 +237,18 @@ class AzureEmbedding(AzureModelBase):
             except Exception as e:
                 if "429" in str(e) and attempt < max_retries - 1:  # Rate limit
                     logger.warning(f"Rate limit hit, retrying in {retry_delay} seconds...")
+                    record_retry(provider="azure", reason="rate_limit")
                     time.sleep(retry_delay)
                     retry_delay *= 2  # Exponential backoff
                     continue
                 logger.error(f"Embedding connection test failed with error: {str(e)}")
                 return False
 
-class AzurePhi35(AzureModelBase):
+class AzurePhi35(AzureChatModel):
     """Class for Phi-3.5-MoE instruct model"""
-    def __init__(self, token: str, endpoint: str = "https://models.inference.ai.azure.com", timeout: int = 30):
-        super().__init__(token, endpoint, timeout)
-        try:
-            self.client = ChatCompletionsClient(
-                endpoint=self.endpoint,
-                credential=self.credential
-            )
-            logger.info("ChatCompletionsClient initialized successfully")
-        except Exception as e:
-            logger.error(f"Failed to initialize ChatCompletionsClient: {str(e)}")
-            raise
-    
+    model_name = "Phi-3.5-MoE-instruct"
+
+    @instrument("provider.test_connection")
     def test_connection(self) -> bool:
         try:
             logger.info("Testing connection to Phi-3.5 model...")
@@ -126,20 +269,11 @@ class AzurePhi35(AzureModelBase):
             logger.error(f"Phi-3.5 connection test failed with error: {str(e)}")
             return False
 
-class AzureLlama33(AzureModelBase):
+class AzureLlama33(AzureChatModel):
     """Class for Llama-3.3-70B-Instruct model"""
-    def __init__(self, token: str, endpoint: str = "https://models.inference.ai.azure.com", timeout: int = 30):
-        super().__init__(token, endpoint, timeout)
-        try:
-            self.client = ChatCompletionsClient(
-                endpoint=self.endpoint,
-                credential=self.credential
-            )
-            logger.info("ChatCompletionsClient initialized successfully")
-        except Exception as e:
-            logger.error(f"Failed to initialize ChatCompletionsClient: {str(e)}")
-            raise
-    
+    model_name = "Llama-3.3-70B-Instruct"
+
+    @instrument("provider.test_connection")
     def test_connection(self) -> bool:
         try:
             logger.info("Testing connection to Llama-3.3 model...")
@@ -160,20 +294,11 @@ class AzureLlama33(AzureModelBase):
             logger.error(f"Llama-3.3 connection test failed with error: {str(e)}")
             return False
 
-class AzureMetaLlama31(AzureModelBase):
+class AzureMetaLlama31(AzureChatModel):
     """Class for Meta-Llama-3.1-405B-Instruct model"""
-    def __init__(self, token: str, endpoint: str = "https://models.inference.ai.azure.com", timeout: int = 30):
-        super().__init__(token, endpoint, timeout)
-        try:
-            self.client = ChatCompletionsClient(
-                endpoint=self.endpoint,
-                credential=self.credential
-            )
-            logger.info("ChatCompletionsClient initialized successfully")
-        except Exception as e:
-            logger.error(f"Failed to initialize ChatCompletionsClient: {str(e)}")
-            raise
-    
+    model_name = "Meta-Llama-3.1-405B-Instruct"
+
+    @instrument("provider.test_connection")
     def test_connection(self) -> bool:
         try:
             logger.info("Testing connection to Meta-Llama-3.1 model...")
@@ -194,20 +319,11 @@ class AzureMetaLlama31(AzureModelBase):
             logger.error(f"Meta-Llama-3.1 connection test failed with error: {str(e)}")
             return False
 
-class AzureMistral(AzureModelBase):
+class AzureMistral(AzureChatModel):
     """Class for Mistral Large 24.11 model"""
-    def __init__(self, token: str, endpoint: str = "https://models.inference.ai.azure.com", timeout: int = 30):
-        super().__init__(token, endpoint, timeout)
-        try:
-            self.client = ChatCompletionsClient(
-                endpoint=self.endpoint,
-                credential=self.credential
-            )
-            logger.info("ChatCompletionsClient initialized successfully")
-        except Exception as e:
-            logger.error(f"Failed to initialize ChatCompletionsClient: {str(e)}")
-            raise
-    
+    model_name = "Mistral-large-2411"
+
+    @instrument("provider.test_connection")
     def test_connection(self) -> bool:
         try:
             logger.info("Testing connection to Mistral model...")
@@ -1,5 +1,8 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional, Union
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Union
+
+from ..monitoring import with_context
 
 class BaseModel(ABC):
     """Base class for all model interfaces"""
@@ -7,4 +10,16 @@ class BaseModel(ABC):
     @abstractmethod
     def test_connection(self) -> bool:
         """Test if the model connection is working"""
-        pass 
\ No newline at end of file
+        pass
+
+    def probe(self) -> Dict[str, Any]:
+        """Cheap health check for HealthMonitor; falls back to test_connection"""
+        return {"healthy": self.test_connection(), "detail": "test_connection"}
+
+    def complete_many(self, messages: List[Dict[str, Any]], n: int, **kwargs) -> List[Dict[str, Any]]:
+        """n independent completions of the same messages, requested concurrently.
+
+        Providers that can sample several choices in one call override this.
+        """
+        with ThreadPoolExecutor(max_workers=n) as executor:
+            return list(executor.map(with_context(lambda _: self.complete(messages=messages, **kwargs)), range(n)))
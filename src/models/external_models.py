@@ -1,28 +1,190 @@
+import os
 import requests
 import json
 import time
-from langchain_google_genai import GoogleGenerativeAI, GoogleGenerativeAIEmbeddings
+from typing import Any, Dict, List, Union
+from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
 from langchain_groq import ChatGroq
-from langchain_core.messages import HumanMessage
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.runnables import RunnableLambda
 import logging
 
 from .base import BaseModel
+from .health import http_probe
+from .singleflight import single_flight
+from .transport import create_session
+from ..monitoring import instrument, record_retry, registry, record_usage, span
+
+DEFAULT_OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+GEMINI_MODELS_URL = "https://generativelanguage.googleapis.com/v1beta/models"
+GROQ_MODELS_URL = "https://api.groq.com/openai/v1/models"
+
+_LANGCHAIN_MESSAGES = {"system": SystemMessage, "user": HumanMessage, "assistant": AIMessage}
+
+
+def _langchain_messages(messages: List[Dict[str, Any]]) -> list:
+    """LangChain messages for role/content dicts"""
+    return [_LANGCHAIN_MESSAGES[msg["role"]](content=msg["content"]) for msg in messages]
+
+
+class LangChainInference(BaseModel):
+    """Completions through a LangChain chat model (self.model).
+
+    batch and abatch send many conversations (the sections of an analysis,
+    or many posts) in one call through the model's batch/abatch, with at
+    most max_concurrency requests in flight. max_tokens is one cap for every
+    conversation or a list with a cap per conversation.
+    """
+    provider = None
+    model_name = None
+    max_concurrency = 4
+    # LangChain field for each completion option, where its name differs
+    option_fields: Dict[str, str] = {}
+
+    def _configured(self, **options):
+        """self.model with the options applied; the client is shared"""
+        fields = getattr(type(self.model), "model_fields", {})
+        update, extra = {}, {}
+        for name, value in options.items():
+            field = self.option_fields.get(name, name)
+            if field in fields:
+                update[field] = value
+            elif "model_kwargs" in fields:
+                extra[field] = value
+        if extra:
+            update["model_kwargs"] = {**self.model.model_kwargs, **extra}
+        return self.model.model_copy(update=update) if update else self.model
+
+    @staticmethod
+    def _response(message) -> Dict[str, Any]:
+        usage = getattr(message, "usage_metadata", None) or {}
+        content = message.content
+        if isinstance(content, list):
+            # Content blocks (Gemini); keep the text ones
+            content = "".join(block if isinstance(block, str) else block.get("text", "") for block in content)
+        return {
+            "message": {"role": "assistant", "content": content},
+            "usage": {"prompt_tokens": usage.get("input_tokens"), "completion_tokens": usage.get("output_tokens")}
+        }
+
+    def complete(self, messages: List[Dict[str, Any]], temperature: float = 1.0, top_p: float = 1.0,
+                 max_tokens: int = 1000) -> Dict[str, Any]:
+        """Complete a chat conversation"""
+        try:
+            with span("provider.complete", provider=self.provider, model=self.model_name) as record:
+                model = self._configured(temperature=temperature, top_p=top_p, max_tokens=max_tokens)
+                response = self._response(model.invoke(_langchain_messages(messages)))
+                usage = response["usage"]
+                record_usage(record, self.provider, self.model_name, usage["prompt_tokens"],
+                             usage["completion_tokens"])
+            registry.inc("freelance_provider_requests_total", provider=self.provider, kind="complete", outcome="ok")
+            return response
+        except Exception as e:
+            registry.inc("freelance_provider_requests_total", provider=self.provider, kind="complete", outcome="error")
+            logging.error(f"{self.provider} completion failed: {str(e)}")
+            raise
+
+    def _collect(self, record: Dict[str, Any], messages: list) -> List[Dict[str, Any]]:
+        """Responses for a batch's results; a failed conversation gets a
+        response with an "error" (and "Error: ..." as its content) instead of
+        failing the batch"""
+        responses = []
+        for message in messages:
+            outcome = "error" if isinstance(message, Exception) else "ok"
+            registry.inc("freelance_provider_requests_total", provider=self.provider, kind="batch", outcome=outcome)
+            if outcome == "error":
+                logging.error(f"{self.provider} batch item failed: {str(message)}")
+                responses.append({"message": {"role": "assistant", "content": f"Error: {str(message)}"}, "usage": {},
+                                  "error": str(message)})
+            else:
+                responses.append(self._response(message))
+        usages = [response["usage"] for response in responses]
+        record_usage(record, self.provider, self.model_name,
+                     sum(usage.get("prompt_tokens") or 0 for usage in usages),
+                     sum(usage.get("completion_tokens") or 0 for usage in usages))
+        return responses
+
+    def _batch_runnable(self, conversations: List[List[Dict[str, Any]]], temperature: float, top_p: float,
+                        max_tokens: Union[int, List[int]]):
+        """(runnable, inputs) for one batch call; with several caps each
+        conversation goes to a copy of the model configured with its own"""
+        messages = [_langchain_messages(conversation) for conversation in conversations]
+        caps = max_tokens if isinstance(max_tokens, list) else [max_tokens] * len(conversations)
+        models = {cap: self._configured(temperature=temperature, top_p=top_p, max_tokens=cap) for cap in set(caps)}
+        if len(models) == 1:
+            return next(iter(models.values())), messages
+
+        def invoke(item):
+            return models[item[0]].invoke(item[1])
+
+        async def ainvoke(item):
+            return await models[item[0]].ainvoke(item[1])
+
+        return RunnableLambda(invoke, afunc=ainvoke), list(zip(caps, messages))
+
+    def batch(self, conversations: List[List[Dict[str, Any]]], temperature: float = 1.0, top_p: float = 1.0,
+              max_tokens: Union[int, List[int]] = 1000) -> List[Dict[str, Any]]:
+        """One response per conversation, in order, from one batch call"""
+        runnable, inputs = self._batch_runnable(conversations, temperature, top_p, max_tokens)
+        with span("provider.batch", provider=self.provider, model=self.model_name) as record:
+            record["size"] = len(conversations)
+            messages = runnable.batch(inputs, config={"max_concurrency": self.max_concurrency}, return_exceptions=True)
+            return self._collect(record, messages)
+
+    async def abatch(self, conversations: List[List[Dict[str, Any]]], temperature: float = 1.0, top_p: float = 1.0,
+                     max_tokens: Union[int, List[int]] = 1000) -> List[Dict[str, Any]]:
+        """batch for asyncio callers, on the model's async client"""
+        runnable, inputs = self._batch_runnable(conversations, temperature, top_p, max_tokens)
+        with span("provider.batch", provider=self.provider, model=self.model_name) as record:
+            record["size"] = len(conversations)
+            messages = await runnable.abatch(inputs, config={"max_concurrency": self.max_concurrency},
+                                             return_exceptions=True)
+            return self._collect(record, messages)
+
+    def complete_many(self, messages: List[Dict[str, Any]], n: int, **kwargs) -> List[Dict[str, Any]]:
+        """n completions of the same messages in one batch call"""
+        return self.batch([messages] * n, **kwargs)
+
 
 class GeminiBase(BaseModel):
     """Base class for Gemini models"""
+    model_name = None
+
     def __init__(self, api_key: str):
         self.api_key = api_key
+        self.session = create_session()
+
+    def probe(self) -> dict:
+        """Look the model up in the model list instead of calling it"""
+        return http_probe(self.session, f"{GEMINI_MODELS_URL}/{self.model_name}",
+                          headers={"x-goog-api-key": self.api_key})
 
 class GeminiEmbedding(GeminiBase):
     """Class for Gemini text-embedding-004 model"""
+    model_name = "text-embedding-004"
+
     def __init__(self, api_key: str):
         super().__init__(api_key)
         self.model = GoogleGenerativeAIEmbeddings(
-            model="text-embedding-004",
+            model=self.model_name,
             google_api_key=api_key,
             task_type="retrieval_document"
         )
+
+    def embed(self, texts: List[str], **kwargs) -> List[List[float]]:
+        """Get embeddings for a list of texts (sent in batches of up to 100)"""
+        try:
+            with span("provider.embed", provider="gemini", model=self.model_name) as record:
+                record["texts"] = len(texts)
+                embeddings = self.model.embed_documents(texts)
+            registry.inc("freelance_provider_requests_total", provider="gemini", kind="embed", outcome="ok")
+            return embeddings
+        except Exception as e:
+            registry.inc("freelance_provider_requests_total", provider="gemini", kind="embed", outcome="error")
+            logging.error(f"Gemini embedding failed: {str(e)}")
+            raise
     
+    @instrument("provider.test_connection")
     def test_connection(self) -> bool:
         try:
             result = self.model.embed_query("Test sentence for embedding.")
@@ -30,18 +192,26 @@ class GeminiEmbedding(GeminiBase):
         except Exception:
             return False
 
-class GeminiInference(GeminiBase):
+class GeminiInference(GeminiBase, LangChainInference):
     """Class for Gemini-2.0-flash-exp model"""
-    def __init__(self, api_key: str):
+    model_name = "gemini-2.0-flash-exp"
+    provider = "gemini"
+    max_concurrency = 8
+    option_fields = {"max_tokens": "max_output_tokens"}
+
+    def __init__(self, api_key: str, max_concurrency: int = None):
         super().__init__(api_key)
-        self.model = GoogleGenerativeAI(
-            model="gemini-2.0-flash-exp",
+        if max_concurrency:
+            self.max_concurrency = max_concurrency
+        # A chat model, so system prompts and usage come through
+        self.model = ChatGoogleGenerativeAI(
+            model=self.model_name,
             google_api_key=api_key,
             temperature=1.0,
-            convert_system_message_to_human=True,
             max_tokens=50
         )
     
+    @instrument("provider.test_connection")
     def test_connection(self) -> bool:
         try:
             response = self.model.invoke([
@@ -53,12 +223,15 @@ class GeminiInference(GeminiBase):
 
 class OpenRouterModel:
     """OpenRouter model for inference"""
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, base_url: str = None, session: requests.Session = None):
         self.api_key = api_key
+        self.base_url = base_url or os.getenv("OPENROUTER_BASE_URL", DEFAULT_OPENROUTER_BASE_URL)
+        self.session = session or create_session()
         self.client = self  # Make the model itself act as the client
 
-    def complete(self, messages: list, temperature: float = 1.0, top_p: float = 1.0, max_tokens: int = 1000, model: str = "meta-llama/llama-3.1-405b-instruct:free") -> dict:
-        """Complete a chat conversation"""
+    @single_flight
+    def complete(self, messages: list, temperature: float = 1.0, top_p: float = 1.0, max_tokens: int = 1000, model: str = "meta-llama/llama-3.1-405b-instruct:free", n: int = 1) -> dict:
+        """Complete a chat conversation; n > 1 asks for that many choices"""
         try:
             # Format messages for OpenRouter
             formatted_messages = []
@@ -68,25 +241,27 @@ class OpenRouterModel:
                     "content": msg["content"]
                 })
 
-            # Make API call to OpenRouter
-            response = requests.post(
-                "https://openrouter.ai/api/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {self.api_key}",
-                    "HTTP-Referer": "https://github.com/your-username/your-repo",
-                    "X-Title": "FreelanceAssistant"
-                },
-                json={
-                    "model": model,
-                    "messages": formatted_messages,
-                    "temperature": temperature,
-                    "top_p": top_p,
-                    "max_tokens": max_tokens
-                },
-                timeout=30  # 30 second timeout
-            )
-            response.raise_for_status()
-            result = response.json()
+            with span("provider.complete", provider="openrouter", model=model) as record:
+                # Make API call to OpenRouter
+                response = self.session.post(
+                    f"{self.base_url}/chat/completions",
+                    headers={
+                        "Authorization": f"Bearer {self.api_key}",
+                        "HTTP-Referer": "https://github.com/your-username/your-repo",
+                        "X-Title": "FreelanceAssistant"
+                    },
+                    json={
+                        "model": model,
+                        "messages": formatted_messages,
+                        "temperature": temperature,
+                        "top_p": top_p,
+                        "max_tokens": max_tokens,
+                        **({"n": n} if n > 1 else {})
+                    },
+                    timeout=30  # 30 second timeout
+                )
+                response.raise_for_status()
+                result = response.json()
             
             # Ensure the response has the expected structure
             if "choices" not in result or not result["choices"]:
@@ -94,8 +269,12 @@ class OpenRouterModel:
             if "message" not in result["choices"][0]:
                 raise ValueError("Invalid response from OpenRouter: missing message")
             
+            registry.inc("freelance_provider_requests_total", provider="openrouter", kind="complete", outcome="ok")
+            usage = result.get("usage") or {}
+            record_usage(record, "openrouter", model, usage.get("prompt_tokens"), usage.get("completion_tokens"))
             return result
         except Exception as e:
+            registry.inc("freelance_provider_requests_total", provider="openrouter", kind="complete", outcome="error")
             logging.error(f"OpenRouter completion failed: {str(e)}")
             # Return a properly structured error response
             return {
@@ -103,9 +282,84 @@ class OpenRouterModel:
                     "message": {
                         "content": f"Error: {str(e)}"
                     }
-                }]
+                }],
+                "error": str(e)
             }
 
+    def complete_many(self, messages: list, n: int, **kwargs) -> list:
+        """n choices from one request, split into one response per choice.
+
+        Models that ignore `n` return fewer choices; usage is divided evenly.
+        """
+        result = self.complete(messages, n=n, **kwargs)
+        choices = result["choices"]
+        usage = result.get("usage") or {}
+        completion_tokens = usage.get("completion_tokens")
+        return [{
+            "choices": [choice],
+            "usage": {
+                "prompt_tokens": usage.get("prompt_tokens"),
+                "completion_tokens": completion_tokens // len(choices) if completion_tokens else None
+            },
+            **({"error": result["error"]} if result.get("error") else {})
+        } for choice in choices]
+
+    def stream(self, messages: list, temperature: float = 1.0, top_p: float = 1.0, max_tokens: int = 1000,
+               model: str = "meta-llama/llama-3.1-405b-instruct:free", usage: dict = None):
+        """Yield the completion as OpenRouter streams it (server-sent events).
+
+        Closing the generator closes the connection, which cancels the
+        generation upstream. If usage is given it receives the token counts.
+        """
+        usage = usage if usage is not None else {}
+        with span("provider.stream", provider="openrouter", model=model) as record:
+            response = self.session.post(
+                f"{self.base_url}/chat/completions",
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "HTTP-Referer": "https://github.com/your-username/your-repo",
+                    "X-Title": "FreelanceAssistant"
+                },
+                json={
+                    "model": model,
+                    "messages": [{"role": msg["role"], "content": msg["content"]} for msg in messages],
+                    "temperature": temperature,
+                    "top_p": top_p,
+                    "max_tokens": max_tokens,
+                    "stream": True
+                },
+                timeout=30,
+                stream=True
+            )
+            reported, chunks, outcome = {}, 0, "ok"
+            try:
+                response.raise_for_status()
+                for line in response.iter_lines(decode_unicode=True):
+                    if not line or not line.startswith("data:"):
+                        continue  # keep-alive comments
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    chunk = json.loads(data)
+                    reported = chunk.get("usage") or reported
+                    for choice in chunk.get("choices", []):
+                        content = (choice.get("delta") or {}).get("content")
+                        if content:
+                            chunks += 1
+                            yield content
+            except GeneratorExit:
+                outcome = "cancelled"
+            except Exception as e:
+                outcome = "error"
+                logging.error(f"OpenRouter streaming failed: {str(e)}")
+                raise
+            finally:
+                response.close()
+                usage.update(prompt_tokens=reported.get("prompt_tokens"),
+                             completion_tokens=reported.get("completion_tokens", chunks))
+                registry.inc("freelance_provider_requests_total", provider="openrouter", kind="stream", outcome=outcome)
+                record_usage(record, "openrouter", model, usage["prompt_tokens"], usage["completion_tokens"])
+
     def test_connection(self) -> bool:
         """Test connection to OpenRouter"""
         try:
@@ -124,17 +378,32 @@ class OpenRouterModel:
             logging.error(f"OpenRouter connection test failed: {str(e)}")
             return False
 
-class GroqModel(BaseModel):
+    def probe(self) -> dict:
+        """Validate the API key against /auth/key without spending quota"""
+        return http_probe(self.session, f"{self.base_url}/auth/key",
+                          headers={"Authorization": f"Bearer {self.api_key}"})
+
+class GroqModel(LangChainInference):
     """Class for Groq models"""
-    def __init__(self, api_key: str):
+    model_name = "llama-3.3-70b-versatile"
+    provider = "groq"
+    # Free-tier limits are per minute; more in flight only earns 429s
+    max_concurrency = 4
+
+    def __init__(self, api_key: str, max_concurrency: int = None):
+        self.api_key = api_key
+        if max_concurrency:
+            self.max_concurrency = max_concurrency
+        self.session = create_session()
         self.model = ChatGroq(
             api_key=api_key,
-            model_name="llama-3.3-70b-versatile",
+            model_name=self.model_name,
             temperature=1.0,
             max_tokens=50,
-            top_p=1.0
+            model_kwargs={"top_p": 1.0}
         )
     
+    @instrument("provider.test_connection")
     def test_connection(self) -> bool:
         try:
             response = self.model.invoke([
@@ -144,11 +413,17 @@ class GroqModel(BaseModel):
         except Exception:
             return False
 
+    def probe(self) -> dict:
+        """Look the model up in the model list instead of calling it"""
+        return http_probe(self.session, f"{GROQ_MODELS_URL}/{self.model_name}",
+                          headers={"Authorization": f"Bearer {self.api_key}"})
+
 class DeepSeekModel(BaseModel):
     """Class for DeepSeek models using OpenRouter"""
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, base_url: str = None, session: requests.Session = None):
         self.api_key = api_key
-        self.base_url = "https://openrouter.ai/api/v1"
+        self.base_url = base_url or os.getenv("OPENROUTER_BASE_URL", DEFAULT_OPENROUTER_BASE_URL)
+        self.session = session or create_session()
         self.model = "deepseek/deepseek-chat"
         self.headers = {
             "Authorization": f"Bearer {api_key}",
@@ -158,13 +433,14 @@ class DeepSeekModel(BaseModel):
             "X-Model": self.model
         }
     
+    @instrument("provider.test_connection")
     def test_connection(self) -> bool:
         max_retries = 3
         retry_delay = 1  # seconds
         
         for attempt in range(max_retries):
             try:
-                response = requests.post(
+                response = self.session.post(
                     f"{self.base_url}/chat/completions",
                     headers=self.headers,
                     json={
@@ -178,6 +454,7 @@ class DeepSeekModel(BaseModel):
                 
                 if response.status_code == 429:  # Rate limit
                     if attempt < max_retries - 1:
+                        record_retry(provider="deepseek", reason="rate_limit")
                         time.sleep(retry_delay)
                         retry_delay *= 2  # Exponential backoff
                         continue
@@ -189,9 +466,14 @@ class DeepSeekModel(BaseModel):
             
             except requests.exceptions.Timeout:
                 if attempt < max_retries - 1:
+                    record_retry(provider="deepseek", reason="timeout")
                     time.sleep(retry_delay)
                     retry_delay *= 2
                     continue
                 return False
             except (requests.exceptions.RequestException, json.JSONDecodeError, KeyError):
-                return False 
\ No newline at end of file
+                return False 
+
+    def probe(self) -> dict:
+        """Validate the OpenRouter key without spending quota"""
+        return http_probe(self.session, f"{self.base_url}/auth/key", headers=self.headers)
@@ -0,0 +1,169 @@
+"""Cheap, cached health probes for the model providers.
+
+test_connection() runs a real generation or embedding, which costs seconds
+and quota. Providers also expose probe(), which only hits a metadata
+endpoint (Ollama /api/tags and /api/ps, model-list or key endpoints for
+the hosted APIs). HealthMonitor runs the registered probes on a background
+thread and keeps the latest result per provider, so health endpoints and
+routing decisions read a cached answer instead of calling upstream.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import requests
+
+from ..monitoring import registry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROBE_TIMEOUT = 5.0  # seconds
+
+
+def http_probe(session: requests.Session, url: str, headers: Dict[str, str] = None,
+               timeout: float = DEFAULT_PROBE_TIMEOUT) -> Dict[str, Any]:
+    """GET a metadata endpoint and report whether it answered.
+
+    Returns {"healthy", "status", "latency_ms", "detail", "response"};
+    "response" is the requests.Response (None when unreachable) so callers
+    can inspect the body.
+    """
+    start = time.perf_counter()
+    try:
+        response = session.get(url, headers=headers, timeout=timeout)
+    except requests.exceptions.RequestException as e:
+        return {"healthy": False, "status": None, "latency_ms": (time.perf_counter() - start) * 1000,
+                "detail": f"unreachable: {str(e)}", "response": None}
+    latency_ms = (time.perf_counter() - start) * 1000
+    if response.status_code in (401, 403):
+        detail = "credentials rejected"
+    elif response.status_code == 429:
+        detail = "rate limited"
+    elif response.status_code >= 400:
+        detail = f"HTTP {response.status_code}"
+    else:
+        detail = "ok"
+    return {"healthy": response.status_code < 400, "status": response.status_code,
+            "latency_ms": latency_ms, "detail": detail, "response": response}
+
+
+class HealthMonitor:
+    """Run provider probes in the background and cache their results"""
+
+    def __init__(self, refresh_interval: float = 30.0, max_age: float = None):
+        self.refresh_interval = refresh_interval
+        # Results older than this are reported as stale and not trusted for routing
+        self.max_age = max_age if max_age is not None else 3 * refresh_interval
+        self._probes: Dict[str, Callable[[], Dict[str, Any]]] = {}
+        self._results: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def register(self, name: str, probe: Callable[[], Dict[str, Any]]) -> None:
+        """Register a probe (usually a provider's bound probe method)"""
+        with self._lock:
+            self._probes[name] = probe
+
+    def unregister(self, name: str) -> None:
+        with self._lock:
+            self._probes.pop(name, None)
+            self._results.pop(name, None)
+
+    def reset(self) -> None:
+        """Stop probing and forget every probe and result"""
+        self.stop()
+        with self._lock:
+            self._probes.clear()
+            self._results.clear()
+
+    @property
+    def names(self) -> List[str]:
+        with self._lock:
+            return list(self._probes)
+
+    def check(self, name: str) -> Dict[str, Any]:
+        """Run one probe now and cache its result"""
+        with self._lock:
+            probe = self._probes[name]
+        start = time.perf_counter()
+        try:
+            result = dict(probe())
+        except Exception as e:
+            logger.warning(f"Health probe {name} raised: {str(e)}")
+            result = {"healthy": False, "detail": f"probe failed: {str(e)}"}
+        result.pop("response", None)
+        result.setdefault("latency_ms", (time.perf_counter() - start) * 1000)
+        result["latency_ms"] = round(result["latency_ms"], 1)
+        result["checked_at"] = time.time()
+        registry.inc("freelance_health_probes_total", provider=name,
+                     outcome="healthy" if result["healthy"] else "unhealthy")
+        with self._lock:
+            previous = self._results.get(name)
+            if name in self._probes:
+                self._results[name] = result
+        if previous is None or previous["healthy"] != result["healthy"]:
+            log = logger.info if result["healthy"] else logger.warning
+            log(f"Provider {name} is {'healthy' if result['healthy'] else 'unhealthy'}: {result.get('detail')}")
+        return result
+
+    def check_all(self) -> Dict[str, Dict[str, Any]]:
+        return {name: self.check(name) for name in self.names}
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        """Latest cached result per provider; never calls upstream"""
+        now = time.time()
+        with self._lock:
+            snapshot = {name: dict(self._results[name]) if name in self._results else None
+                        for name in self._probes}
+        for name, result in snapshot.items():
+            if result is None:
+                snapshot[name] = {"healthy": None, "detail": "not checked yet", "stale": True}
+            else:
+                result["age_s"] = round(now - result["checked_at"], 1)
+                result["stale"] = result["age_s"] > self.max_age
+        return snapshot
+
+    def is_healthy(self, name: str) -> bool:
+        """False only when a fresh probe says the provider is down.
+
+        Unknown or stale results count as healthy, so a stopped monitor
+        never blocks traffic.
+        """
+        with self._lock:
+            result = self._results.get(name)
+        if result is None or time.time() - result["checked_at"] > self.max_age:
+            return True
+        return result["healthy"]
+
+    def first_healthy(self, names: List[str]) -> Optional[str]:
+        """Pick the first provider in preference order that is not known to be down"""
+        for name in names:
+            if self.is_healthy(name):
+                return name
+        return None
+
+    def _run(self) -> None:
+        while True:
+            self.check_all()
+            if self._stop.wait(self.refresh_interval):
+                return
+
+    def start(self) -> "HealthMonitor":
+        """Probe now and then every refresh_interval seconds on a daemon thread"""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="health-monitor", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+
+monitor = HealthMonitor()
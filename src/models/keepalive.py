@@ -0,0 +1,155 @@
+"""Warm-up and keep-alive management for Ollama models.
+
+Ollama unloads a model after its keep_alive expires, and the next request
+pays the full load time. OllamaKeepAlive preloads the models at startup,
+refreshes their keep_alive while traffic is active, unloads them once the
+server has been idle for idle_timeout seconds, and re-warms them in the
+background on the first request after an unload.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+import requests
+
+from .transport import create_session
+from ..monitoring import span
+
+logger = logging.getLogger(__name__)
+
+_managers: Dict[str, "OllamaKeepAlive"] = {}
+_managers_lock = threading.Lock()
+
+
+class OllamaKeepAlive:
+    """Keep a set of Ollama models loaded while they are in use"""
+
+    def __init__(
+        self,
+        base_url: str,
+        generate_models: List[str],
+        embed_models: List[str] = (),
+        keep_alive: str = "30m",
+        refresh_interval: float = 300.0,
+        idle_timeout: float = 3600.0,
+        session: requests.Session = None,
+        timeout: float = None,
+    ):
+        # Imported here because ollama_models imports this module
+        from .ollama_models import DEFAULT_OLLAMA_TIMEOUT
+
+        self.base_url = base_url.rstrip("/")
+        self.generate_models = list(generate_models)
+        self.embed_models = list(embed_models)
+        self.keep_alive = keep_alive
+        self.refresh_interval = refresh_interval
+        self.idle_timeout = idle_timeout
+        self.session = session or create_session()
+        self.timeout = timeout or float(os.getenv("OLLAMA_TIMEOUT", DEFAULT_OLLAMA_TIMEOUT))
+        self.last_activity = time.monotonic()
+        self.loaded = False
+        self._lock = threading.Lock()
+        self._warming = False
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _load(self, model: str, embed: bool, keep_alive) -> bool:
+        from .ollama_models import OllamaInference
+        try:
+            with span("provider.warmup", provider="ollama", model=model) as record:
+                if embed:
+                    payload = {"model": model, "input": ["warm up"], "keep_alive": keep_alive}
+                    response = self.session.post(f"{self.base_url}/api/embed", json=payload, timeout=self.timeout)
+                else:
+                    # A generate request without a prompt only loads the model. Load it
+                    # with the num_ctx requests use, or Ollama reloads it at its default
+                    payload = {"model": model, "keep_alive": keep_alive, "stream": False}
+                    num_ctx = OllamaInference.loaded_context(self.base_url, model)
+                    if num_ctx:
+                        payload["options"] = {"num_ctx": num_ctx}
+                        record["num_ctx"] = num_ctx
+                    response = self.session.post(f"{self.base_url}/api/generate", json=payload, timeout=self.timeout)
+                response.raise_for_status()
+            return True
+        except Exception as e:
+            logger.warning(f"Ollama keep-alive request for {model} failed: {str(e)}")
+            return False
+
+    def warm_up(self) -> Dict[str, bool]:
+        """Load every model and extend its keep_alive; returns success per model"""
+        results = {model: self._load(model, False, self.keep_alive) for model in self.generate_models}
+        results.update({model: self._load(model, True, self.keep_alive) for model in self.embed_models})
+        with self._lock:
+            self.loaded = any(results.values())
+            self._warming = False
+        logger.info(f"Ollama warm-up at {self.base_url}: {results}")
+        return results
+
+    def unload(self) -> None:
+        """Ask Ollama to free the models now"""
+        for model in self.generate_models:
+            self._load(model, False, 0)
+        for model in self.embed_models:
+            self._load(model, True, 0)
+        with self._lock:
+            self.loaded = False
+        logger.info(f"Unloaded idle Ollama models at {self.base_url}")
+
+    def touch(self) -> None:
+        """Record traffic; re-warm in the background if the models were unloaded"""
+        with self._lock:
+            self.last_activity = time.monotonic()
+            rewarm = not self.loaded and not self._warming and self._thread is not None
+            if rewarm:
+                self._warming = True
+        if rewarm:
+            threading.Thread(target=self.warm_up, name="ollama-rewarm", daemon=True).start()
+
+    def _run(self) -> None:
+        self.warm_up()
+        while not self._stop.wait(self.refresh_interval):
+            idle = time.monotonic() - self.last_activity
+            if idle < self.idle_timeout:
+                self.warm_up()
+            elif self.loaded:
+                self.unload()
+
+    def start(self) -> "OllamaKeepAlive":
+        """Warm up now and keep refreshing on a daemon thread"""
+        self._thread = threading.Thread(target=self._run, name="ollama-keepalive", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+
+def start_keep_alive(base_url: str, generate_models: List[str], embed_models: List[str] = (),
+                     **options) -> OllamaKeepAlive:
+    """Start (once per base_url) a keep-alive manager for the given models"""
+    key = base_url.rstrip("/")
+    with _managers_lock:
+        manager = _managers.get(key)
+        if manager is None:
+            manager = _managers[key] = OllamaKeepAlive(base_url, generate_models, embed_models, **options).start()
+        return manager
+
+
+def stop_keep_alive(base_url: str) -> None:
+    with _managers_lock:
+        manager = _managers.pop(base_url.rstrip("/"), None)
+    if manager:
+        manager.stop()
+
+
+def note_activity(base_url: str) -> None:
+    """Tell the keep-alive manager for base_url (if any) that a request happened"""
+    manager = _managers.get(base_url.rstrip("/"))
+    if manager is not None:
+        manager.touch()
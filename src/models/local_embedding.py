@@ -0,0 +1,187 @@
+"""In-process embeddings that need no server.
+
+LocalEmbedding hashes words and word pairs into a fixed-size vector (the
+hashing trick), weights them by sublinear term frequency and, once fitted on
+some posts, by inverse document frequency, and L2-normalizes the result. It
+runs in well under a millisecond for a job post and never queues behind
+Ollama generating a completion. The document frequencies are kept per hash
+bucket, so the persisted state is one array regardless of vocabulary size.
+
+Its vectors are good enough for similarity and duplicate detection between
+posts, but live in a different space from the remote models: only compare
+them with other LocalEmbedding vectors. FallbackEmbedding can answer with
+either, so embed_with_model() returns the name of the model that made the
+vectors along with them.
+"""
+
+import json
+import logging
+import re
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from .base import BaseModel
+from ..monitoring import registry, span, with_context
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LOCAL_DIMENSIONS = 768
+DEFAULT_FALLBACK_TIMEOUT = 2.0  # seconds
+
+_WORD = re.compile(r"[a-z0-9][a-z0-9+#.]*[a-z0-9+#]|[a-z0-9]")
+
+
+def embed_with_model(embedder: BaseModel, texts: List[str]) -> Tuple[str, List[List[float]]]:
+    """(model, vectors): the embeddings and the name of the model that made
+    them. Vectors of different models can't be compared, even when they have
+    the same number of dimensions."""
+    if hasattr(embedder, "embed_with_model"):
+        return embedder.embed_with_model(texts)
+    return getattr(embedder, "model", None) or type(embedder).__name__, embedder.embed(texts)
+
+
+@lru_cache(maxsize=65536)
+def _bucket(feature: str, dimensions: int) -> Tuple[int, float]:
+    """Hash bucket and sign of one feature; the sign keeps collisions from adding up"""
+    hashed = zlib.crc32(feature.encode("utf-8"))
+    return hashed % dimensions, -1.0 if (hashed // dimensions) & 1 else 1.0
+
+
+class LocalEmbedding(BaseModel):
+    """Hashing-vectorizer embeddings computed on the CPU, in-process"""
+
+    def __init__(self, dimensions: int = DEFAULT_LOCAL_DIMENSIONS, path: str = None):
+        """Optionally load document frequencies saved by save() from path"""
+        self.model = "local-hashing"
+        self.dimensions = dimensions
+        self.path = path
+        self._lock = threading.Lock()
+        self.documents = 0
+        self.document_frequency = np.zeros(dimensions, dtype=np.float32)
+        if path and Path(path).exists():
+            self.load(path)
+
+    def test_connection(self) -> bool:
+        return True
+
+    def probe(self) -> Dict[str, Any]:
+        return {"healthy": True, "detail": "in-process", "latency_ms": 0.0}
+
+    @staticmethod
+    def _features(text: str) -> List[str]:
+        words = _WORD.findall(text.lower())
+        return words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+
+    def _counts(self, text: str) -> np.ndarray:
+        """Signed feature counts per bucket"""
+        buckets = [_bucket(feature, self.dimensions) for feature in self._features(text)]
+        if not buckets:
+            return np.zeros(self.dimensions, dtype=np.float32)
+        indexes, signs = zip(*buckets)
+        return np.bincount(indexes, weights=signs, minlength=self.dimensions).astype(np.float32)
+
+    def fit(self, texts: List[str]) -> "LocalEmbedding":
+        """Add texts to the document frequencies used for IDF weighting"""
+        present = np.zeros(self.dimensions, dtype=np.float32)
+        for text in texts:
+            present += self._counts(text) != 0
+        with self._lock:
+            self.document_frequency += present
+            self.documents += len(texts)
+        return self
+
+    def embed_matrix(self, texts: List[str]) -> np.ndarray:
+        """Embeddings as a float32 (len(texts), dimensions) matrix"""
+        with span("provider.embed", provider="local", model=self.model) as record:
+            record["texts"] = len(texts)
+            matrix = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+            for row, text in enumerate(texts):
+                matrix[row] = self._counts(text)
+            # Sublinear term frequency, keeping the hash sign
+            matrix = np.sign(matrix) * np.log1p(np.abs(matrix))
+            with self._lock:
+                if self.documents:
+                    matrix *= np.log((1 + self.documents) / (1 + self.document_frequency)) + 1
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            matrix /= np.maximum(norms, 1e-12)
+        registry.inc("freelance_provider_requests_total", provider="local", kind="embed", outcome="ok")
+        return matrix
+
+    def embed(self, texts: List[str], **kwargs) -> List[List[float]]:
+        """Get embeddings for a list of texts"""
+        return self.embed_matrix(texts).tolist()
+
+    def save(self, path: str = None) -> None:
+        """Persist the document frequencies as JSON"""
+        path = path or self.path
+        with self._lock:
+            state = {"dimensions": self.dimensions, "documents": self.documents,
+                     "document_frequency": self.document_frequency.tolist()}
+        Path(path).write_text(json.dumps(state), encoding="utf-8")
+
+    def load(self, path: str) -> None:
+        state = json.loads(Path(path).read_text(encoding="utf-8"))
+        if state["dimensions"] != self.dimensions:
+            raise ValueError(f"{path} was saved with {state['dimensions']} dimensions, not {self.dimensions}")
+        with self._lock:
+            self.documents = state["documents"]
+            self.document_frequency = np.asarray(state["document_frequency"], dtype=np.float32)
+
+
+class FallbackEmbedding(BaseModel):
+    """Use a remote embedder, switching to a local one when it is slow or down.
+
+    A primary call that takes longer than timeout is abandoned (it finishes
+    in the background) and the fallback answers instead; for cooldown seconds
+    after that, requests for the same model go straight to the fallback.
+    """
+
+    _executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="embedding-fallback")
+    # Shared by instances, which are usually created per request
+    _skip_until: Dict[str, float] = {}
+
+    def __init__(self, primary: BaseModel, fallback: BaseModel = None,
+                 timeout: float = DEFAULT_FALLBACK_TIMEOUT, cooldown: float = 30.0):
+        self.primary = primary
+        self.fallback = fallback or LocalEmbedding()
+        self.model = getattr(primary, "model", None) or type(primary).__name__
+        self.timeout = timeout
+        self.cooldown = cooldown
+
+    def test_connection(self) -> bool:
+        return self.primary.test_connection() or self.fallback.test_connection()
+
+    def probe(self) -> Dict[str, Any]:
+        return self.primary.probe()
+
+    def _use_fallback(self, texts: List[str], reason: str) -> Tuple[str, List[List[float]]]:
+        registry.inc("freelance_embedding_fallbacks_total", reason=reason)
+        self._skip_until[self.model] = time.monotonic() + self.cooldown
+        return embed_with_model(self.fallback, texts)
+
+    def embed_with_model(self, texts: List[str], **kwargs) -> Tuple[str, List[List[float]]]:
+        """Embed with the primary model within timeout, else with the fallback;
+        returns which model answered along with the vectors"""
+        if time.monotonic() < self._skip_until.get(self.model, 0.0):
+            registry.inc("freelance_embedding_fallbacks_total", reason="cooldown")
+            return embed_with_model(self.fallback, texts)
+        future = self._executor.submit(with_context(self.primary.embed), texts, **kwargs)
+        try:
+            return self.model, future.result(timeout=self.timeout)
+        except FutureTimeout:
+            logger.warning(f"Embedding with {self.model} took over {self.timeout}s, using the local fallback")
+            return self._use_fallback(texts, "timeout")
+        except Exception as e:
+            logger.warning(f"Embedding with {self.model} failed ({str(e)}), using the local fallback")
+            return self._use_fallback(texts, "error")
+
+    def embed(self, texts: List[str], **kwargs) -> List[List[float]]:
+        """Embed with the primary model within timeout, else with the fallback"""
+        return self.embed_with_model(texts, **kwargs)[1]
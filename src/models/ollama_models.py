@@ -1,23 +1,95 @@
+import json
 import logging
-from typing import List, Dict, Any
+import math
+import os
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 import requests
-from langchain_ollama import OllamaEmbeddings
 from .base import BaseModel
+from .health import http_probe
+from .singleflight import single_flight
+from .keepalive import note_activity
+from .transport import create_session
+from ..monitoring import registry, record_usage, span, with_context
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_OLLAMA_BASE_URL = "http://127.0.0.1:11434"
+# How long Ollama keeps a model loaded after a request
+DEFAULT_OLLAMA_KEEP_ALIVE = "30m"
+# Seconds to wait for Ollama to answer (OLLAMA_TIMEOUT); a non-streamed
+# generation only answers once it is done, so this covers a whole section
+DEFAULT_OLLAMA_TIMEOUT = 300.0
+# OpenAI-style sampling parameters and the Ollama options they map to
+OLLAMA_OPTION_NAMES = {"max_tokens": "num_predict", "temperature": "temperature", "top_p": "top_p"}
+# num_ctx sizes a request can get. Ollama reloads a model when num_ctx
+# changes, so requests are rounded up to a few doubling buckets; the KV cache
+# (and so the memory per parallel slot) grows linearly with num_ctx.
+CONTEXT_BUCKETS = (2048, 4096, 8192, 16384, 32768)
+# Output tokens reserved when the caller sets no num_predict
+DEFAULT_NUM_PREDICT = 1000
+# Headroom on the prompt estimate, which is not the model's real tokenizer
+PROMPT_MARGIN = 1.1
+# A prompt too long for the largest bucket still gets this many output tokens
+MIN_NUM_PREDICT = 128
+
+
+def context_options(prompt: str, model: str, num_predict: int = None,
+                    buckets: Tuple[int, ...] = CONTEXT_BUCKETS, current: int = None) -> Dict[str, int]:
+    """num_ctx for a prompt plus its output budget, rounded up to a bucket.
+
+    The current num_ctx (the one the model is loaded with) is kept when it
+    holds the request and is at most one bucket larger: switching would
+    reload the model and drop its prompt cache. When even the largest bucket
+    can't hold both, num_predict is cut to the room left after the prompt
+    so Ollama doesn't drop the start of the prompt to make space.
+    """
+    # Imported here because src.analysis imports this module
+    from ..analysis.tokens import estimate_tokens
+    prompt_tokens = math.ceil(estimate_tokens(prompt, model) * PROMPT_MARGIN)
+    output_tokens = DEFAULT_NUM_PREDICT if num_predict is None or num_predict < 0 else num_predict
+    needed = prompt_tokens + output_tokens
+    num_ctx = next((bucket for bucket in buckets if bucket >= needed), buckets[-1])
+    if current and needed <= current <= 2 * num_ctx:
+        num_ctx = current
+    if prompt_tokens >= num_ctx:
+        logger.warning(f"Prompt of ~{prompt_tokens} tokens exceeds num_ctx {num_ctx}; Ollama will truncate it")
+    options = {"num_ctx": num_ctx}
+    if needed > num_ctx:
+        options["num_predict"] = max(num_ctx - prompt_tokens, MIN_NUM_PREDICT)
+    return options
+
+def probe_ollama(session: requests.Session, base_url: str, model: str) -> Dict[str, Any]:
+    """Check the server lists model (/api/tags) and whether it is loaded (/api/ps)"""
+    result = http_probe(session, f"{base_url}/api/tags")
+    if not result["healthy"]:
+        return result
+    installed = {m.get("name") for m in result["response"].json().get("models", [])}
+    if model not in installed:
+        result.update(healthy=False, detail=f"model {model} is not pulled")
+        return result
+    running = http_probe(session, f"{base_url}/api/ps")
+    if running["healthy"]:
+        result["loaded"] = model in {m.get("name") for m in running["response"].json().get("models", [])}
+    result["latency_ms"] += running["latency_ms"]
+    return result
+
 class OllamaEmbedding(BaseModel):
     """Ollama embedding model wrapper"""
 
-    def __init__(self, base_url: str = "http://127.0.0.1:11434"):
+    def __init__(self, base_url: str = None, session: requests.Session = None, keep_alive: str = None,
+                 timeout: float = None):
         """Initialize Ollama embedding model"""
         super().__init__()
-        self.base_url = base_url
-        logger.info(f"Initialized OllamaEmbedding with base URL: {base_url}")
-        self.client = OllamaEmbeddings(
-            base_url=base_url,
-            model="nomic-embed-text:latest"  # Use nomic-embed-text for embeddings
-        )
+        self.base_url = base_url or os.getenv("OLLAMA_BASE_URL", DEFAULT_OLLAMA_BASE_URL)
+        self.model = "nomic-embed-text:latest"  # Use nomic-embed-text for embeddings
+        self.keep_alive = keep_alive or os.getenv("OLLAMA_KEEP_ALIVE", DEFAULT_OLLAMA_KEEP_ALIVE)
+        self.timeout = timeout or float(os.getenv("OLLAMA_TIMEOUT", DEFAULT_OLLAMA_TIMEOUT))
+        # Calls go straight to /api/embed through a pooled (or recorded) session
+        self.session = session or create_session()
+        logger.info(f"Initialized OllamaEmbedding with base URL: {self.base_url}")
 
     def test_connection(self) -> bool:
         """Test connection to Ollama server"""
@@ -29,24 +101,61 @@ class OllamaEmbedding(BaseModel):
             logger.error(f"Ollama embedding connection test failed: {str(e)}")
             return False
 
+    def probe(self) -> Dict[str, Any]:
+        """Cheap health check without running the model"""
+        return probe_ollama(self.session, self.base_url, self.model)
+
     def embed(self, texts: List[str], **kwargs) -> List[List[float]]:
         """Get embeddings for a list of texts"""
         try:
-            embeddings = self.client.embed_documents(texts)
+            with span("provider.embed", provider="ollama", model=self.model) as record:
+                record["texts"] = len(texts)
+                note_activity(self.base_url)
+                response = self.session.post(
+                    f"{self.base_url}/api/embed",
+                    json={"model": self.model, "input": texts, "keep_alive": self.keep_alive},
+                    timeout=self.timeout
+                )
+                response.raise_for_status()
+                embeddings = response.json()["embeddings"]
+            registry.inc("freelance_provider_requests_total", provider="ollama", kind="embed", outcome="ok")
             return embeddings
         except Exception as e:
+            registry.inc("freelance_provider_requests_total", provider="ollama", kind="embed", outcome="error")
             logger.error(f"Ollama embedding failed: {str(e)}")
             raise
 
 class OllamaInference(BaseModel):
-    """Ollama inference model wrapper"""
+    """Ollama inference model wrapper, on the chat API.
+
+    Messages are sent as they are, so the sections of one analysis (same
+    system prompt and job post first, instruction last) share a prompt
+    prefix that Ollama evaluates once and reuses from its cache, as long
+    as the model stays loaded with the same num_ctx.
+    """
 
-    def __init__(self, base_url: str = "http://127.0.0.1:11434"):
-        """Initialize Ollama inference model"""
+    # num_ctx last sent per (server, model), shared by every instance and
+    # by the keep-alive warm-ups, which must load the model with the same one
+    _contexts: Dict[Tuple[str, str], int] = {}
+    _contexts_lock = threading.Lock()
+
+    def __init__(self, base_url: str = None, session: requests.Session = None, keep_alive: str = None,
+                 context_buckets: Tuple[int, ...] = None, timeout: float = None):
+        """Initialize Ollama inference model; empty context_buckets leaves num_ctx to the server"""
         super().__init__()
-        self.base_url = base_url
+        self.base_url = base_url or os.getenv("OLLAMA_BASE_URL", DEFAULT_OLLAMA_BASE_URL)
         self.model = "deepseek-coder-v2:latest"  # Use deepseek-coder-v2 for inference
-        logger.info(f"Initialized OllamaInference with base URL: {base_url} and model {self.model}")
+        self.keep_alive = keep_alive or os.getenv("OLLAMA_KEEP_ALIVE", DEFAULT_OLLAMA_KEEP_ALIVE)
+        self.timeout = timeout or float(os.getenv("OLLAMA_TIMEOUT", DEFAULT_OLLAMA_TIMEOUT))
+        self.session = session or create_session()
+        if context_buckets is None:
+            # e.g. OLLAMA_CONTEXT_BUCKETS=4096,16384; "0" disables sizing
+            spec = os.getenv("OLLAMA_CONTEXT_BUCKETS")
+            context_buckets = CONTEXT_BUCKETS
+            if spec:
+                context_buckets = tuple(sorted(size for size in map(int, spec.split(",")) if size > 0))
+        self.context_buckets = context_buckets
+        logger.info(f"Initialized OllamaInference with base URL: {self.base_url} and model {self.model}")
 
     def test_connection(self) -> bool:
         """Test connection to Ollama server"""
@@ -63,32 +172,132 @@ class OllamaInference(BaseModel):
             logger.error(f"Ollama inference connection test failed: {str(e)}")
             return False
 
+    def probe(self) -> Dict[str, Any]:
+        """Cheap health check without running the model"""
+        return probe_ollama(self.session, self.base_url, self.model)
+
+    @classmethod
+    def loaded_context(cls, base_url: str, model: str) -> Optional[int]:
+        """num_ctx the last request for model on base_url was sized to, if any"""
+        with cls._contexts_lock:
+            return cls._contexts.get((base_url.rstrip("/"), model))
+
+    def _payload(self, messages: List[Dict[str, Any]], stream: bool, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """Build a /api/chat body, moving sampling parameters into options
+        and sizing num_ctx to the prompt (unless the caller set it)"""
+        options = dict(kwargs.pop("options", None) or {})
+        for name, option in OLLAMA_OPTION_NAMES.items():
+            if name in kwargs:
+                options[option] = kwargs.pop(name)
+        messages = [{"role": msg["role"], "content": msg["content"]} for msg in messages]
+        if self.context_buckets and "num_ctx" not in options:
+            key = (self.base_url.rstrip("/"), self.model)
+            prompt = "\n".join(msg["content"] for msg in messages)
+            with self._contexts_lock:
+                options.update(context_options(prompt, self.model, options.get("num_predict"), self.context_buckets,
+                                               current=self._contexts.get(key)))
+                self._contexts[key] = options["num_ctx"]
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "stream": stream,
+            "keep_alive": self.keep_alive,
+            **kwargs
+        }
+        if options:
+            payload["options"] = options
+        return payload
+
+    @single_flight
     def complete(self, messages: List[Dict[str, Any]], **kwargs) -> Dict[str, Any]:
         """Complete a conversation using Ollama"""
         try:
-            # Format messages for Ollama API
-            prompt = "\n".join([f"{msg['role']}: {msg['content']}" for msg in messages])
-            
-            # Make request to Ollama API
-            response = requests.post(
-                f"{self.base_url}/api/generate",
-                json={
-                    "model": self.model,
-                    "prompt": prompt,
-                    "stream": False,
-                    **kwargs
-                }
-            )
-            response.raise_for_status()
-            
-            # Parse response
-            result = response.json()
+            payload = self._payload(messages, False, kwargs)
+
+            with span("provider.complete", provider="ollama", model=self.model) as record:
+                record["num_ctx"] = payload.get("options", {}).get("num_ctx")
+                # Make request to Ollama API
+                note_activity(self.base_url)
+                response = self.session.post(f"{self.base_url}/api/chat", json=payload, timeout=self.timeout)
+                response.raise_for_status()
+                
+                # Parse response
+                result = response.json()
+            registry.inc("freelance_provider_requests_total", provider="ollama", kind="complete", outcome="ok")
+            record_usage(record, "ollama", self.model, result.get("prompt_eval_count"), result.get("eval_count"))
+            if result.get("total_duration"):
+                # Ollama reports its own work in nanoseconds; the rest is queueing and transport
+                queued = record["duration"] - result["total_duration"] / 1e9 + result.get("load_duration", 0) / 1e9
+                registry.observe("freelance_provider_queue_seconds", max(0.0, queued), provider="ollama", model=self.model)
             return {
                 "message": {
                     "role": "assistant",
-                    "content": result["response"]
+                    "content": result["message"]["content"]
+                },
+                "usage": {
+                    "prompt_tokens": result.get("prompt_eval_count"),
+                    "completion_tokens": result.get("eval_count")
                 }
             }
         except Exception as e:
+            registry.inc("freelance_provider_requests_total", provider="ollama", kind="complete", outcome="error")
             logger.error(f"Ollama completion failed: {str(e)}")
-            raise 
\ No newline at end of file
+            raise 
+
+    def complete_many(self, messages: List[Dict[str, Any]], n: int, **kwargs) -> List[Dict[str, Any]]:
+        """n completions sampled with different seeds.
+
+        Ollama has no `n`, so the requests run concurrently (in parallel up to
+        the server's OLLAMA_NUM_PARALLEL); distinct seeds make them sample
+        differently and keep single_flight from merging them. Without a seed
+        option they are derived from the messages, so the same call sends the
+        same requests (and replays from a cassette).
+        """
+        options = dict(kwargs.pop("options", None) or {})
+        seed = options.pop("seed", None)
+        if seed is None:
+            seed = zlib.crc32(json.dumps(messages, sort_keys=True).encode("utf-8")) & 0x7fffffff
+        with ThreadPoolExecutor(max_workers=n) as executor:
+            complete = with_context(self.complete)
+            futures = [executor.submit(complete, messages=messages, options={**options, "seed": seed + i}, **kwargs)
+                       for i in range(n)]
+            return [future.result() for future in futures]
+
+    def stream(self, messages: List[Dict[str, Any]], usage: Dict[str, Any] = None, **kwargs) -> Iterator[str]:
+        """Yield the completion as Ollama generates it.
+
+        Closing the generator closes the connection, which makes Ollama stop
+        generating. If usage is given it receives the token counts (counted
+        from the received chunks when the stream was cut short).
+        """
+        usage = usage if usage is not None else {}
+        with span("provider.stream", provider="ollama", model=self.model) as record:
+            payload = self._payload(messages, True, kwargs)
+            record["num_ctx"] = payload.get("options", {}).get("num_ctx")
+            note_activity(self.base_url)
+            response = self.session.post(f"{self.base_url}/api/chat", json=payload, stream=True,
+                                         timeout=self.timeout)
+            final, chunks, outcome = {}, 0, "ok"
+            try:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get("done"):
+                        final = chunk
+                        break
+                    chunks += 1  # Ollama streams one token per chunk
+                    yield chunk.get("message", {}).get("content", "")
+            except GeneratorExit:
+                outcome = "cancelled"
+            except Exception as e:
+                outcome = "error"
+                logger.error(f"Ollama streaming failed: {str(e)}")
+                raise
+            finally:
+                response.close()
+                usage.update(prompt_tokens=final.get("prompt_eval_count"),
+                             completion_tokens=final.get("eval_count", chunks))
+                registry.inc("freelance_provider_requests_total", provider="ollama", kind="stream", outcome=outcome)
+                record_usage(record, "ollama", self.model, usage["prompt_tokens"], usage["completion_tokens"])
@@ -0,0 +1,132 @@
+"""Single-flight deduplication of identical in-flight model calls."""
+
+import copy
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import threading
+from typing import Any, Callable, Dict, Hashable, List
+
+from ..monitoring import record_cache_hit
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    """An in-flight call shared by every concurrent identical caller"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Let concurrent calls with the same key share one upstream request.
+
+    Only calls that overlap in time are merged: once the leading call
+    finishes its entry is dropped, so this is not a cache.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run fn for key, or wait for the identical call already running"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+            else:
+                call.waiters += 1
+
+        if not leader:
+            logger.debug(f"Joining in-flight call {key}")
+            record_cache_hit("singleflight")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            # Followers get their own copy so nobody mutates a shared result
+            return copy.deepcopy(call.result)
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            if call.waiters:
+                logger.info(f"Shared one upstream call with {call.waiters} duplicate request(s)")
+            call.done.set()
+
+    def in_flight(self) -> int:
+        """Number of distinct calls currently running"""
+        with self._lock:
+            return len(self._calls)
+
+
+_default_group = SingleFlight()
+
+
+def normalize_messages(messages: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    """Reduce chat messages to the fields that affect the completion"""
+    return [
+        {"role": str(msg.get("role", "")), "content": str(msg.get("content", "")).strip()}
+        for msg in messages
+    ]
+
+
+def request_key(provider: str, messages: List[Dict[str, Any]], **params) -> str:
+    """Build a stable key from the provider and the normalized request"""
+    payload = json.dumps(
+        {"provider": provider, "messages": normalize_messages(messages), "params": params},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def single_flight(method: Callable = None, *, group: SingleFlight = None):
+    """Decorate a provider's complete(messages, ...) with single-flight sharing.
+
+    The provider is identified by its class, base_url, model and a hash of
+    its credential (api_key or token), so accounts never share a response,
+    and the request by its normalized messages plus every keyword argument
+    (defaults included). Set ``single_flight = False`` on an instance to
+    bypass deduplication.
+    """
+    if method is None:
+        return functools.partial(single_flight, group=group)
+
+    signature = inspect.signature(method)
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if not getattr(self, "single_flight", True):
+            return method(self, *args, **kwargs)
+        bound = signature.bind(self, *args, **kwargs)
+        bound.apply_defaults()
+        params = dict(bound.arguments)
+        params.pop("self", None)
+        messages = params.pop("messages")
+        params.update(params.pop("kwargs", {}))
+        credential = getattr(self, "api_key", None) or getattr(self, "token", None)
+        provider = "|".join([
+            type(self).__name__,
+            str(getattr(self, "base_url", "")),
+            str(getattr(self, "model", "")),
+            hashlib.sha256(str(credential).encode("utf-8")).hexdigest() if credential else "",
+        ])
+        key = request_key(provider, messages, **params)
+        return (group or _default_group).do(key, method, self, *args, **kwargs)
+
+    return wrapper
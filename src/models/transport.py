@@ -0,0 +1,323 @@
+"""HTTP transport for the model providers, with record and replay.
+
+Providers send their requests through a ``requests.Session`` returned by
+create_session(). Live sessions pool connections; recording sessions also
+write every request/response pair (status, headers, body or streamed
+chunks, and timing) to a gzipped JSON Lines cassette; replay sessions
+serve responses from a cassette without touching the network, either
+instantly or at the recorded speed (optionally accelerated).
+
+The mode is chosen by, in order of precedence:
+- an active use_cassette() block
+- the FREELANCE_TRANSPORT environment variable: 'live',
+  'record:<path>' or 'replay:<path>[@<speed>]' (speed 0 = no delays)
+"""
+
+import base64
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Any, Dict, Iterator, List, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+logger = logging.getLogger(__name__)
+
+# Headers worth keeping in a cassette; everything else is dropped
+_KEPT_HEADERS = ("content-type", "retry-after", "x-ratelimit-remaining", "x-ratelimit-reset")
+
+
+# Request options set from process-wide state (the context size the model is
+# loaded with, see ollama_models) rather than by the caller
+_UNKEYED_OPTIONS = ("num_ctx",)
+
+
+class CassetteMiss(requests.exceptions.ConnectionError):
+    """A replayed request has no recorded response"""
+
+
+def request_fingerprint(method: str, url: str, body: Optional[bytes]) -> str:
+    """Identify a request by method, path and canonical body.
+
+    The host is ignored so a cassette recorded against one base_url
+    replays against another; credentials live in headers, which are
+    not part of the key, and so do the _UNKEYED_OPTIONS of a JSON body.
+    """
+    parts = urlsplit(url)
+    body = body or b""
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    try:
+        data = json.loads(body)
+    except ValueError:
+        pass
+    else:
+        if isinstance(data, dict) and isinstance(data.get("options"), dict):
+            data = {**data, "options": {key: value for key, value in data["options"].items()
+                                        if key not in _UNKEYED_OPTIONS}}
+        body = json.dumps(data, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    digest = hashlib.sha256()
+    for part in (method.upper(), parts.path.rstrip("/"), parts.query):
+        digest.update(part.encode("utf-8") + b"\0")
+    digest.update(body)
+    return digest.hexdigest()[:32]
+
+
+def _encode(data: bytes) -> Dict[str, str]:
+    try:
+        return {"text": data.decode("utf-8")}
+    except UnicodeDecodeError:
+        return {"b64": base64.b64encode(data).decode("ascii")}
+
+
+def _decode(payload: Dict[str, str]) -> bytes:
+    if "text" in payload:
+        return payload["text"].encode("utf-8")
+    return base64.b64decode(payload["b64"])
+
+
+class Cassette:
+    """Recorded interactions stored as gzipped JSON Lines.
+
+    Identical requests replay their recorded responses in order; once
+    exhausted the last one is repeated.
+    """
+
+    _open: Dict[str, "Cassette"] = {}
+    _open_lock = threading.Lock()
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: Dict[str, List[Dict[str, Any]]] = {}
+        self._cursor: Dict[str, int] = {}
+        if os.path.exists(path):
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries.setdefault(entry["key"], []).append(entry)
+
+    @classmethod
+    def open(cls, path: str) -> "Cassette":
+        """Return the shared cassette for path so providers append to one file"""
+        path = os.path.abspath(path)
+        with cls._open_lock:
+            if path not in cls._open:
+                cls._open[path] = cls(path)
+            return cls._open[path]
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._entries.values())
+
+    def append(self, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries.setdefault(entry["key"], []).append(entry)
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            # Appending gzip members keeps the file valid after every write
+            with gzip.open(self.path, "at", encoding="utf-8") as f:
+                f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+
+    def next(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                return None
+            index = self._cursor.get(key, 0)
+            self._cursor[key] = index + 1
+            return entries[min(index, len(entries) - 1)]
+
+    def rewind(self) -> None:
+        with self._lock:
+            self._cursor.clear()
+
+
+class _RecordingRaw:
+    """Wrap a streamed response body, recording chunks as they are read"""
+
+    def __init__(self, raw, on_done):
+        self._raw = raw
+        self._on_done = on_done
+        self._start = time.perf_counter()
+        self.chunks: List[List[Any]] = []
+        self.complete = False
+        self._finished = False
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def _record(self, data: bytes) -> None:
+        if data:
+            self.chunks.append([round(time.perf_counter() - self._start, 4), _encode(data)])
+
+    def stream(self, amt=None, decode_content=None):
+        try:
+            for data in self._raw.stream(amt, decode_content=decode_content):
+                self._record(data)
+                yield data
+            self.complete = True
+        finally:
+            self._finish()
+
+    def read(self, amt=None, *args, **kwargs):
+        data = self._raw.read(amt, *args, **kwargs)
+        self._record(data)
+        if not data or amt is None:
+            self.complete = True
+            self._finish()
+        return data
+
+    def close(self):
+        self._finish()
+        self._raw.close()
+
+    def release_conn(self):
+        self._finish()
+        self._raw.release_conn()
+
+    def _finish(self):
+        if not self._finished:
+            self._finished = True
+            self._on_done(self.chunks, self.complete)
+
+
+class RecordingSession(requests.Session):
+    """Live session that also writes every interaction to a cassette"""
+
+    def __init__(self, cassette: Cassette):
+        super().__init__()
+        self.cassette = cassette
+
+    def send(self, request, **kwargs):
+        start = time.perf_counter()
+        response = super().send(request, **kwargs)
+        entry = {
+            "key": request_fingerprint(request.method, request.url, request.body),
+            "method": request.method,
+            "url": request.url,
+            "status": response.status_code,
+            "reason": response.reason,
+            "headers": {k: v for k, v in response.headers.items() if k.lower() in _KEPT_HEADERS},
+            "elapsed": round(time.perf_counter() - start, 4),
+        }
+        if kwargs.get("stream"):
+            def on_done(chunks, complete):
+                entry["chunks"] = chunks
+                if not complete:
+                    # The caller stopped reading early, e.g. a cancelled stream
+                    entry["truncated"] = True
+                self.cassette.append(entry)
+            response.raw = _RecordingRaw(response.raw, on_done)
+        else:
+            entry["body"] = _encode(response.content)
+            self.cassette.append(entry)
+        return response
+
+
+class _ReplayRaw:
+    """Serve recorded chunks, pacing them like the original stream"""
+
+    def __init__(self, chunks: List[List[Any]], speed: float):
+        self._chunks = chunks
+        self._speed = speed
+        self._closed = False
+
+    def stream(self, amt=None, decode_content=None) -> Iterator[bytes]:
+        previous = 0.0
+        for offset, payload in self._chunks:
+            if self._closed:
+                return
+            if self._speed:
+                time.sleep(max(0.0, offset - previous) / self._speed)
+            previous = offset
+            yield _decode(payload)
+        self._closed = True
+
+    def read(self, amt=None, *args, **kwargs) -> bytes:
+        return b"".join(self.stream())
+
+    def close(self):
+        self._closed = True
+
+    def release_conn(self):
+        pass
+
+    def isclosed(self) -> bool:
+        return self._closed
+
+
+class ReplaySession(requests.Session):
+    """Session answering every request from a cassette, offline"""
+
+    def __init__(self, cassette: Cassette, speed: float = 0.0):
+        super().__init__()
+        self.cassette = cassette
+        self.speed = speed
+
+    def send(self, request, **kwargs):
+        key = request_fingerprint(request.method, request.url, request.body)
+        entry = self.cassette.next(key)
+        if entry is None:
+            raise CassetteMiss(f"No recorded response for {request.method} {request.url} in {self.cassette.path}",
+                               request=request)
+        if self.speed:
+            time.sleep(entry.get("elapsed", 0.0) / self.speed)
+
+        response = requests.Response()
+        response.status_code = entry["status"]
+        response.reason = entry.get("reason", "")
+        response.headers = CaseInsensitiveDict(entry.get("headers", {}))
+        response.url = request.url
+        response.request = request
+        response.elapsed = timedelta(seconds=entry.get("elapsed", 0.0))
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        if "chunks" in entry:
+            chunks = entry["chunks"]
+        else:
+            chunks = [[0.0, entry["body"]]]
+        response.raw = _ReplayRaw(chunks, self.speed)
+        if not kwargs.get("stream"):
+            response.content  # read eagerly, like requests does
+        return response
+
+
+_override: Optional[str] = None
+
+
+def create_session() -> requests.Session:
+    """Create the session a provider should send its requests through"""
+    spec = _override or os.getenv("FREELANCE_TRANSPORT", "live")
+    mode, _, target = spec.partition(":")
+    if mode == "live":
+        return requests.Session()
+    path, _, speed = target.partition("@")
+    if not path:
+        raise ValueError(f"Transport '{mode}' needs a cassette path, e.g. {mode}:cassettes/run.jsonl.gz")
+    cassette = Cassette.open(path)
+    if mode == "record":
+        logger.info(f"Recording provider traffic to {cassette.path}")
+        return RecordingSession(cassette)
+    if mode == "replay":
+        logger.info(f"Replaying provider traffic from {cassette.path} ({len(cassette)} interactions)")
+        return ReplaySession(cassette, float(speed or 0.0))
+    raise ValueError(f"Unknown transport mode: {mode}")
+
+
+@contextmanager
+def use_cassette(path: str, mode: str = "replay", speed: float = 0.0):
+    """Make providers created in this block record to or replay from path"""
+    global _override
+    previous = _override
+    _override = f"{mode}:{path}@{speed:g}" if mode == "replay" else f"{mode}:{path}"
+    try:
+        yield Cassette.open(path)
+    finally:
+        _override = previous
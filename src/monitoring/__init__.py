@@ -0,0 +1,27 @@
+"""Instrumentation for the analysis pipeline and model providers."""
+
+from .metrics import (
+    MetricsRegistry,
+    collect_spans,
+    instrument,
+    record_cache_hit,
+    record_retry,
+    record_usage,
+    registry,
+    render_prometheus,
+    span,
+    with_context,
+)
+
+__all__ = [
+    'MetricsRegistry',
+    'collect_spans',
+    'instrument',
+    'record_cache_hit',
+    'record_retry',
+    'record_usage',
+    'registry',
+    'render_prometheus',
+    'span',
+    'with_context',
+]
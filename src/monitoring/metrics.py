@@ -0,0 +1,215 @@
+"""In-process metrics: spans, counters and histograms with Prometheus output."""
+
+import functools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Histogram buckets in seconds, sized for LLM calls that take from
+# milliseconds (cached/embedding) to minutes (long generations)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+METRIC_HELP = {
+    "freelance_span_duration_seconds": ("histogram", "Duration of instrumented spans"),
+    "freelance_span_errors_total": ("counter", "Spans that ended with an exception"),
+    "freelance_tokens_total": ("counter", "Prompt and completion tokens reported by providers"),
+    "freelance_provider_requests_total": ("counter", "Provider calls by outcome"),
+    "freelance_provider_queue_seconds": ("histogram", "Provider wall time not spent on model work (queueing, network, load)"),
+    "freelance_retries_total": ("counter", "Retried attempts"),
+    "freelance_cache_hits_total": ("counter", "Results served without a new upstream call"),
+    "freelance_health_probes_total": ("counter", "Provider health probes by outcome"),
+    "freelance_preprocess_tokens_saved_total": ("counter", "Estimated prompt tokens removed by job post preprocessing"),
+    "freelance_embedding_fallbacks_total": ("counter", "Embeddings served by the local fallback instead of the remote model"),
+    "freelance_section_repairs_total": ("counter", "Sections that failed validation, by problem"),
+    "freelance_bulk_posts_total": ("counter", "Posts handled by the bulk analyzer by outcome"),
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(key: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class _Histogram:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.total += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+class MetricsRegistry:
+    """Thread-safe counters and histograms keyed by name and labels"""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, _Histogram]] = {}
+
+    def inc(self, name: str, value: float = 1.0, **labels) -> None:
+        """Add value to a counter"""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        """Record one observation in a histogram"""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(self.buckets)
+            histogram.observe(value)
+
+    def counter_value(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._counters.get(name, {}).get(_label_key(labels), 0.0)
+
+    def histogram_count(self, name: str, **labels) -> int:
+        with self._lock:
+            histogram = self._histograms.get(name, {}).get(_label_key(labels))
+            return histogram.total if histogram else 0
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def _header(self, name: str, default_type: str) -> List[str]:
+        metric_type, help_text = METRIC_HELP.get(name, (default_type, name))
+        return [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"]
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for name in sorted(self._counters):
+                lines.extend(self._header(name, "counter"))
+                for key, value in sorted(self._counters[name].items()):
+                    lines.append(f"{name}{_format_labels(key)} {value:g}")
+            for name in sorted(self._histograms):
+                lines.extend(self._header(name, "histogram"))
+                for key, histogram in sorted(self._histograms[name].items()):
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        lines.append(f"{name}_bucket{_format_labels(key, (('le', f'{bound:g}'),))} {count}")
+                    lines.append(f"{name}_bucket{_format_labels(key, (('le', '+Inf'),))} {histogram.total}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {histogram.sum:.6f}")
+                    lines.append(f"{name}_count{_format_labels(key)} {histogram.total}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+_current_trace: ContextVar[Optional[List[Dict[str, Any]]]] = ContextVar("freelance_trace", default=None)
+
+
+@contextmanager
+def span(name: str, **labels) -> Iterator[Dict[str, Any]]:
+    """Time a block and record it as a span.
+
+    Yields a mutable record; callers may attach attributes such as token
+    counts, which end up in the trace collected by collect_spans().
+    """
+    record: Dict[str, Any] = {"span": name, **labels}
+    start = time.perf_counter()
+    try:
+        yield record
+    except BaseException:
+        record["error"] = True
+        registry.inc("freelance_span_errors_total", span=name, **labels)
+        raise
+    finally:
+        record["duration"] = time.perf_counter() - start
+        registry.observe("freelance_span_duration_seconds", record["duration"], span=name, **labels)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.append(record)
+
+
+@contextmanager
+def collect_spans() -> Iterator[List[Dict[str, Any]]]:
+    """Collect every span finished in this context into a list"""
+    trace: List[Dict[str, Any]] = []
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+def with_context(function: Callable) -> Callable:
+    """function, run in a copy of the caller's context on every call.
+
+    Executor threads don't inherit context variables, so spans finished in
+    them would miss the caller's collect_spans; wrap what is submitted.
+    """
+    context = copy_context()
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        return context.copy().run(function, *args, **kwargs)
+    return wrapper
+
+
+def instrument(name: str) -> Callable:
+    """Decorate a provider method so every call is recorded as a span"""
+    def decorator(method: Callable) -> Callable:
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with span(name, provider=type(self).__name__):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_usage(record: Dict[str, Any], provider: str, model: str,
+                 prompt_tokens: Optional[int], completion_tokens: Optional[int]) -> None:
+    """Count provider-reported tokens and attach them to a span record"""
+    if prompt_tokens is not None:
+        record["prompt_tokens"] = prompt_tokens
+        registry.inc("freelance_tokens_total", prompt_tokens, provider=provider, model=model, type="prompt")
+    if completion_tokens is not None:
+        record["completion_tokens"] = completion_tokens
+        registry.inc("freelance_tokens_total", completion_tokens, provider=provider, model=model, type="completion")
+
+
+def record_cache_hit(cache: str) -> None:
+    registry.inc("freelance_cache_hits_total", cache=cache)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.append({"span": "cache.hit", "cache": cache, "duration": 0.0})
+
+
+def record_retry(**labels) -> None:
+    registry.inc("freelance_retries_total", **labels)
+
+
+def render_prometheus() -> str:
+    return registry.render()
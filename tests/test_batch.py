@@ -0,0 +1,129 @@
+"""Test batched completions for the LangChain and Azure providers and the analyzer's batch call."""
+
+import asyncio
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
+from benchmarks.fakes import JOB_POST, FakeEmbedding, FakeInference, ScriptedInference, section_for
+from src.analysis import JobAnalyzer
+from src.models.azure_models import AzureGPT4
+from src.models.external_models import GeminiInference, GroqModel
+
+pytestmark = pytest.mark.timeout(30)
+
+
+def conversation(text):
+    return [{"role": "system", "content": "Be brief."}, {"role": "user", "content": text}]
+
+
+def echo(messages):
+    if messages[-1].content == "fail":
+        raise RuntimeError("503 Service Unavailable")
+    return AIMessage(content=f"echo {messages[-1].content}",
+                     usage_metadata={"input_tokens": 5, "output_tokens": 2, "total_tokens": 7})
+
+
+def test_options_map_onto_langchain_fields():
+    """Test each provider's option names land on its LangChain fields without touching the shared model."""
+    groq = GroqModel(api_key="key")
+    configured = groq._configured(temperature=0.7, top_p=0.9, max_tokens=300)
+    assert (configured.temperature, configured.max_tokens, configured.model_kwargs["top_p"]) == (0.7, 300, 0.9)
+    assert groq.model.max_tokens == 50
+    gemini = GeminiInference(api_key="key", max_concurrency=2)
+    assert gemini._configured(max_tokens=300).max_output_tokens == 300
+    assert gemini.max_concurrency == 2
+
+
+def test_langchain_batch_keeps_order_and_isolates_failures():
+    """Test a batch returns one response per conversation, in order, with failures as error text."""
+    model = GroqModel(api_key="key")
+    model.model = RunnableLambda(echo)
+    texts = ["first", "fail", "third"]
+    responses = model.batch([conversation(text) for text in texts])
+    assert [response["message"]["content"] for response in responses][::2] == ["echo first", "echo third"]
+    assert responses[1]["message"]["content"].startswith("Error: 503") and responses[1]["error"].startswith("503")
+    assert responses[0]["usage"] == {"prompt_tokens": 5, "completion_tokens": 2}
+    responses = asyncio.run(model.abatch([conversation(text) for text in texts]))
+    assert [response["message"]["content"] for response in responses][::2] == ["echo first", "echo third"]
+    assert len(model.complete_many(conversation("again"), 3)) == 3
+
+
+def test_langchain_batch_gives_each_conversation_its_own_cap():
+    """Test a list of caps configures each conversation's call with its own max_tokens."""
+    model = GroqModel(api_key="key")
+    seen = []
+
+    def configured(**options):
+        return RunnableLambda(lambda messages: seen.append((messages[-1].content, options["max_tokens"]))
+                              or AIMessage(content="ok"))
+
+    model._configured = configured
+    model.batch([conversation(text) for text in ["short", "long"]], max_tokens=[100, 900])
+    assert sorted(seen) == [("long", 900), ("short", 100)]
+
+
+def test_message_content_is_read_as_text():
+    """Test plain and block-list message content both come back as text."""
+    assert GroqModel._response(AIMessage(content="plain"))["message"]["content"] == "plain"
+    blocks = AIMessage(content=[{"type": "text", "text": "one "}, "two"])
+    assert GeminiInference._response(blocks)["message"]["content"] == "one two"
+
+
+def test_azure_batch_keeps_order_and_isolates_failures():
+    """Test Azure conversations run concurrently and come back in order."""
+    model = AzureGPT4(token="token")
+
+    def complete(messages, **kwargs):
+        if messages[-1].content == "fail":
+            raise RuntimeError("429 Too Many Requests")
+        message = SimpleNamespace(content=f"echo {messages[-1].content}")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)],
+                               usage=SimpleNamespace(prompt_tokens=5, completion_tokens=2))
+
+    model.client = mock.Mock(complete=mock.Mock(side_effect=complete))
+    responses = model.batch([conversation(text) for text in ["first", "fail", "third"]], max_tokens=100)
+    assert [response["message"]["content"] for response in responses][::2] == ["echo first", "echo third"]
+    assert responses[1]["error"].startswith("429")
+    assert model.client.complete.call_args.kwargs["model"] == "gpt-4o"
+
+
+class BatchingInference(ScriptedInference):
+    """ScriptedInference with a batch call that can fail chosen sections"""
+
+    def __init__(self, failing=()):
+        super().__init__()
+        self.failing = set(failing)
+        self.batches = []
+
+    def batch(self, conversations, max_tokens=1000, **kwargs):
+        sections = [section_for(messages) for messages in conversations]
+        self.batches.append(dict(zip(sections, max_tokens)))
+        return [{"message": {"role": "assistant", "content": "Error: 503"}, "error": "503"} if section in self.failing
+                else FakeInference.complete(self, messages, max_tokens=cap, **kwargs)
+                for section, messages, cap in zip(sections, conversations, max_tokens)]
+
+
+def test_analyzer_sends_all_sections_in_one_batch():
+    """Test a provider with batch gets every section in one call, each with its own token cap."""
+    inference = BatchingInference()
+    analyzer = JobAnalyzer(embedding_model=FakeEmbedding(0.0), inference_model=inference)
+    results = analyzer.analyze_job_post(JOB_POST, include_timings=True)
+    assert len(inference.batches) == 1 and len(inference.batches[0]) == 6
+    caps = {key: analyzer.token_budget.max_tokens(analyzer.model_name, key) for key in inference.batches[0]}
+    assert inference.batches[0] == caps and len(set(caps.values())) > 1
+    assert [section for section, _ in inference.requests] == []
+    assert analyzer.failed_sections(results) == []
+    assert "batch_ms" in results["timings"]
+
+
+def test_failed_batch_item_is_retried_on_its_own(monkeypatch):
+    """Test a section that failed in the batch falls back to a single call."""
+    monkeypatch.setattr("src.analysis.job_analyzer.time.sleep", lambda seconds: None)
+    inference = BatchingInference(failing={"solutionAnalysis"})
+    results = JobAnalyzer(embedding_model=FakeEmbedding(0.0), inference_model=inference).analyze_job_post(JOB_POST)
+    assert [section for section, _ in inference.requests] == ["solutionAnalysis"]
+    assert not results["solutionAnalysis"].startswith("Analysis failed")
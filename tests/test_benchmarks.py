@@ -0,0 +1,48 @@
+"""Test the offline analysis benchmark and its fake models."""
+
+import random
+import pytest
+from benchmarks.bench_analyzer import SCENARIOS, compare, run_scenario
+from benchmarks.fakes import FakeInference, LatencyModel
+from src.analysis.job_analyzer import ANALYSIS_PROMPTS
+
+
+@pytest.fixture(scope="module")
+def overhead_results():
+    """Run the zero-latency scenario once for all tests."""
+    return run_scenario("Build a Django chatbot with React.", iterations=2, **SCENARIOS["overhead"])
+
+
+def test_report_structure(overhead_results):
+    """Test every metric and section is reported."""
+    for metric in ["wall_ms_p50", "model_ms_p50", "overhead_ms_p50", "peak_memory_kb"]:
+        assert overhead_results[metric] >= 0
+    assert set(overhead_results["sections_ms"]) == set(ANALYSIS_PROMPTS)
+
+
+def test_regression_detection(overhead_results):
+    """Test metrics well above the baseline are flagged."""
+    results = {"overhead": overhead_results}
+    assert compare(results, {"overhead": dict(overhead_results)}, tolerance=0.5) == []
+    tight = {"overhead": {"overhead_ms_p50": -10.0, "peak_memory_kb": -100.0}}
+    assert len(compare(results, tight, tolerance=0.0)) == 2
+
+
+def test_fake_inference_is_deterministic():
+    """Test the same seed yields the same output."""
+    messages = [{"role": "user", "content": ANALYSIS_PROMPTS["proposal"]}]
+    first = FakeInference(seed=1).complete(messages)
+    second = FakeInference(seed=1).complete(messages)
+    assert first == second
+    assert len(first["message"]["content"].split()) == FakeInference.DEFAULT_OUTPUT_WORDS["proposal"]
+
+
+def test_latency_models():
+    """Test latency specs parse and sample non-negative values."""
+    rng = random.Random(0)
+    assert LatencyModel(0.5).sample(rng) == 0.5
+    assert 0.1 <= LatencyModel("uniform:0.1,0.2").sample(rng) <= 0.2
+    assert LatencyModel("normal:0,1").sample(rng) >= 0
+    assert LatencyModel("lognormal:-3,0.5").sample(rng) > 0
+    with pytest.raises(ValueError):
+        LatencyModel("pareto:1")
@@ -0,0 +1,130 @@
+"""Test the bulk analyzer: streaming input, provider slots and checkpoint/resume."""
+
+import json
+
+import pytest
+
+from src.analysis.bulk import BulkAnalyzer, ResultsFile, iter_posts, main
+from src.models import LocalEmbedding
+from src.monitoring import registry
+from benchmarks.fakes import FakeInference, ScriptedInference
+
+pytestmark = pytest.mark.timeout(30)
+
+
+class FailingInference(FakeInference):
+    """FakeInference whose every call fails, like a provider stuck on rate limits"""
+
+    def complete(self, messages, **kwargs):
+        raise RuntimeError("429 Too Many Requests")
+
+
+@pytest.fixture(autouse=True)
+def no_retry_delay(monkeypatch):
+    monkeypatch.setattr("src.analysis.job_analyzer.time.sleep", lambda seconds: None)
+
+
+def write_feed(path, count):
+    lines = [json.dumps({"id": f"post-{i}", "description": f"Build a Django REST API, project {i}."})
+             for i in range(count)]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def read_results(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_reads_jsonl_and_directories(tmp_path):
+    """Test posts come from JSONL lines and .md files, skipping unusable lines."""
+    (tmp_path / "feed.jsonl").write_text(
+        '{"ciphertext": "~01", "description": "Scrape listings"}\n'
+        'not json\n'
+        '{"title": "no text"}\n'
+        '{"job_post": "Design a logo"}\n', encoding="utf-8")
+    (tmp_path / "extra.md").write_text("Fix a React bug", encoding="utf-8")
+    posts = list(iter_posts(tmp_path))
+    assert [post["job_post"] for post in posts] == ["Fix a React bug", "Scrape listings", "Design a logo"]
+    assert posts[0]["id"] == "extra.md" and posts[1]["id"] == "~01"
+    assert posts[2]["id"] == list(iter_posts(tmp_path / "feed.jsonl"))[1]["id"]
+
+
+def test_spreads_posts_and_resumes(tmp_path):
+    """Test every post is written once, both providers are used and a rerun skips finished posts."""
+    feed, output = tmp_path / "feed.jsonl", tmp_path / "results.jsonl"
+    write_feed(feed, 6)
+    providers = {"a": FakeInference(0.01), "b": FakeInference(0.01)}
+    bulk = BulkAnalyzer(providers, LocalEmbedding(), per_provider=2)
+    with ResultsFile(output) as results:
+        counts = bulk.run(iter_posts(feed), results)
+    assert counts == {"succeeded": 6, "failed": 0, "skipped": 0, "stopped": 0}
+    records = read_results(output)
+    assert sorted(record["id"] for record in records) == [f"post-{i}" for i in range(6)]
+    assert {record["provider"] for record in records} == {"a", "b"}
+    assert "prompt" not in records[0]["result"] and "fields" in records[0]["result"]
+
+    with ResultsFile(output) as results:
+        counts = bulk.run(iter_posts(feed), results)
+    assert counts["skipped"] == 6 and counts["succeeded"] == 0
+    assert len(read_results(output)) == 6
+
+
+def test_partial_line_and_failures_are_redone(tmp_path):
+    """Test a torn last line is dropped and failed posts are retried on resume."""
+    feed, output = tmp_path / "feed.jsonl", tmp_path / "results.jsonl"
+    write_feed(feed, 3)
+    output.write_text(
+        json.dumps({"id": "post-0", "result": {}}) + "\n"
+        + json.dumps({"id": "post-1", "failed": ["proposal"]}) + "\n"
+        + '{"id": "post-2", "res', encoding="utf-8")
+    with ResultsFile(output) as results:
+        assert results.done == {"post-0"}
+        counts = BulkAnalyzer({"a": FakeInference(0.0)}, LocalEmbedding()).run(iter_posts(feed), results)
+    assert counts["succeeded"] == 2 and counts["skipped"] == 1
+    assert sorted(record["id"] for record in read_results(output)[2:]) == ["post-1", "post-2"]
+
+
+def test_stops_after_consecutive_failures(tmp_path):
+    """Test a stalled provider stops the run instead of failing the whole feed."""
+    feed, output = tmp_path / "feed.jsonl", tmp_path / "results.jsonl"
+    write_feed(feed, 20)
+    before = registry.counter_value("freelance_bulk_posts_total", outcome="failed", provider="ollama")
+    with ResultsFile(output) as results:
+        bulk = BulkAnalyzer({"ollama": FailingInference(0.0)}, LocalEmbedding(), per_provider=1, max_failures=3)
+        counts = bulk.run(iter_posts(feed), results)
+    assert counts["stopped"] == 1 and counts["failed"] == 3
+    records = read_results(output)
+    assert len(records) == 3 and all(len(record["failed"]) == 6 for record in records)
+    assert registry.counter_value("freelance_bulk_posts_total", outcome="failed", provider="ollama") == before + 3
+
+
+def test_format_problems_are_recorded_but_not_failed(tmp_path):
+    """Test a badly formatted section is listed under problems without failing the post; errors fail it."""
+    feed, output = tmp_path / "feed.jsonl", tmp_path / "results.jsonl"
+    write_feed(feed, 2)
+    # Prose where a numbered list is asked for, before and after the repair; then errors on every
+    # attempt and on the repair
+    inference = ScriptedInference({"questionsAnalysis": ["Ask about the budget."] * 2 + [RuntimeError("503")] * 4})
+    with ResultsFile(output) as results:
+        counts = BulkAnalyzer({"a": inference}, LocalEmbedding(), per_provider=1).run(iter_posts(feed), results)
+    assert counts["failed"] == 1 and counts["succeeded"] == 1
+    first, second = read_results(output)
+    assert "failed" not in first and first["problems"] == {"questionsAnalysis": ["not_numbered"]}
+    assert second["failed"] == ["questionsAnalysis"] and "problems" not in second
+
+
+def test_cli_exit_codes(tmp_path, monkeypatch):
+    """Test the command line writes results and returns 0 when every post succeeded."""
+    feed, output = tmp_path / "feed.jsonl", tmp_path / "results.jsonl"
+    write_feed(feed, 2)
+    monkeypatch.setattr("src.analysis.bulk.build_provider", lambda name: FakeInference(0.0))
+    assert main([str(feed), "-o", str(output), "--embedding", "local"]) == 0
+    assert len(read_results(output)) == 2
+
+
+def test_cli_fits_the_local_embedding(tmp_path, monkeypatch):
+    """Test --fit-local saves document frequencies from the input that LocalEmbedding loads."""
+    feed, output, vocabulary = tmp_path / "feed.jsonl", tmp_path / "results.jsonl", tmp_path / "local.json"
+    write_feed(feed, 3)
+    monkeypatch.setattr("src.analysis.bulk.build_provider", lambda name: FakeInference(0.0))
+    assert main([str(feed), "-o", str(output), "--embedding", "local", "--fit-local", str(vocabulary)]) == 0
+    assert LocalEmbedding(path=str(vocabulary)).documents == 3
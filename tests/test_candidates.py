@@ -0,0 +1,79 @@
+"""Test sampling several proposal candidates in one call and ranking them."""
+
+import numpy as np
+import pytest
+
+from benchmarks.provider_server import ProviderBehavior, ProviderServer
+from src.analysis import JobAnalyzer
+from src.analysis.ranking import rank_candidates, word_limit_compliance
+from src.models import LocalEmbedding, OllamaInference, OpenRouterModel
+from benchmarks.fakes import JOB_POST, FakeInference
+
+pytestmark = pytest.mark.timeout(30)
+
+MESSAGES = [{"role": "user", "content": "Write a proposal"}]
+
+
+def test_compliance_penalizes_long_and_very_short_drafts():
+    """Test drafts within the limit score 1 and others fall off linearly."""
+    scores = word_limit_compliance(np.array([150, 100, 75, 180, 30], dtype=np.float32), 150)
+    assert scores.tolist() == pytest.approx([1.0, 1.0, 1.0, 0.8, 0.7])
+
+
+def test_rank_prefers_relevant_compliant_drafts():
+    """Test similarity and word-limit compliance decide the order."""
+    relevant = "Django REST API shipment tracking PostgreSQL " * 10
+    unrelated = "logo design bakery brand colors " * 10
+    overlong = "Django REST API shipment tracking PostgreSQL " * 60
+    embedder = LocalEmbedding()
+    candidates = [unrelated, overlong, relevant]
+    vectors = embedder.embed(candidates)
+    targets = embedder.embed([JOB_POST, "Django PostgreSQL REST API"])
+    ranked = rank_candidates(candidates, vectors, targets, limit=150)
+    assert [item["text"] for item in ranked] == [relevant, overlong, unrelated]
+    assert ranked[0]["words"] == 60
+    assert len(ranked[0]["similarity"]) == 2
+
+
+def test_ollama_samples_with_distinct_seeds():
+    """Test Ollama candidates are separate concurrent requests with different seeds."""
+    with ProviderServer(behavior=ProviderBehavior(output_tokens=30)) as server:
+        responses = OllamaInference(base_url=server.url).complete_many(MESSAGES, 3, options={"seed": 7})
+    assert server.requests["/api/chat"] == 3
+    assert len({response["message"]["content"] for response in responses}) == 3
+
+
+def test_openrouter_requests_n_choices_in_one_call():
+    """Test OpenRouter candidates come from a single request with n."""
+    with ProviderServer(behavior=ProviderBehavior(output_tokens=30)) as server:
+        model = OpenRouterModel(api_key="key", base_url=f"{server.url}/api/v1")
+        responses = model.complete_many(MESSAGES, 3)
+    assert server.requests["/api/v1/chat/completions"] == 1
+    assert len({response["choices"][0]["message"]["content"] for response in responses}) == 3
+    assert all(response["usage"]["completion_tokens"] == 30 for response in responses)
+
+
+def test_analyzer_returns_best_and_alternatives():
+    """Test the analyzer picks one proposal and lists the rest as alternatives."""
+    inference = FakeInference(0.0, output_words={"default": 40, "proposal": 120})
+    analyzer = JobAnalyzer(embedding_model=LocalEmbedding(), inference_model=inference, proposal_candidates=3)
+    results = analyzer.analyze_job_post(JOB_POST, include_timings=True)
+    proposals = [call for call in inference.calls if call[0] == "proposal"]
+    assert len(proposals) == 3
+    assert len(results["proposalAlternatives"]) == 2
+    assert results["proposal"] not in results["proposalAlternatives"]
+    assert all(len(text.split()) <= 150 for text in [results["proposal"], *results["proposalAlternatives"]])
+    section = results["timings"]["sections"]["proposal"]
+    assert section["candidates"] == 3 and "rank_ms" in section
+
+    single = JobAnalyzer(embedding_model=LocalEmbedding(), inference_model=FakeInference(0.0))
+    assert "proposalAlternatives" not in single.analyze_job_post(JOB_POST)
+
+
+def test_post_embedding_from_another_model_is_ignored():
+    """Test ranking only compares the post with drafts embedded by the same model."""
+    analyzer = JobAnalyzer(embedding_model=LocalEmbedding(), inference_model=FakeInference(0.0))
+    drafts = ["logo design bakery brand colors " * 10, "Django REST API shipment tracking PostgreSQL " * 10]
+    post = LocalEmbedding().embed([JOB_POST])[0]
+    assert analyzer._rank_proposals(drafts, post, "", "local-hashing")[0] == drafts[1].strip()
+    assert analyzer._rank_proposals(drafts, post, "", "nomic-embed-text:latest")[0] == drafts[0].strip()
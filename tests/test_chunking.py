@@ -0,0 +1,77 @@
+"""Test chunked, batched embedding of long posts."""
+
+import threading
+
+import numpy as np
+
+from src.analysis.chunking import ChunkedEmbedding, chunk_text, cosine_similarity
+from benchmarks.fakes import FakeEmbedding
+
+LONG_TEXT = " ".join(f"word{i}" for i in range(400))
+
+
+class CountingEmbedding(FakeEmbedding):
+    """FakeEmbedding that records batch sizes and peak concurrency"""
+
+    def __init__(self, latency=0.0):
+        super().__init__(latency, dimensions=8)
+        self.batches = []
+        self.active = 0
+        self.peak = 0
+        self._count_lock = threading.Lock()
+
+    def embed(self, texts, **kwargs):
+        with self._count_lock:
+            self.batches.append(len(texts))
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            return super().embed(texts, **kwargs)
+        finally:
+            with self._count_lock:
+                self.active -= 1
+
+
+def test_chunks_overlap_and_cover_text():
+    """Test chunks stay within the token size, overlap, and cover every word."""
+    chunks = chunk_text(LONG_TEXT, chunk_tokens=100, overlap=20)
+    assert len(chunks) > 1
+    assert all(chunk["tokens"] <= 100 for chunk in chunks)
+    assert chunks[0]["start"] == 0 and chunks[-1]["end"] == len(LONG_TEXT)
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert chunk["start"] < previous["end"]
+        assert chunk["start"] > previous["start"]
+    assert chunk_text("  ") == []
+    assert chunk_text("short post") == [{"text": "short post", "start": 0, "end": 10, "tokens": 2}]
+
+
+def test_short_text_is_one_request():
+    """Test a short post is still embedded in a single call with one vector."""
+    inner = CountingEmbedding()
+    embedder = ChunkedEmbedding(inner)
+    vectors = embedder.embed(["Build a REST API"])
+    assert inner.batches == [1]
+    assert np.allclose(vectors[0], inner.embed(["Build a REST API"])[0], atol=1e-6)
+
+
+def test_batches_and_pools_long_posts():
+    """Test chunks of several posts are batched concurrently and pooled per post."""
+    inner = CountingEmbedding(latency=0.02)
+    embedder = ChunkedEmbedding(inner, chunk_tokens=50, overlap=10, batch_size=4, max_workers=4)
+    documents = embedder.embed_documents([LONG_TEXT, "short post"])
+    total_chunks = sum(len(document["spans"]) for document in documents)
+    assert sum(inner.batches) == total_chunks
+    assert max(inner.batches) <= 4
+    assert inner.peak > 1
+
+    long_doc, short_doc = documents
+    assert long_doc["chunks"].dtype == np.float32
+    assert long_doc["chunks"].shape == (len(long_doc["spans"]), 8)
+    assert long_doc["vector"].dtype == np.float32
+    weights = np.asarray([chunk["tokens"] for chunk in chunk_text(LONG_TEXT, 50, 10)], dtype=np.float32)
+    assert np.allclose(long_doc["vector"], weights @ long_doc["chunks"] / weights.sum(), atol=1e-5)
+    assert short_doc["chunks"].shape == (1, 8)
+
+    matrix = embedder.embed_matrix([LONG_TEXT, LONG_TEXT])
+    assert matrix.shape == (2, 8)
+    assert np.allclose(cosine_similarity(matrix[0], matrix[1]), 1.0, atol=1e-5)
@@ -0,0 +1,101 @@
+"""Test token estimates and per-section compression of long job posts."""
+
+from src.analysis import JobAnalyzer
+from src.analysis.compress import GAP_MARKER, SectionCompressor
+from src.analysis.tokens import estimate_tokens, model_family
+from benchmarks.fakes import FakeEmbedding, ScriptedInference
+
+FILLER = [
+    "Our office has a friendly team and a dog named Biscuit.",
+    "We celebrate birthdays with cake every month.",
+    "The company was founded in a garage many years ago.",
+    "Lunch is provided on Fridays for everyone on site.",
+]
+
+LONG_POST = "\n".join([
+    "Senior Django Developer for a logistics platform",
+    "Budget: $40-$60 per hour",
+    "Skills: Django, PostgreSQL, Celery",
+    "We need a Django developer to build a REST API for shipment tracking.",
+    "The API must integrate PostgreSQL and Celery background tasks.",
+    "Please ask any questions about the shipment data model before you start.",
+    "What questions do you have about the tracking requirements?",
+    *FILLER * 15,
+])
+
+
+def test_estimate_depends_on_family():
+    """Test small-vocabulary families are charged more tokens for the same text."""
+    text = "Implementing asynchronous notifications for 12345 subscribers."
+    assert model_family("deepseek-coder-v2:latest") == "deepseek"
+    assert model_family("unknown-model") == "default"
+    assert estimate_tokens(text, "llama3.1:8b") < estimate_tokens(text, "mistral:7b")
+    assert estimate_tokens("") == 0
+
+
+def test_short_post_is_unchanged():
+    """Test posts within budget are passed through as-is."""
+    post = "Title\n\nBudget: $100\nBuild a small site."
+    selected = SectionCompressor(post).select("Write a proposal", 1000)
+    assert selected["text"] == post
+    assert selected["kept"] == selected["total"]
+
+
+def test_respects_budget_and_pins_fields():
+    """Test the excerpt fits the budget and keeps the title and extracted fields."""
+    compressor = SectionCompressor(LONG_POST, "llama3.1:8b")
+    assert compressor.total_tokens > 200
+    selected = compressor.select("Recommend technical solutions and tools", 80)
+    assert selected["tokens"] <= 80
+    assert estimate_tokens(selected["text"], "llama3.1:8b") <= 80
+    lines = selected["text"].split("\n")
+    assert lines[:3] == LONG_POST.split("\n")[:3]
+    assert "[...]" in selected["text"]
+
+
+def test_selection_is_section_specific():
+    """Test each section's prompt pulls in the sentences relevant to it."""
+    compressor = SectionCompressor(LONG_POST)
+    technical = compressor.select("Recommend technical solutions: PostgreSQL, Celery, API integration", 90)
+    questions = compressor.select("What are the key questions to ask?", 90)
+    assert "PostgreSQL and Celery background tasks" in technical["text"]
+    assert "What questions do you have" in questions["text"]
+    assert "Biscuit" not in technical["text"]
+
+
+def test_split_shares_one_excerpt():
+    """Test split keeps one excerpt for every query and adds only new sentences per query."""
+    compressor = SectionCompressor(LONG_POST)
+    queries = {"technical": "Recommend technical solutions: PostgreSQL, Celery, API integration",
+               "questions": "What are the key questions to ask?"}
+    excerpts = compressor.split(queries, 120)
+    shared = excerpts["shared"]
+    assert shared["text"].split("\n")[:3] == LONG_POST.split("\n")[:3]
+    for own in excerpts["sections"].values():
+        assert shared["tokens"] + own["tokens"] <= 120
+        assert not set(own["text"].split(GAP_MARKER)) & set(shared["text"].split("\n"))
+    assert "Biscuit" not in shared["text"] + excerpts["sections"]["technical"]["text"]
+
+    excerpts = compressor.split(queries, 10000)
+    assert excerpts["shared"]["text"] == LONG_POST
+    assert not any(own["text"] for own in excerpts["sections"].values())
+
+
+def test_analyzer_bounds_section_input():
+    """Test the analyzer sends every section the same compressed post above the threshold."""
+    inference = ScriptedInference()
+    analyzer = JobAnalyzer(embedding_model=FakeEmbedding(0.0), inference_model=inference, max_input_tokens=120)
+    results = analyzer.analyze_job_post(LONG_POST, include_timings=True)
+    assert len(inference.prompts) == len(analyzer.analysis_prompts)
+    posts = {content.split("Job Post:\n", 1)[1].split("\n\n", 1)[0] for content in inference.prompts}
+    assert len(posts) == 1
+    assert estimate_tokens(posts.pop(), inference.model) <= 120
+    for content, prompt in zip(inference.prompts, analyzer.analysis_prompts.values()):
+        assert f"\n\n{prompt}" in content
+    sections = results["timings"]["sections"]
+    assert all(section["compressed"] and section["input_tokens"] <= 120 for section in sections.values())
+
+    analyzer = JobAnalyzer(embedding_model=FakeEmbedding(0.0), inference_model=ScriptedInference(),
+                           max_input_tokens=None)
+    sections = analyzer.analyze_job_post(LONG_POST, include_timings=True)["timings"]["sections"]
+    assert not any(section["compressed"] for section in sections.values())
@@ -0,0 +1,69 @@
+"""Test per-request num_ctx sizing for Ollama."""
+
+import pytest
+
+from benchmarks.provider_server import ProviderBehavior, ProviderServer
+from src.models import OllamaInference
+from src.models.ollama_models import CONTEXT_BUCKETS, context_options
+
+pytestmark = pytest.mark.timeout(30)
+
+MODEL = "deepseek-coder-v2:latest"
+
+
+def messages(words):
+    return [{"role": "user", "content": "Describe the project scope " * (words // 4)}]
+
+
+def test_rounds_up_to_a_bucket():
+    """Test the prompt plus output budget picks the smallest bucket that holds both."""
+    assert context_options("short prompt", MODEL, 400) == {"num_ctx": 2048}
+    assert context_options("word " * 1000, MODEL, 400) == {"num_ctx": 2048}
+    assert context_options("word " * 1000, MODEL, 1000) == {"num_ctx": 4096}
+    assert context_options("word " * 1000, MODEL) == {"num_ctx": 4096}
+
+
+def test_overflow_cuts_the_output_budget():
+    """Test a prompt near the largest bucket keeps the prompt and shrinks num_predict."""
+    options = context_options("word " * 2000, MODEL, 1000, buckets=(2048, 3072))
+    assert options == {"num_ctx": 3072, "num_predict": 3072 - 2200}
+    assert context_options("word " * 5000, MODEL, 1000, buckets=(2048,))["num_predict"] == 128
+
+
+def test_loaded_context_is_kept_within_one_bucket():
+    """Test a smaller request keeps the loaded num_ctx unless it is more than one bucket larger."""
+    assert context_options("short prompt", MODEL, 400, current=4096) == {"num_ctx": 4096}
+    assert context_options("short prompt", MODEL, 400, current=8192) == {"num_ctx": 2048}
+    assert context_options("word " * 1000, MODEL, 1000, current=2048) == {"num_ctx": 4096}
+
+
+def test_payload_options(monkeypatch):
+    """Test max_tokens feeds the sizing, an explicit num_ctx wins and sizing can be turned off."""
+    monkeypatch.setattr(OllamaInference, "_contexts", {})
+    model = OllamaInference()
+    assert model.context_buckets == CONTEXT_BUCKETS
+    payload = model._payload(messages(40), False, {"max_tokens": 300})
+    assert payload["options"] == {"num_predict": 300, "num_ctx": 2048}
+    assert model._payload(messages(40), False, {"options": {"num_ctx": 1024}})["options"] == {"num_ctx": 1024}
+    assert "options" not in OllamaInference(context_buckets=())._payload(messages(40), False, {})
+
+
+def test_buckets_from_environment(monkeypatch):
+    """Test OLLAMA_CONTEXT_BUCKETS overrides the buckets and 0 disables sizing."""
+    monkeypatch.setenv("OLLAMA_CONTEXT_BUCKETS", "16384,4096")
+    assert OllamaInference().context_buckets == (4096, 16384)
+    monkeypatch.setenv("OLLAMA_CONTEXT_BUCKETS", "0")
+    assert OllamaInference().context_buckets == ()
+
+
+def test_similar_prompts_share_a_loaded_context():
+    """Test posts of different lengths in one bucket don't reload the model, and a long one does."""
+    with ProviderServer(behavior=ProviderBehavior(output_tokens=20)) as server:
+        model = OllamaInference(base_url=server.url)
+        for words in (40, 400, 800):
+            model.complete(messages(words), max_tokens=400)
+        assert server.reloads[MODEL] == 0 and server.num_ctx[MODEL] == 2048
+        model.complete(messages(1500), max_tokens=400)
+        assert server.reloads[MODEL] == 1 and server.num_ctx[MODEL] == 4096
+        model.complete(messages(40), max_tokens=400)
+        assert server.reloads[MODEL] == 1 and server.num_ctx[MODEL] == 4096
@@ -0,0 +1,80 @@
+"""Test cached provider health probes."""
+
+import time
+import pytest
+from benchmarks.provider_server import ProviderServer
+from src.models import OllamaEmbedding, OllamaInference, OpenRouterModel
+from src.models.health import HealthMonitor
+
+pytestmark = pytest.mark.timeout(30)
+
+
+def test_ollama_probe_uses_metadata_endpoints():
+    """Test the Ollama probe reads /api/tags and /api/ps without generating."""
+    with ProviderServer() as server:
+        server.loaded["deepseek-coder-v2:latest"] = True
+        result = OllamaInference(base_url=server.url).probe()
+        assert result["healthy"] and result["loaded"]
+        assert OllamaEmbedding(base_url=server.url).probe()["loaded"] is False
+        assert server.requests["/api/generate"] == 0
+        assert server.requests["/api/embed"] == 0
+
+
+def test_ollama_probe_flags_missing_model():
+    """Test a reachable server without the model is unhealthy."""
+    with ProviderServer(models=["llama3:latest"]) as server:
+        result = OllamaInference(base_url=server.url).probe()
+    assert not result["healthy"]
+    assert "not pulled" in result["detail"]
+
+
+def test_openrouter_probe_checks_key():
+    """Test the OpenRouter probe hits /auth/key instead of a completion."""
+    with ProviderServer() as server:
+        model = OpenRouterModel(api_key="key", base_url=f"{server.url}/api/v1")
+        assert model.probe()["healthy"]
+        assert server.requests["/api/v1/auth/key"] == 1
+        assert server.requests["/api/v1/chat/completions"] == 0
+
+
+def test_monitor_caches_and_routes_around_failures():
+    """Test results are cached and failover skips providers known to be down."""
+    monitor = HealthMonitor(refresh_interval=60)
+    calls = []
+    monitor.register("primary", lambda: calls.append(1) or {"healthy": False, "detail": "down"})
+    monitor.register("fallback", lambda: {"healthy": True})
+    monitor.register("broken", lambda: 1 / 0)
+
+    assert monitor.first_healthy(["primary", "fallback"]) == "primary"  # unknown counts as healthy
+    monitor.check_all()
+    assert monitor.first_healthy(["primary", "fallback"]) == "fallback"
+    assert not monitor.is_healthy("broken")
+
+    status = monitor.status()
+    assert len(calls) == 1
+    assert status["primary"]["detail"] == "down"
+    assert "probe failed" in status["broken"]["detail"]
+
+
+def test_stale_results_are_not_trusted():
+    """Test a failure older than max_age no longer blocks routing."""
+    monitor = HealthMonitor(refresh_interval=0.01, max_age=0.05)
+    monitor.register("primary", lambda: {"healthy": False})
+    monitor.check("primary")
+    assert not monitor.is_healthy("primary")
+    time.sleep(0.1)
+    assert monitor.is_healthy("primary")
+    assert monitor.status()["primary"]["stale"]
+
+
+def test_background_refresh():
+    """Test the monitor keeps probing on its own thread."""
+    monitor = HealthMonitor(refresh_interval=0.02)
+    calls = []
+    monitor.register("primary", lambda: calls.append(1) or {"healthy": True})
+    monitor.start()
+    try:
+        time.sleep(0.15)
+    finally:
+        monitor.stop()
+    assert len(calls) >= 3
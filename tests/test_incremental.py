@@ -0,0 +1,85 @@
+"""Test incremental re-analysis of edited job posts."""
+
+from src.analysis import AnalysisCache, JobAnalyzer
+from src.analysis.incremental import normalize_post, post_fingerprint
+from benchmarks.fakes import FakeEmbedding, FakeInference
+
+JOB_POST = " ".join(f"word{i}" for i in range(100)) + " Budget to be discussed."
+
+
+def make_analyzer(cache):
+    embedding, inference = FakeEmbedding(0.0), FakeInference(0.0)
+    return JobAnalyzer(embedding_model=embedding, inference_model=inference, analysis_cache=cache), inference
+
+
+def test_fingerprint_ignores_case_and_whitespace():
+    """Test cosmetic edits keep the same fingerprint."""
+    assert post_fingerprint("Build  a\nChatbot ") == post_fingerprint("build a chatbot")
+    assert normalize_post("Ｆｕｌｌ width") == "full width"
+
+
+def test_unchanged_post_reuses_everything():
+    """Test re-running the same post makes no model calls."""
+    cache = AnalysisCache()
+    analyzer, inference = make_analyzer(cache)
+    first = analyzer.analyze_job_post(JOB_POST)
+    calls = len(inference.calls)
+    second = analyzer.analyze_job_post(JOB_POST.upper())
+    assert len(inference.calls) == calls
+    assert second['recomputed'] == []
+    assert second['proposal'] == first['proposal']
+    assert len(first['recomputed']) == 6
+
+
+def test_rerun_returns_the_cached_proposal_alternatives():
+    """Test a repeated run with several candidates returns the alternatives it cached."""
+    cache = AnalysisCache()
+    inference = FakeInference(0.0)
+    single = JobAnalyzer(embedding_model=FakeEmbedding(0.0), inference_model=inference, analysis_cache=cache)
+    single.analyze_job_post(JOB_POST)
+    analyzer = JobAnalyzer(embedding_model=FakeEmbedding(0.0), inference_model=inference, analysis_cache=cache,
+                           proposal_candidates=3)
+    first = analyzer.analyze_job_post(JOB_POST)
+    assert first['recomputed'] == ['proposal'] and len(first['proposalAlternatives']) == 2
+    calls = len(inference.calls)
+    second = analyzer.analyze_job_post(JOB_POST)
+    assert len(inference.calls) == calls
+    assert (second['proposal'], second['proposalAlternatives']) == (first['proposal'], first['proposalAlternatives'])
+    assert 'proposalAlternatives' not in single.analyze_job_post(JOB_POST)
+
+
+def test_small_edit_recomputes_only_sensitive_sections():
+    """Test a small edit reruns the proposal and reuses the rest."""
+    cache = AnalysisCache()
+    analyzer, inference = make_analyzer(cache)
+    analyzer.analyze_job_post(JOB_POST)
+    edited = analyzer.analyze_job_post(JOB_POST.replace("to be discussed", "$500"))
+    assert edited['recomputed'] == ['proposal']
+    assert 0 < edited['reused']['jobAnalysis'] <= 0.05
+
+
+def test_edits_cannot_drift_past_threshold():
+    """Test reused sections compare against the text they were computed from."""
+    cache = AnalysisCache(default_threshold=0.03)
+    analyzer, _ = make_analyzer(cache)
+    analyzer.analyze_job_post(JOB_POST)
+    post = JOB_POST
+    recomputed = []
+    for i in range(4):
+        post = post.replace(f"word{i} ", f"edit{i} ")
+        recomputed.append(analyzer.analyze_job_post(post)['recomputed'])
+    # Each edit changes about 1% of the words; the fourth crosses 3% cumulatively
+    assert recomputed[:3] == [['proposal']] * 3
+    assert 'jobAnalysis' in recomputed[3]
+
+
+def test_large_edit_and_failures_are_not_reused():
+    """Test unrelated posts rerun everything and failed sections are not cached."""
+    cache = AnalysisCache()
+    analyzer, _ = make_analyzer(cache)
+    analyzer.analyze_job_post(JOB_POST)
+    other = analyzer.analyze_job_post("A completely different post about logo design.")
+    assert len(other['recomputed']) == 6
+
+    cache.store("Failing post", analyzer.model_name, analyzer.analysis_prompts, {})
+    assert cache.lookup("Failing post", analyzer.model_name, analyzer.analysis_prompts)["sections"] == {}
@@ -26,7 +26,7 @@ def results(job_post):
         embedding_model=OllamaEmbedding(),
         inference_model=OpenRouterModel(api_key=OPENROUTER_API_KEY)
     )
-    results = analyzer.analyze_job_post(job_post)
+    results = analyzer.analyze_job_post(job_post, include_prompt=True)
     print("Analysis complete.")
     return results
 
@@ -0,0 +1,81 @@
+"""Test Ollama warm-up and keep-alive management."""
+
+import time
+import pytest
+from benchmarks.fakes import FakeEmbedding
+from benchmarks.provider_server import ProviderBehavior, ProviderServer
+from src.analysis import JobAnalyzer
+from src.models import OllamaInference
+from src.models.keepalive import OllamaKeepAlive, note_activity, start_keep_alive, stop_keep_alive
+
+pytestmark = pytest.mark.timeout(30)
+
+MESSAGES = [{"role": "user", "content": "Hello"}]
+MODEL = "deepseek-coder-v2:latest"
+LONG_POST = "Build a Django REST API for shipment tracking with PostgreSQL and Celery workers. " * 150
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not met in time"
+        time.sleep(0.01)
+
+
+def test_warm_up_loads_models():
+    """Test warm-up loads generate and embedding models with a keep_alive."""
+    with ProviderServer() as server:
+        manager = OllamaKeepAlive(server.url, ["chat-model"], ["embed-model"], keep_alive="10m")
+        assert manager.warm_up() == {"chat-model": True, "embed-model": True}
+        assert server.loaded == {"chat-model": True, "embed-model": True}
+        assert server.requests["/api/generate"] == 1
+        assert server.requests["/api/embed"] == 1
+
+
+def test_warm_up_reports_unreachable_server():
+    """Test warm-up failures are reported instead of raised."""
+    manager = OllamaKeepAlive("http://127.0.0.1:9", ["chat-model"])
+    assert manager.warm_up() == {"chat-model": False}
+    assert not manager.loaded
+
+
+def test_idle_unload_and_rewarm_on_activity():
+    """Test idle models are unloaded and re-warmed on the next request."""
+    with ProviderServer() as server:
+        manager = start_keep_alive(server.url, ["chat-model"], refresh_interval=0.05, idle_timeout=0.1)
+        try:
+            wait_for(lambda: server.loaded.get("chat-model") is False)
+            assert not manager.loaded
+
+            note_activity(server.url)
+            wait_for(lambda: manager.loaded)
+            assert server.loaded["chat-model"] is True
+        finally:
+            stop_keep_alive(server.url)
+
+
+def test_inference_requests_send_keep_alive():
+    """Test provider requests extend the keep_alive and count as activity."""
+    with ProviderServer() as server:
+        manager = start_keep_alive(server.url, [], refresh_interval=60)
+        try:
+            before = manager.last_activity
+            OllamaInference(base_url=server.url, keep_alive="45m").complete(messages=MESSAGES)
+            assert manager.last_activity > before
+            assert server.loaded["deepseek-coder-v2:latest"] is True
+        finally:
+            stop_keep_alive(server.url)
+
+
+def test_warm_up_keeps_the_sized_context():
+    """Test a keep-alive refresh between analyses loads the model with their num_ctx, so nothing reloads."""
+    with ProviderServer(behavior=ProviderBehavior(output_tokens=20)) as server:
+        analyzer = JobAnalyzer(embedding_model=FakeEmbedding(0.0), inference_model=OllamaInference(base_url=server.url),
+                               max_input_tokens=None, validate=False)
+        analyzer.analyze_job_post(LONG_POST)
+        num_ctx = server.num_ctx[MODEL]
+        assert num_ctx > 2048
+        OllamaKeepAlive(server.url, [MODEL]).warm_up()
+        analyzer.analyze_job_post(LONG_POST + " Deadline in two weeks.")
+        assert server.num_ctx[MODEL] == num_ctx
+        assert server.reloads[MODEL] == 0
@@ -0,0 +1,75 @@
+"""Test the in-process embedding backend and the remote-to-local fallback."""
+
+import time
+
+import numpy as np
+
+from src.models import FallbackEmbedding, LocalEmbedding, embed_with_model
+from src.monitoring import registry
+from benchmarks.fakes import FakeEmbedding
+
+DJANGO = "We need a Django developer to build a REST API with PostgreSQL."
+DJANGO_EDIT = "Looking for a Django developer to build a REST API on PostgreSQL."
+LOGO = "Design a colorful logo and brand guide for a bakery."
+
+
+def test_similar_posts_are_closer():
+    """Test vectors are normalized float32 and rank a reworded post above an unrelated one."""
+    embedder = LocalEmbedding()
+    matrix = embedder.embed_matrix([DJANGO, DJANGO_EDIT, LOGO])
+    assert matrix.dtype == np.float32 and matrix.shape == (3, 768)
+    assert np.allclose(np.linalg.norm(matrix, axis=1), 1.0, atol=1e-5)
+    similarity = matrix @ matrix.T
+    assert similarity[0, 1] > 0.5 > similarity[0, 2]
+    assert embedder.embed([DJANGO]) == [matrix[0].tolist()]
+
+
+def test_is_fast():
+    """Test a job-post-sized text embeds in about a millisecond or less."""
+    embedder = LocalEmbedding()
+    text = " ".join([DJANGO, DJANGO_EDIT, LOGO] * 10)
+    embedder.embed([text])
+    start = time.perf_counter()
+    for _ in range(50):
+        embedder.embed([text])
+    assert (time.perf_counter() - start) / 50 < 0.005
+
+
+def test_fit_and_persist(tmp_path):
+    """Test fitted document frequencies survive a save and load."""
+    path = tmp_path / "local-embedding.json"
+    embedder = LocalEmbedding(dimensions=256).fit([DJANGO, DJANGO_EDIT, LOGO])
+    embedder.save(str(path))
+    restored = LocalEmbedding(dimensions=256, path=str(path))
+    assert restored.documents == 3
+    assert np.array_equal(restored.embed_matrix([DJANGO]), embedder.embed_matrix([DJANGO]))
+    assert not np.array_equal(LocalEmbedding(dimensions=256).embed_matrix([DJANGO]), embedder.embed_matrix([DJANGO]))
+
+
+def test_falls_back_when_primary_is_slow():
+    """Test a slow primary is abandoned for the local embedder, then skipped during the cooldown."""
+    slow = FakeEmbedding(latency=0.5, dimensions=768)
+    slow.model = "slow-embedding"
+    local = LocalEmbedding()
+    embedder = FallbackEmbedding(slow, local, timeout=0.05, cooldown=60)
+    timeouts = registry.counter_value("freelance_embedding_fallbacks_total", reason="timeout")
+    cooldowns = registry.counter_value("freelance_embedding_fallbacks_total", reason="cooldown")
+
+    start = time.perf_counter()
+    assert embedder.embed([DJANGO]) == local.embed([DJANGO])
+    assert time.perf_counter() - start < 0.4
+    assert FallbackEmbedding(slow, local, timeout=0.05).embed_with_model([LOGO]) == ("local-hashing",
+                                                                                    local.embed([LOGO]))
+    assert len(slow.calls) <= 1
+
+    assert registry.counter_value("freelance_embedding_fallbacks_total", reason="timeout") == timeouts + 1
+    assert registry.counter_value("freelance_embedding_fallbacks_total", reason="cooldown") == cooldowns + 1
+
+
+def test_uses_primary_when_fast():
+    """Test a responsive primary answers directly."""
+    fast = FakeEmbedding(dimensions=4)
+    fast.model = "fast-embedding"
+    assert FallbackEmbedding(fast, LocalEmbedding(), timeout=1.0).embed([DJANGO]) == fast.embed([DJANGO])
+    assert embed_with_model(FallbackEmbedding(fast, LocalEmbedding(), timeout=1.0), [DJANGO])[0] == "fast-embedding"
+    assert embed_with_model(fast, [DJANGO]) == ("fast-embedding", fast.embed([DJANGO]))
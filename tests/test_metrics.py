@@ -0,0 +1,95 @@
+"""Test span, token and retry instrumentation."""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from benchmarks.fakes import FakeEmbedding, FakeInference, ScriptedInference
+from benchmarks.provider_server import ProviderBehavior, ProviderServer
+from src.analysis import JobAnalyzer
+from src.models import OllamaInference, OpenRouterModel
+from src.monitoring import MetricsRegistry, collect_spans, registry, span, with_context
+
+pytestmark = pytest.mark.timeout(30)
+
+
+@pytest.fixture(autouse=True)
+def clean_registry():
+    registry.reset()
+    yield
+    registry.reset()
+
+
+def test_prometheus_rendering():
+    """Test counters and histograms render in the exposition format."""
+    metrics = MetricsRegistry(buckets=(0.1, 1.0))
+    metrics.inc("freelance_tokens_total", 5, provider="ollama", type="prompt")
+    metrics.observe("freelance_span_duration_seconds", 0.5, span="analysis.total")
+    text = metrics.render()
+    assert "# TYPE freelance_tokens_total counter" in text
+    assert 'freelance_tokens_total{provider="ollama",type="prompt"} 5' in text
+    assert 'freelance_span_duration_seconds_bucket{span="analysis.total",le="0.1"} 0' in text
+    assert 'freelance_span_duration_seconds_bucket{span="analysis.total",le="1"} 1' in text
+    assert 'freelance_span_duration_seconds_count{span="analysis.total"} 1' in text
+
+
+def test_spans_are_collected_and_errors_counted():
+    """Test spans land in the active trace and failures are counted."""
+    with collect_spans() as spans:
+        with span("outer"):
+            with pytest.raises(ValueError):
+                with span("inner", section="proposal"):
+                    raise ValueError("boom")
+    assert [s["span"] for s in spans] == ["inner", "outer"]
+    assert spans[0]["error"]
+    assert registry.counter_value("freelance_span_errors_total", span="inner", section="proposal") == 1
+
+
+def test_spans_from_worker_threads_are_collected():
+    """Test spans finished in executor threads reach the caller's trace."""
+    def work(index):
+        with span("worker", index=str(index)):
+            return index
+
+    with collect_spans() as spans:
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            assert list(executor.map(with_context(work), range(3))) == [0, 1, 2]
+    assert sorted(s["index"] for s in spans) == ["0", "1", "2"]
+
+    with ProviderServer(behavior=ProviderBehavior(output_tokens=5, tokens_per_second=0)) as server:
+        with collect_spans() as spans:
+            OllamaInference(base_url=server.url).complete_many([{"role": "user", "content": "Hello"}], 3)
+    assert [s["span"] for s in spans].count("provider.complete") == 3
+
+
+def test_timing_breakdown_and_retries():
+    """Test the analyzer reports per-section timings and counts retries."""
+    analyzer = JobAnalyzer(embedding_model=FakeEmbedding(), inference_model=ScriptedInference(
+        {"jobAnalysis": [RuntimeError("temporary failure")]}, output_words=10))
+    results = analyzer.analyze_job_post("Build a Django chatbot.", include_timings=True)
+    timings = results["timings"]
+    assert set(timings["sections"]) == set(JobAnalyzer.analysis_prompts)
+    assert timings["sections"]["jobAnalysis"]["attempts"] == 2
+    assert timings["sections"]["proposal"]["attempts"] == 1
+    assert timings["total_ms"] >= timings["embedding_ms"]
+    assert registry.counter_value("freelance_retries_total", section="jobAnalysis") == 1
+    assert registry.histogram_count("freelance_span_duration_seconds", span="analysis.section", section="proposal") == 1
+
+
+def test_timings_are_opt_in():
+    """Test the default response has no timings."""
+    analyzer = JobAnalyzer(embedding_model=FakeEmbedding(), inference_model=FakeInference(output_words=5))
+    assert "timings" not in analyzer.analyze_job_post("Build a Django chatbot.")
+
+
+def test_provider_token_counts():
+    """Test Ollama eval counts and OpenRouter usage are recorded."""
+    with ProviderServer(behavior=ProviderBehavior(output_tokens=12)) as server:
+        OllamaInference(base_url=server.url).complete(messages=[{"role": "user", "content": "Hello"}])
+        OpenRouterModel(api_key="test", base_url=f"{server.url}/api/v1").complete(
+            messages=[{"role": "user", "content": "Hello"}], model="test-model")
+    assert registry.counter_value("freelance_tokens_total", provider="ollama",
+                                  model="deepseek-coder-v2:latest", type="completion") == 12
+    assert registry.counter_value("freelance_tokens_total", provider="openrouter",
+                                  model="test-model", type="completion") == 12
+    assert registry.counter_value("freelance_provider_requests_total", provider="ollama",
+                                  kind="complete", outcome="ok") == 1
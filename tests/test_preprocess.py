@@ -0,0 +1,93 @@
+"""Test job post preprocessing."""
+
+from pathlib import Path
+from src.analysis import JobAnalyzer
+from src.analysis.preprocess import prepare_job_post
+from benchmarks.fakes import FakeEmbedding, FakeInference
+
+UPWORK_PASTE = """## Senior **Django** Developer
+
+Posted 3 hours ago
+Worldwide
+
+We need a *Django* developer to build a [REST API](https://example.com/spec) for our app.
+
+We need a *Django* developer to build a [REST API](https://example.com/spec) for our app.
+
+* Build endpoints
+* Write   tests
+
+Hourly: $40.00 - $60.00
+Less than 1 month
+
+Skills and Expertise
+Django
+Python
+
+REST API
+
+Activity on this job
+Proposals: 10 to 15
+About the client
+Payment method verified
+Rating is 4.9 out of 5.
+United States 3:04 PM
+$50K total spent
+Member since Jan 12, 2019
+"""
+
+
+def test_strips_markdown_boilerplate_and_duplicates():
+    """Test formatting, page chrome and repeated lines are removed."""
+    prepared = prepare_job_post(UPWORK_PASTE)
+    assert prepared["text"] == (
+        "Senior Django Developer\n\n"
+        "We need a Django developer to build a REST API for our app.\n\n"
+        "- Build endpoints\n"
+        "- Write tests\n\n"
+        "Budget: $40-$60 per hour\n"
+        "Duration: Less than 1 month\n\n"
+        "Skills: Django, Python, REST API"
+    )
+    assert prepared["removed_lines"] == 11
+    assert prepared["saved_tokens"] == prepared["tokens_before"] - prepared["tokens_after"] > 0
+
+
+def test_section_after_skills_is_kept():
+    """Test a heading and bullets after the skill badges stay in the post."""
+    prepared = prepare_job_post("Build an API.\n\nSkills\nPython\nDjango\n\nRequirements\n- Build REST API\n"
+                                "- Write tests\n")
+    assert prepared["fields"]["skills"] == ["Python", "Django"]
+    assert prepared["text"].endswith("Skills: Python, Django\n\nRequirements\n- Build REST API\n- Write tests")
+
+
+def test_schedule_lines_are_not_client_location():
+    """Test a time of day is only dropped as the client's local time inside the client block."""
+    prepared = prepare_job_post("Join our team.\nDaily standup 10:30 am\n\nAbout the client\nLondon 4:15 pm\n")
+    assert prepared["text"] == "Join our team.\nDaily standup 10:30 am"
+
+
+def test_extracts_fields():
+    """Test budget, duration and skills are extracted."""
+    fields = prepare_job_post(UPWORK_PASTE)["fields"]
+    assert fields["budget"] == {"text": "$40.00 - $60.00", "min": 40.0, "max": 60.0, "type": "hourly"}
+    assert fields["duration"] == {"text": "Less than 1 month", "min": 1, "max": 1, "unit": "months"}
+    assert fields["skills"] == ["Django", "Python", "REST API"]
+
+
+def test_repairs_wrapped_budget():
+    """Test amounts broken across lines by the page renderer are rejoined."""
+    job_post = (Path(__file__).parent.parent / "utils" / "job_post.md").read_text(encoding="utf-8")
+    prepared = prepare_job_post(job_post)
+    assert "Budget: $30-$50 per hour (competitive based on experience and skills)" in prepared["text"]
+    assert prepared["fields"]["duration"]["unit"] == "weeks"
+    assert "Proficiency in chatbot development platforms" in prepared["text"]
+
+
+def test_analyzer_sends_cleaned_post():
+    """Test sections receive the cleaned post and fields are reported."""
+    inference = FakeInference(0.0)
+    analyzer = JobAnalyzer(embedding_model=FakeEmbedding(0.0), inference_model=inference)
+    results = analyzer.analyze_job_post(UPWORK_PASTE, include_timings=True, include_fields=True)
+    assert results["fields"]["skills"] == ["Django", "Python", "REST API"]
+    assert results["timings"]["preprocessing"]["saved_tokens"] > 0
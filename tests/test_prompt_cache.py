@@ -0,0 +1,82 @@
+"""Test the shared-prefix prompt layout and prompt-cache reuse across sections."""
+
+import pytest
+
+from benchmarks.fakes import FakeEmbedding, FakeInference
+from benchmarks.provider_server import ProviderBehavior, ProviderServer
+from src.analysis import JobAnalyzer
+from src.models import OllamaInference
+
+pytestmark = pytest.mark.timeout(30)
+
+MODEL = "deepseek-coder-v2:latest"
+JOB_POST = ("Build a Django REST API for shipment tracking with PostgreSQL and Celery workers. " * 30).strip()
+
+
+class RecordingInference(OllamaInference):
+    """OllamaInference that keeps the messages and usage of every call"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.calls = []
+
+    def complete(self, messages, **kwargs):
+        response = super().complete(messages, **kwargs)
+        self.calls.append((messages, response["usage"]["prompt_tokens"]))
+        return response
+
+    def stream(self, messages, usage=None, **kwargs):
+        usage = {} if usage is None else usage
+        yield from super().stream(messages, usage=usage, **kwargs)
+        self.calls.append((messages, usage.get("prompt_tokens")))
+
+
+def test_job_post_comes_before_the_instruction():
+    """Test every section sends the same system prompt and post ahead of its own instruction."""
+    inference = FakeInference(0.0)
+    sent = []
+    complete = inference.complete
+    inference.complete = lambda messages, **kwargs: sent.append(messages) or complete(messages, **kwargs)
+    analyzer = JobAnalyzer(embedding_model=FakeEmbedding(0.0), inference_model=inference, proposal_candidates=1)
+    analyzer.analyze_job_post(JOB_POST)
+    assert len(sent) == 6
+    prefix = f"Job Post:\n{JOB_POST}\n\n"
+    assert all(messages[-1]["content"].startswith(prefix) for messages in sent)
+    assert len({messages[0]["content"] for messages in sent}) == 1
+    instructions = {messages[-1]["content"][len(prefix):] for messages in sent}
+    assert len(instructions) == 6
+
+
+def test_later_sections_reuse_the_evaluated_prefix():
+    """Test only the first section pays for the post and the model is never reloaded."""
+    with ProviderServer(behavior=ProviderBehavior(output_tokens=40, tokens_per_second=0)) as server:
+        inference = RecordingInference(base_url=server.url)
+        analyzer = JobAnalyzer(embedding_model=FakeEmbedding(0.0), inference_model=inference,
+                               proposal_candidates=1, validate=False)
+        analyzer.analyze_job_post(JOB_POST)
+        assert server.requests["/api/chat"] == 6
+        assert server.reloads[MODEL] == 0
+    first, *rest = [tokens for _, tokens in inference.calls]
+    post_tokens = len(JOB_POST.split())
+    assert first > post_tokens
+    assert all(tokens < post_tokens / 2 for tokens in rest)
+
+
+def test_compressed_sections_keep_the_shared_prefix():
+    """Test compression sends every section the same excerpt first, so the prefix is still reused."""
+    post = "\n".join([
+        "Senior Django Developer for a logistics platform",
+        "Skills: Django, PostgreSQL, Celery",
+        *[f"Shipment batch {index} is tracked through the REST API and stored in PostgreSQL." for index in range(40)],
+        "What questions do you have about the tracking requirements?",
+    ])
+    with ProviderServer(behavior=ProviderBehavior(output_tokens=40, tokens_per_second=0)) as server:
+        inference = RecordingInference(base_url=server.url)
+        analyzer = JobAnalyzer(embedding_model=FakeEmbedding(0.0), inference_model=inference,
+                               proposal_candidates=1, validate=False, max_input_tokens=300)
+        analyzer.analyze_job_post(post)
+        assert server.reloads[MODEL] == 0
+    prefixes = {messages[-1]["content"].split("\n\n", 1)[0] for messages, _ in inference.calls}
+    assert len(prefixes) == 1 and "[...]" in prefixes.pop()
+    first, *rest = [tokens for _, tokens in inference.calls]
+    assert all(tokens < first / 2 for tokens in rest)
@@ -0,0 +1,84 @@
+"""Test the local Ollama/OpenRouter stand-in server against our model classes."""
+
+import json
+import time
+import pytest
+import requests
+from benchmarks.provider_server import ProviderBehavior, ProviderServer
+from src.models import OllamaEmbedding, OllamaInference, OpenRouterModel
+
+pytestmark = pytest.mark.timeout(30)
+
+
+@pytest.fixture
+def server():
+    with ProviderServer(behavior=ProviderBehavior(output_tokens=20)) as server:
+        yield server
+
+
+def test_ollama_chat(server):
+    """Test OllamaInference completes against the stand-in."""
+    model = OllamaInference(base_url=server.url)
+    response = model.complete(messages=[{"role": "user", "content": "Hello"}])
+    assert len(response["message"]["content"].split()) == 20
+    assert server.requests["/api/chat"] == 1
+
+
+def test_ollama_embed(server):
+    """Test OllamaEmbedding embeds against the stand-in."""
+    model = OllamaEmbedding(base_url=server.url)
+    vectors = model.embed(["first text", "second text"])
+    assert len(vectors) == 2
+    assert len(vectors[0]) == 768
+
+
+def test_ollama_tags(server):
+    """Test the model list endpoint."""
+    names = [m["name"] for m in requests.get(f"{server.url}/api/tags").json()["models"]]
+    assert "deepseek-coder-v2:latest" in names
+
+
+def test_ollama_streaming(server):
+    """Test NDJSON streaming ends with a done chunk carrying counts."""
+    response = requests.post(f"{server.url}/api/generate",
+                             json={"model": "m", "prompt": "Hi", "stream": True}, stream=True)
+    chunks = [json.loads(line) for line in response.iter_lines() if line]
+    assert len(chunks) == 21
+    assert chunks[-1]["done"] and chunks[-1]["eval_count"] == 20
+
+
+def test_openrouter_completion(server):
+    """Test OpenRouterModel completes and reports usage."""
+    model = OpenRouterModel(api_key="test", base_url=f"{server.url}/api/v1")
+    response = model.complete(messages=[{"role": "user", "content": "Hello"}], max_tokens=5)
+    assert len(response["choices"][0]["message"]["content"].split()) == 5
+    assert response["usage"]["completion_tokens"] == 5
+
+
+def test_openrouter_streaming(server):
+    """Test SSE streaming terminates with [DONE]."""
+    response = requests.post(f"{server.url}/chat/completions",
+                             json={"messages": [{"role": "user", "content": "Hi"}], "stream": True},
+                             stream=True)
+    events = [line for line in response.iter_lines(decode_unicode=True) if line]
+    assert events[-1] == "data: [DONE]"
+    assert len(events) == 22
+
+
+def test_rate_limit_injection(server):
+    """Test scripted 429 responses carry Retry-After."""
+    server.behavior.script({"status": 429, "retry_after": 3})
+    response = requests.post(f"{server.url}/api/generate", json={"prompt": "Hi", "stream": False})
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "3"
+    response = requests.post(f"{server.url}/api/generate", json={"prompt": "Hi", "stream": False})
+    assert response.status_code == 200
+
+
+def test_stall_and_throughput(server):
+    """Test stalls and token pacing slow generation down."""
+    requests.post(f"{server.url}/_control",
+                  json={"update": {"tokens_per_second": 200}, "script": [{"stall": 0.3}]})
+    start = time.perf_counter()
+    requests.post(f"{server.url}/api/generate", json={"prompt": "Hi", "stream": False})
+    assert time.perf_counter() - start >= 0.3 + 20 / 200
@@ -0,0 +1,120 @@
+"""Test single-flight deduplication of in-flight completions."""
+
+import threading
+import time
+from src.models.singleflight import SingleFlight, single_flight
+
+
+class SlowModel:
+    """Model whose complete call blocks long enough for callers to overlap"""
+    def __init__(self, fail: bool = False, api_key: str = None):
+        self.calls = 0
+        self.fail = fail
+        self.model = "slow"
+        self.api_key = api_key
+
+    @single_flight(group=SingleFlight())
+    def complete(self, messages, temperature: float = 1.0, **kwargs):
+        self.calls += 1
+        time.sleep(0.2)
+        if self.fail:
+            raise RuntimeError("upstream failed")
+        return {"message": {"role": "assistant", "content": "done"}}
+
+
+def _run_concurrently(fn, count=5):
+    results, errors = [], []
+
+    def target():
+        try:
+            results.append(fn())
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+
+def test_concurrent_identical_calls_share_one_request():
+    """Test identical overlapping calls hit upstream once."""
+    model = SlowModel()
+    messages = [{"role": "user", "content": "Analyze this"}]
+    results, errors = _run_concurrently(lambda: model.complete(messages, temperature=0.7))
+    assert not errors
+    assert model.calls == 1
+    assert len(results) == 5
+    assert all(r["message"]["content"] == "done" for r in results)
+
+
+def test_normalized_requests_are_shared():
+    """Test default arguments and surrounding whitespace don't split keys."""
+    model = SlowModel()
+    calls = [
+        lambda: model.complete([{"role": "user", "content": "Analyze this"}]),
+        lambda: model.complete([{"role": "user", "content": "  Analyze this\n"}], temperature=1.0),
+    ]
+    results, errors = _run_concurrently(lambda: calls.pop()(), count=2)
+    assert not errors
+    assert model.calls == 1
+
+
+def test_different_requests_are_not_shared():
+    """Test different parameters run separately."""
+    model = SlowModel()
+    temperatures = [0.1, 0.9]
+    messages = [{"role": "user", "content": "Analyze this"}]
+    _run_concurrently(lambda: model.complete(messages, temperature=temperatures.pop()), count=2)
+    assert model.calls == 2
+
+
+def test_accounts_are_not_shared():
+    """Test the same request from different API keys makes one call per key."""
+    first, second, same = SlowModel(api_key="key-a"), SlowModel(api_key="key-b"), SlowModel(api_key="key-a")
+    models = [first, second, same]
+    messages = [{"role": "user", "content": "Analyze this"}]
+    results, errors = _run_concurrently(lambda: models.pop().complete(messages), count=3)
+    assert not errors and len(results) == 3
+    assert second.calls == 1
+    assert first.calls + same.calls == 1
+
+
+def test_errors_are_shared():
+    """Test every waiting caller receives the leader's error."""
+    model = SlowModel(fail=True)
+    messages = [{"role": "user", "content": "Analyze this"}]
+    results, errors = _run_concurrently(lambda: model.complete(messages))
+    assert model.calls == 1
+    assert not results
+    assert len(errors) == 5
+    assert all(isinstance(e, RuntimeError) for e in errors)
+
+
+def test_sequential_calls_are_not_cached():
+    """Test a finished call is not reused by later calls."""
+    model = SlowModel()
+    messages = [{"role": "user", "content": "Analyze this"}]
+    model.complete(messages)
+    model.complete(messages)
+    assert model.calls == 2
+
+
+def test_followers_get_independent_copies():
+    """Test mutating one shared result doesn't affect the others."""
+    model = SlowModel()
+    messages = [{"role": "user", "content": "Analyze this"}]
+    results, _ = _run_concurrently(lambda: model.complete(messages), count=3)
+    results[0]["message"]["content"] = "changed"
+    assert sum(r["message"]["content"] == "done" for r in results) >= 2
+
+
+def test_opt_out():
+    """Test instances can bypass deduplication."""
+    model = SlowModel()
+    model.single_flight = False
+    messages = [{"role": "user", "content": "Analyze this"}]
+    _run_concurrently(lambda: model.complete(messages), count=3)
+    assert model.calls == 3
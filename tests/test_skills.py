@@ -0,0 +1,67 @@
+"""Test the taxonomy-based skill extractor and its use in section prompts."""
+
+from pathlib import Path
+
+from src.analysis import JobAnalyzer
+from src.analysis.skills import SkillMatcher, extract_skills
+from benchmarks.fakes import FakeEmbedding, ScriptedInference
+
+
+def names(text):
+    return [skill["name"] for skill in extract_skills(text)]
+
+
+def test_matches_aliases_on_word_boundaries():
+    """Test aliases map to canonical names and partial words don't match."""
+    text = "Build with ReactJS and React Native, plus C++ and C#. We use javascript, not Java. Rest of the team uses sklearn."
+    assert names(text) == ["React", "React Native", "C++", "C#", "JavaScript", "Java", "scikit-learn"]
+    assert names("HTML emails and a mongoose schema") == []
+    assert names("Ready to go? Express interest quickly.") == []
+
+
+def test_counts_and_categories():
+    """Test repeated mentions are counted and categories reported."""
+    skills = extract_skills("Machine learning in Python: TensorFlow or PyTorch. ML experience with Python required.")
+    assert skills[0] == {"name": "Machine Learning", "category": "method", "count": 2}
+    assert {skill["name"]: skill["count"] for skill in skills}["Python"] == 2
+    assert {skill["name"]: skill["category"] for skill in skills}["TensorFlow"] == "ml"
+
+
+def test_ambiguous_aliases_need_context():
+    """Test aliases that are ordinary words only match when used as technologies."""
+    assert names("We need guard rails for the team. Let's spark ideas together.") == []
+    assert names("Spark ideas in the team.") == []
+    assert names("Luis will review the ts files, torch in hand.") == []
+    assert names("Experience with Rails and Postgres.") == ["Ruby on Rails", "PostgreSQL"]
+    assert names("Spark and Kafka pipelines in Python.") == ["Spark", "Python"]
+    assert names("Frontend in TS with React. Train the bot with LUIS.") == ["TypeScript", "React", "Microsoft LUIS"]
+
+
+def test_overlapping_aliases():
+    """Test failure links find aliases that start inside another alias."""
+    matcher = SkillMatcher({"abcd": ("x", ()), "bc": ("x", ()), "b c": ("x", ())})
+    assert [name for _, _, name in matcher.find("a bc abcd")] == ["bc", "abcd"]
+
+
+def test_sample_post():
+    """Test the bundled sample post's stack is found."""
+    job_post = (Path(__file__).parent.parent / "utils" / "job_post.md").read_text(encoding="utf-8")
+    found = names(job_post)
+    for skill in ("Chatbot", "NLP", "Node.js", "Django", "React", "Dialogflow", "Machine Learning"):
+        assert skill in found
+
+
+def test_analyzer_feeds_skills_to_prompts():
+    """Test every section prompt lists the technologies and fields report them."""
+    inference = ScriptedInference()
+    analyzer = JobAnalyzer(embedding_model=FakeEmbedding(0.0), inference_model=inference)
+    results = analyzer.analyze_job_post("Build a Django REST API with PostgreSQL.", include_fields=True)
+    assert [skill["name"] for skill in results["fields"]["technologies"]] == ["Django", "REST API", "PostgreSQL"]
+    assert all("Technologies and skills named in the post: Django, REST API, PostgreSQL." in prompt
+               for prompt in inference.prompts)
+    assert sum("re-deriving" in prompt for prompt in inference.prompts) == 1
+
+    inference = ScriptedInference()
+    JobAnalyzer(embedding_model=FakeEmbedding(0.0), inference_model=inference, skills=False).analyze_job_post(
+        "Build a Django REST API with PostgreSQL.")
+    assert not any("Technologies" in prompt for prompt in inference.prompts)
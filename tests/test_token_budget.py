@@ -0,0 +1,57 @@
+"""Test per-section max_tokens learned from observed outputs."""
+
+import pytest
+from benchmarks.provider_server import ProviderBehavior, ProviderServer
+from src.analysis import JobAnalyzer, TokenBudget
+from src.analysis.token_budget import DEFAULT_MAX_TOKENS
+from src.models import OllamaEmbedding, OllamaInference
+
+pytestmark = pytest.mark.timeout(30)
+
+
+def test_defaults_until_enough_samples():
+    """Test fixed defaults are used before min_samples observations."""
+    budget = TokenBudget(min_samples=3)
+    budget.observe("m", "jobAnalysis", 100)
+    budget.observe("m", "jobAnalysis", 120)
+    assert budget.max_tokens("m", "jobAnalysis") == DEFAULT_MAX_TOKENS
+    assert budget.max_tokens("m", "proposal") == 400
+
+
+def test_cap_is_high_percentile_plus_margin():
+    """Test the cap follows the observed percentile with a margin and floor."""
+    budget = TokenBudget(percentile=100, margin=0.25, min_samples=3, floor=64)
+    for tokens in (100, 200, 300):
+        budget.observe("m", "jobAnalysis", tokens)
+    assert budget.max_tokens("m", "jobAnalysis") == 375
+    assert budget.max_tokens("other", "jobAnalysis") == DEFAULT_MAX_TOKENS
+
+    for _ in range(3):
+        budget.observe("m", "questionsAnalysis", 10)
+    assert budget.max_tokens("m", "questionsAnalysis") == 64
+
+
+def test_truncated_outputs_raise_the_cap():
+    """Test outputs that hit the cap push it up instead of locking it in."""
+    budget = TokenBudget(percentile=100, margin=0.0, min_samples=1, ceiling=1500)
+    budget.observe("m", "jobAnalysis", 300, max_tokens=300)
+    assert budget.max_tokens("m", "jobAnalysis") == 600
+    budget.observe("m", "jobAnalysis", 1000, max_tokens=1000)
+    assert budget.max_tokens("m", "jobAnalysis") == 1500
+
+
+def test_analyzer_sends_learned_caps():
+    """Test the analyzer requests learned caps and reports them in timings."""
+    budget = TokenBudget(min_samples=1, margin=0.5)
+    with ProviderServer(behavior=ProviderBehavior(output_tokens=80, tokens_per_second=0)) as server:
+        analyzer = JobAnalyzer(
+            embedding_model=OllamaEmbedding(base_url=server.url),
+            inference_model=OllamaInference(base_url=server.url),
+            token_budget=budget,
+        )
+        first = analyzer.analyze_job_post("Build a chatbot", include_timings=True)["timings"]
+        second = analyzer.analyze_job_post("Build a chatbot", include_timings=True)["timings"]
+    assert first["sections"]["jobAnalysis"]["max_tokens"] == DEFAULT_MAX_TOKENS
+    assert second["sections"]["jobAnalysis"]["max_tokens"] == 120
+    assert second["sections"]["jobAnalysis"]["completion_tokens"] == 80
+    assert budget.snapshot()["deepseek-coder-v2:latest/proposal"]["samples"] == 2
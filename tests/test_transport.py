@@ -0,0 +1,94 @@
+"""Test record/replay of provider traffic."""
+
+import json
+import time
+import pytest
+from benchmarks.provider_server import ProviderBehavior, ProviderServer
+from src.models import OllamaEmbedding, OllamaInference, OpenRouterModel
+from src.models.transport import CassetteMiss, create_session, request_fingerprint, use_cassette
+
+pytestmark = pytest.mark.timeout(30)
+
+MESSAGES = [{"role": "user", "content": "Hello"}]
+
+
+@pytest.fixture
+def cassette_path(tmp_path):
+    return str(tmp_path / "cassette.jsonl.gz")
+
+
+@pytest.fixture
+def recorded(cassette_path):
+    """Record one call per provider plus a streamed generation."""
+    behavior = ProviderBehavior(output_tokens=10, tokens_per_second=100)
+    with ProviderServer(behavior=behavior) as server:
+        with use_cassette(cassette_path, mode="record"):
+            results = {
+                "ollama": OllamaInference(base_url=server.url).complete(messages=MESSAGES),
+                "embedding": OllamaEmbedding(base_url=server.url).embed(["Hello"]),
+                "openrouter": OpenRouterModel(api_key="key", base_url=f"{server.url}/api/v1").complete(messages=MESSAGES),
+            }
+            response = create_session().post(f"{server.url}/api/generate",
+                                              json={"prompt": "Hi", "stream": True}, stream=True)
+            results["stream"] = [json.loads(line) for line in response.iter_lines() if line]
+    return results
+
+
+def test_replay_is_offline_and_identical(recorded, cassette_path):
+    """Test replayed responses match the recording without a server."""
+    offline = "http://127.0.0.1:9"
+    with use_cassette(cassette_path):
+        assert OllamaInference(base_url=offline).complete(messages=MESSAGES) == recorded["ollama"]
+        assert OllamaEmbedding(base_url=offline).embed(["Hello"]) == recorded["embedding"]
+        openrouter = OpenRouterModel(api_key="other-key", base_url=f"{offline}/api/v1")
+        assert openrouter.complete(messages=MESSAGES) == recorded["openrouter"]
+
+
+def test_streamed_chunks_replay_at_recorded_speed(recorded, cassette_path):
+    """Test streaming chunks replay in order and with recorded pacing."""
+    with use_cassette(cassette_path, speed=1.0):
+        start = time.perf_counter()
+        response = create_session().post("http://127.0.0.1:9/api/generate",
+                                          json={"stream": True, "prompt": "Hi"}, stream=True)
+        chunks = [json.loads(line) for line in response.iter_lines() if line]
+        paced = time.perf_counter() - start
+    assert chunks == recorded["stream"]
+    assert paced >= 0.05
+
+    with use_cassette(cassette_path, speed=0):
+        start = time.perf_counter()
+        response = create_session().post("http://127.0.0.1:9/api/generate",
+                                          json={"stream": True, "prompt": "Hi"}, stream=True)
+        list(response.iter_lines())
+        assert time.perf_counter() - start < paced
+
+
+def test_unrecorded_request_misses(recorded, cassette_path):
+    """Test requests missing from the cassette fail like a connection error."""
+    with use_cassette(cassette_path):
+        with pytest.raises(CassetteMiss):
+            create_session().post("http://127.0.0.1:9/api/generate", json={"prompt": "Unrecorded"})
+
+
+def test_complete_many_replays(cassette_path, monkeypatch):
+    """Test sampled candidates replay although seeds are drawn per call and num_ctx is process-wide."""
+    with ProviderServer(behavior=ProviderBehavior(output_tokens=10, tokens_per_second=0)) as server:
+        with use_cassette(cassette_path, mode="record"):
+            recorded = OllamaInference(base_url=server.url).complete_many(MESSAGES, 3)
+    offline = "http://127.0.0.1:9"
+    with use_cassette(cassette_path):
+        inference = OllamaInference(base_url=offline)
+        # The model is loaded with a larger context than the recording's
+        monkeypatch.setitem(OllamaInference._contexts, (offline, inference.model), 4096)
+        replayed = inference.complete_many(MESSAGES, 3)
+    assert [response["message"] for response in replayed] == [response["message"] for response in recorded]
+
+
+def test_fingerprint_ignores_host_and_key_order():
+    """Test fingerprints survive base_url changes and JSON key order."""
+    first = request_fingerprint("POST", "http://a:1/api/generate", b'{"a": 1, "b": 2}')
+    second = request_fingerprint("post", "http://b:2/api/generate/", b'{"b":2,"a":1}')
+    assert first == second
+    assert first != request_fingerprint("POST", "http://a:1/api/embed", b'{"a": 1, "b": 2}')
+    assert (request_fingerprint("POST", "http://a:1/api/chat", b'{"options": {"num_ctx": 2048, "seed": 1}}')
+            == request_fingerprint("POST", "http://a:1/api/chat", b'{"options": {"num_ctx": 8192, "seed": 1}}'))
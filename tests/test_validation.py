@@ -0,0 +1,82 @@
+"""Test per-section validation and targeted repair of failing sections."""
+
+from src.analysis import AnalysisCache, JobAnalyzer
+from src.analysis.validation import validate_section
+from src.monitoring import registry
+from benchmarks.fakes import JOB_POST, FakeEmbedding, ScriptedInference
+
+
+def analyzer_for(inference, **options):
+    return JobAnalyzer(embedding_model=FakeEmbedding(0.0), inference_model=inference, **options)
+
+
+def test_validate_section():
+    """Test each check reports its problem and good output passes."""
+    assert validate_section("   ") == ["empty"]
+    assert validate_section("Analysis failed after 3 attempts: 401 Unauthorized") == ["error"]
+    assert validate_section("Error: handling is missing from the upload endpoint.") == []
+    assert validate_section("word " * 151, max_words=150) == ["too_long"]
+    assert validate_section("First do this, then that.", numbered=True) == ["not_numbered"]
+    assert validate_section("1. Scope\n2) Build\n### 3. Ship", numbered=True) == []
+    assert validate_section("**1.** Scope\n**2.** Build", numbered=True) == []
+
+
+def test_only_the_failing_section_is_regenerated():
+    """Test prose in a numbered-list section costs one extra call with a format reminder."""
+    inference = ScriptedInference({"approachAnalysis": ["Start with discovery, then build and ship."]})
+    before = registry.counter_value("freelance_section_repairs_total", section="approachAnalysis",
+                                    problem="not_numbered")
+    results = analyzer_for(inference).analyze_job_post(JOB_POST, include_timings=True)
+    sections = [section for section, _ in inference.requests]
+    assert len(sections) == 7 and sections.count("approachAnalysis") == 2
+    assert "Format the answer as a numbered list" in inference.requests[-1][1]
+    assert results["approachAnalysis"].startswith("1. ")
+    assert results["timings"]["sections"]["approachAnalysis"]["repaired"] == ["not_numbered"]
+    assert registry.counter_value("freelance_section_repairs_total", section="approachAnalysis",
+                                  problem="not_numbered") == before + 1
+
+
+def test_failed_section_gets_one_more_attempt(monkeypatch):
+    """Test a section that exhausted its retries is regenerated once, alone."""
+    monkeypatch.setattr("src.analysis.job_analyzer.time.sleep", lambda seconds: None)
+    inference = ScriptedInference({"clientCharacteristics": [RuntimeError("429")] * 3})
+    results = analyzer_for(inference).analyze_job_post(JOB_POST)
+    assert not results["clientCharacteristics"].startswith("Analysis failed")
+    assert [section for section, _ in inference.requests].count("clientCharacteristics") == 4
+    assert len(inference.requests) == 9
+
+
+def test_unfixable_section_is_kept_and_not_cached():
+    """Test a repair that doesn't help keeps the original and leaves the section uncached."""
+    inference = ScriptedInference({"questionsAnalysis": ["Ask about the budget.", "Ask about the timeline."]})
+    cache = AnalysisCache()
+    analyzer = analyzer_for(inference, analysis_cache=cache)
+    results = analyzer.analyze_job_post(JOB_POST)
+    assert results["questionsAnalysis"] == "Ask about the budget."
+    assert analyzer.failed_sections(results) == ["questionsAnalysis"]
+    del results["proposal"]
+    assert analyzer.failed_sections(results) == ["questionsAnalysis", "proposal"]
+    again = analyzer_for(inference, analysis_cache=cache).analyze_job_post(JOB_POST)
+    assert again["recomputed"] == ["questionsAnalysis"]
+
+
+def test_failed_proposal_promotes_an_alternative():
+    """Test a failing best proposal is replaced by a passing runner-up without a call."""
+    inference = ScriptedInference({})
+    analyzer = analyzer_for(inference)
+    inputs = {"prompt": analyzer.analysis_prompts["proposal"], "post": JOB_POST, "context": None}
+    failed = "Analysis failed after 3 attempts: timeout"
+    result, alternatives = analyzer._repair("proposal", failed, ["error"], inputs,
+                                            [failed, "A fine proposal.", "Another one."])
+    assert (result, alternatives) == ("A fine proposal.", [failed, "Another one."])
+    assert inference.requests == []
+
+
+def test_validation_can_be_disabled():
+    """Test validate=False returns sections as generated."""
+    inference = ScriptedInference({"approachAnalysis": ["Start with discovery."]})
+    analyzer = analyzer_for(inference, validate=False)
+    results = analyzer.analyze_job_post(JOB_POST)
+    assert results["approachAnalysis"] == "Start with discovery."
+    assert len(inference.requests) == 6
+    assert analyzer.failed_sections(results) == []
@@ -0,0 +1,65 @@
+"""Test streamed sections stop at their word limit."""
+
+import time
+import pytest
+from benchmarks.provider_server import ProviderBehavior, ProviderServer
+from src.analysis import JobAnalyzer
+from src.analysis.job_analyzer import ANALYSIS_PROMPTS, trim_to_word_limit
+from src.models import OllamaInference, OpenRouterModel
+
+pytestmark = pytest.mark.timeout(30)
+
+JOB_POST = "Build a Django chatbot for customer support."
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not met in time"
+        time.sleep(0.01)
+
+
+def test_trim_prefers_sentence_boundary():
+    """Test trimming ends on the last full sentence within the limit."""
+    text = "One two three. Four five six! Seven eight nine ten"
+    assert trim_to_word_limit(text, 8) == "One two three. Four five six!"
+    assert trim_to_word_limit(text, 20) == text
+
+
+def test_trim_falls_back_to_word_cut():
+    """Test trimming cuts at the word limit when no late sentence end exists."""
+    text = "Short. " + " ".join(["word"] * 20)
+    assert trim_to_word_limit(text, 10) == "Short. " + " ".join(["word"] * 9)
+
+
+@pytest.mark.parametrize("provider", ["ollama", "openrouter"])
+def test_proposal_stream_is_cancelled_at_limit(provider):
+    """Test the proposal stops streaming once it passes 150 words."""
+    behavior = ProviderBehavior(output_tokens=2000, tokens_per_second=500)
+    with ProviderServer(behavior=behavior) as server:
+        if provider == "ollama":
+            model, path = OllamaInference(base_url=server.url), "/api/chat"
+        else:
+            model = OpenRouterModel(api_key="key", base_url=f"{server.url}/api/v1")
+            path = "/api/v1/chat/completions"
+        analyzer = JobAnalyzer(embedding_model=object(), inference_model=model)
+
+        start = time.perf_counter()
+        proposal = analyzer._analyze_with_retry(ANALYSIS_PROMPTS['proposal'], JOB_POST, section='proposal')
+        elapsed = time.perf_counter() - start
+
+        assert len(proposal.split()) == 150
+        assert elapsed < 2.0  # the full 2000 tokens would take 4s
+        wait_for(lambda: server.cancelled[path] == 1)
+
+
+def test_short_stream_completes_with_usage():
+    """Test a stream under the limit finishes normally and reports usage."""
+    with ProviderServer(behavior=ProviderBehavior(output_tokens=20, tokens_per_second=0)) as server:
+        usage = {}
+        model = OllamaInference(base_url=server.url)
+        text = "".join(model.stream([{"role": "user", "content": "Hi"}], usage=usage))
+    assert len(text.split()) == 20
+    assert usage["completion_tokens"] == 20
+    assert usage["prompt_tokens"] > 0
+    assert server.cancelled["/api/chat"] == 0